@@ -16,9 +16,12 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-target_metadata = None
+from app.database import DATABASE_URL
+from app import models
+target_metadata = models.Base.metadata
+
+# Use the same database as the application (DATABASE_URL or the SQLite fallback)
+config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -0,0 +1,27 @@
+"""add (created_at, id) index on todos for admin keyset pagination
+
+Revision ID: 2a7e5c9d1b38
+Revises: 9b6c2d4e8f57
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a7e5c9d1b38'
+down_revision: Union[str, Sequence[str], None] = '9b6c2d4e8f57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_todos_created_id", "todos", ["created_at", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_todos_created_id", table_name="todos")
@@ -0,0 +1,34 @@
+"""add todos (owner_id, created_at, id) index for keyset pagination
+
+Tables are created by Base.metadata.create_all() on startup, so this revision
+only adds what create_all() does not add to existing tables.
+
+Revision ID: 3f1c2a9b7d10
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9b7d10'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_todos_owner_created_id", "todos", ["owner_id", "created_at", "id"],
+        unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_todos_owner_created_id", table_name="todos", if_exists=True)
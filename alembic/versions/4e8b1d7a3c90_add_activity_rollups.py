@@ -0,0 +1,35 @@
+"""add activity_rollups for the admin analytics timeseries
+
+Revision ID: 4e8b1d7a3c90
+Revises: 7c3a9e1f5d62
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8b1d7a3c90'
+down_revision: Union[str, Sequence[str], None] = '7c3a9e1f5d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema. Past hours are filled by running backfill_rollups.py once."""
+    if not sa.inspect(op.get_bind()).has_table("activity_rollups"):
+        op.create_table(
+            "activity_rollups",
+            sa.Column("metric", sa.String(32), primary_key=True),
+            sa.Column("hour", sa.Integer(), primary_key=True),
+            sa.Column("shard", sa.Integer(), primary_key=True),
+            sa.Column("value", sa.BigInteger(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("activity_rollups")
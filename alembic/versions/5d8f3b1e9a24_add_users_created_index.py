@@ -0,0 +1,27 @@
+"""add (created_at, id) index on users for keyset pagination
+
+Revision ID: 5d8f3b1e9a24
+Revises: e4b27a9c6f13
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8f3b1e9a24'
+down_revision: Union[str, Sequence[str], None] = 'e4b27a9c6f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_users_created_id", "users", ["created_at", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_created_id", table_name="users")
@@ -0,0 +1,58 @@
+"""ON DELETE CASCADE on every foreign key to users
+
+Revision ID: 7c3a9e1f5d62
+Revises: 2a7e5c9d1b38
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3a9e1f5d62'
+down_revision: Union[str, Sequence[str], None] = '2a7e5c9d1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_FOREIGN_KEYS = [
+    ("todos", "owner_id"),
+    ("todo_tombstones", "owner_id"),
+    ("user_sessions", "user_id"),
+    ("login_attempts", "user_id"),
+]
+# SQLite foreign keys are unnamed; batch mode needs a name to drop them by
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_foreign_key(table: str, column: str, ondelete: Union[str, None]) -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = [fk for fk in inspector.get_foreign_keys(table)
+                if fk["constrained_columns"] == [column] and fk["referred_table"] == "users"]
+    if existing and (existing[0].get("options", {}).get("ondelete") or None) == ondelete:
+        return
+    if op.get_bind().dialect.name == "sqlite":
+        name = NAMING_CONVENTION["fk"] % {"table_name": table, "column_0_name": column, "referred_table_name": "users"}
+        with op.batch_alter_table(table, recreate="always", naming_convention=NAMING_CONVENTION) as batch_op:
+            if existing:
+                batch_op.drop_constraint(name, type_="foreignkey")
+            batch_op.create_foreign_key(name, "users", [column], ["id"], ondelete=ondelete)
+    else:
+        name = existing[0]["name"] if existing else f"{table}_{column}_fkey"
+        if existing:
+            op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, "users", [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in USER_FOREIGN_KEYS:
+        _replace_foreign_key(table, column, "CASCADE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in USER_FOREIGN_KEYS:
+        _replace_foreign_key(table, column, None)
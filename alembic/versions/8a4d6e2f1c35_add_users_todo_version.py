@@ -0,0 +1,31 @@
+"""add users.todo_version for todo ETags
+
+Revision ID: 8a4d6e2f1c35
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4d6e2f1c35'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a9b7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+    if "todo_version" not in columns:
+        op.add_column("users", sa.Column("todo_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("todo_version")
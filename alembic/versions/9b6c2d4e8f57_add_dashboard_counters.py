@@ -0,0 +1,34 @@
+"""add dashboard_counters for incrementally maintained admin dashboard counts
+
+Revision ID: 9b6c2d4e8f57
+Revises: 5d8f3b1e9a24
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b6c2d4e8f57'
+down_revision: Union[str, Sequence[str], None] = '5d8f3b1e9a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema. The counters are filled by the scheduler on its first startup after this."""
+    if not sa.inspect(op.get_bind()).has_table("dashboard_counters"):
+        op.create_table(
+            "dashboard_counters",
+            sa.Column("name", sa.String(32), primary_key=True),
+            sa.Column("shard", sa.Integer(), primary_key=True),
+            sa.Column("value", sa.BigInteger(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("dashboard_counters")
@@ -0,0 +1,42 @@
+"""add report_jobs for background admin reports
+
+Revision ID: b5f2c8e6a417
+Revises: 4e8b1d7a3c90
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f2c8e6a417'
+down_revision: Union[str, Sequence[str], None] = '4e8b1d7a3c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("report_jobs"):
+        op.create_table(
+            "report_jobs",
+            sa.Column("id", sa.String(32), primary_key=True),
+            sa.Column("kind", sa.String(32), nullable=False),
+            sa.Column("format", sa.String(8), nullable=False),
+            sa.Column("status", sa.String(16), nullable=False),
+            sa.Column("requested_by", sa.Integer(), sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+            sa.Column("rows_written", sa.Integer(), nullable=False),
+            sa.Column("rows_total", sa.Integer()),
+            sa.Column("error", sa.String(255)),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("finished_at", sa.DateTime(timezone=True)),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("report_jobs")
@@ -0,0 +1,53 @@
+"""add todos.updated_at/row_version and todo_tombstones for delta sync
+
+Revision ID: c7e91b04d2a8
+Revises: 8a4d6e2f1c35
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e91b04d2a8'
+down_revision: Union[str, Sequence[str], None] = '8a4d6e2f1c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("todos")}
+    if "updated_at" not in columns:
+        op.add_column("todos", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+        op.execute("UPDATE todos SET updated_at = created_at")
+    if "row_version" not in columns:
+        op.add_column("todos", sa.Column("row_version", sa.Integer(), nullable=False, server_default="0"))
+    op.create_index("ix_todos_owner_row_version", "todos", ["owner_id", "row_version"], if_not_exists=True)
+
+    if not inspector.has_table("todo_tombstones"):
+        op.create_table(
+            "todo_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("todo_id", sa.Integer(), nullable=False),
+            sa.Column("row_version", sa.Integer(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+    op.create_index("ix_todo_tombstones_id", "todo_tombstones", ["id"], if_not_exists=True)
+    op.create_index("ix_todo_tombstones_deleted_at", "todo_tombstones", ["deleted_at"], if_not_exists=True)
+    op.create_index("ix_todo_tombstones_owner_row_version", "todo_tombstones", ["owner_id", "row_version"],
+                    if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("todo_tombstones")
+    op.drop_index("ix_todos_owner_row_version", table_name="todos")
+    with op.batch_alter_table("todos") as batch_op:
+        batch_op.drop_column("row_version")
+        batch_op.drop_column("updated_at")
@@ -0,0 +1,45 @@
+"""add full-text search index over todo titles and descriptions
+
+Revision ID: e4b27a9c6f13
+Revises: c7e91b04d2a8
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import TODO_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b27a9c6f13'
+down_revision: Union[str, Sequence[str], None] = 'c7e91b04d2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        indexed = sa.inspect(op.get_bind()).has_table("todos_fts")
+    for statement in TODO_SEARCH_DDL.get(dialect, []):
+        op.execute(statement)
+    if dialect == "sqlite" and not indexed:
+        # PostgreSQL fills the generated column itself; FTS5 needs a backfill
+        op.execute(
+            "INSERT INTO todos_fts (rowid, title, description, owner) "
+            "SELECT id, title, coalesce(description, ''), 'u' || owner_id FROM todos"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS todos_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_todos_search_vector")
+        op.execute("ALTER TABLE todos DROP COLUMN IF EXISTS search_vector")
@@ -4,8 +4,10 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from . import crud, models
-from .database import get_db
+from .passwords import hasher
+from .database import get_db, SessionLocal
 from .rate_limit import RateLimiter, SessionManager, get_client_ip, get_user_agent
+from .principal_cache import principal_cache, CachedUser, CachedSession
 from pydantic import BaseModel
 from typing import Optional
 
@@ -16,14 +18,26 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-def authenticate_user(db: Session, username: str, password: str):
+def verify_credentials(db: Session, username: str, password: str) -> tuple[Optional[models.User], Optional[str]]:
+    """Check a username/password pair without writing anything.
+
+    Returns the user (or None) and, when the stored hash uses an outdated cost,
+    a replacement hash for the caller to persist.
+    """
     user = crud.get_user_by_username(db, username)
     if not user:
-        return None
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    if not pwd_context.verify(password, user.hashed_password):
-        return None
+        return None, None
+    verified, new_hash = hasher.verify(password, user.hashed_password)
+    if not verified:
+        return None, None
+    return user, new_hash
+
+def authenticate_user(db: Session, username: str, password: str):
+    user, new_hash = verify_credentials(db, username, password)
+    if user and new_hash:
+        # Stored hash uses an outdated cost, upgrade it while we have the password
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
 def create_access_token(*, data: dict, session_token: str, expires_delta: timedelta | None = None):
@@ -41,6 +55,19 @@ def create_access_token(*, data: dict, session_token: str, expires_delta: timede
     return encoded
 
 def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    return resolve_token_user(db, token)
+
+def authenticate_token(token: str) -> CachedUser:
+    """resolve_token_user with a short-lived DB session, for long-lived streams
+    that must not hold a pooled connection open"""
+    db = SessionLocal()
+    try:
+        return resolve_token_user(db, token)
+    finally:
+        db.close()
+
+def resolve_token_user(db: Session, token: str) -> CachedUser:
+    """Resolve a bearer token to its user; raises 401/403 HTTPExceptions like get_current_user"""
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                           detail="Could not validate credentials",
                                           headers={"WWW-Authenticate": "Bearer"})
@@ -55,6 +82,16 @@ def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db:
     except JWTError:
         raise credentials_exception
     
+    # Serve repeat requests for the same session from the principal cache
+    cached = principal_cache.get(session_token)
+    if cached:
+        user, session = cached
+        if user.username == username and SessionManager.touch_session(session.id, session.expires_at):
+            return user
+        principal_cache.invalidate(session_token)
+    # A deactivate or demote committed after this point must not be cached over
+    generation = principal_cache.generation()
+    
     # Validate session
     session = SessionManager.validate_session(db, session_token)
     if not session:
@@ -72,9 +109,21 @@ def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db:
     if session.user_id != user.id:
         raise credentials_exception
     
+    # Return a detached snapshot so cached and uncached requests look the same
+    user = CachedUser.from_model(user)
+    principal_cache.put(session_token, user, CachedSession.from_model(session), generation)
     return user
 
-def get_current_active_admin(current_user: models.User = Depends(get_current_user)):
+def get_current_active_admin(current_user: CachedUser = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
+
+def get_streaming_user(token: str = Depends(oauth2_scheme)) -> CachedUser:
+    """get_current_user for long-lived responses: the DB session is closed before the body is sent"""
+    return authenticate_token(token)
+
+def get_streaming_admin(current_user: CachedUser = Depends(get_streaming_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
     return current_user
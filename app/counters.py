@@ -0,0 +1,160 @@
+"""
+Dashboard counters kept up to date by the user and todo write paths.
+
+Each count is split over COUNTER_SHARDS rows keyed by user id, so concurrent
+writers for different users rarely wait on the same row lock. Writers add
+their deltas in the transaction that makes the change; reading a count sums
+a fixed number of rows. reconcile() rebuilds everything from the real tables
+to correct drift from writes that bypass crud; with several workers only one
+of them does so per COUNTER_RECONCILE_SECONDS.
+"""
+import os
+import time
+from datetime import datetime, date, timedelta, timezone
+from typing import Optional, Iterable
+from sqlalchemy import select, delete, insert, func, literal, true, or_, and_, String, cast, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import models
+
+COUNTER_SHARDS = int(os.getenv("DASHBOARD_COUNTER_SHARDS", "16"))
+# Daily signup counters older than this are dropped by reconcile()
+SIGNUP_COUNTER_DAYS = int(os.getenv("SIGNUP_COUNTER_DAYS", "30"))
+COUNTER_RECONCILE_SECONDS = float(os.getenv("COUNTER_RECONCILE_SECONDS", "3600"))
+# PostgreSQL advisory lock key shared by every worker, so only one reconciles at a time
+RECONCILE_LOCK_KEY = 7305183
+# Unix time of the last reconcile, stored beside the counters (read() never sums it)
+RECONCILED_AT = "reconciled_at"
+
+TOTAL_COUNTERS = ("users", "active_users", "admin_users", "todos", "completed_todos")
+SIGNUP_PREFIX = "signups:"
+_SIGNUP_END = "signups;"  # sorts right after every "signups:..." key
+
+def signup_counter(day: date) -> str:
+    return f"{SIGNUP_PREFIX}{day.isoformat()}"
+
+def _utc_day(created_at: Optional[datetime]) -> date:
+    if created_at is None:
+        return datetime.utcnow().date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+def user_deltas(is_active: bool, is_admin: bool, created_at: Optional[datetime], sign: int = 1) -> dict[str, int]:
+    """Counter changes for adding (sign=1) or removing (sign=-1) one user"""
+    return {
+        "users": sign,
+        "active_users": sign if is_active else 0,
+        "admin_users": sign if is_admin else 0,
+        signup_counter(_utc_day(created_at)): sign
+    }
+
+def add(db: Session, user_id: int, deltas: dict[str, int]):
+    """Add deltas to the counters in the current transaction (the caller commits)"""
+    add_many(db, [(user_id, deltas)])
+
+def add_many(db: Session, changes: Iterable[tuple[int, dict[str, int]]]):
+    """add() for many users at once: (user_id, deltas) pairs, summed per counter row in one statement"""
+    summed: dict[tuple[str, int], int] = {}
+    for user_id, deltas in changes:
+        for name, delta in deltas.items():
+            key = (name, user_id % COUNTER_SHARDS)
+            summed[key] = summed.get(key, 0) + delta
+    rows = [{"name": name, "shard": shard, "value": delta}
+            for (name, shard), delta in sorted(summed.items()) if delta]
+    if not rows:
+        return
+    table = models.DashboardCounter.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.name, table.c.shard],
+        set_={"value": table.c.value + statement.excluded.value}
+    )
+    db.execute(statement, rows)
+
+def read(db: Session, signups_since: date) -> dict[str, int]:
+    """Every total plus "signups", the users created on or after signups_since"""
+    table = models.DashboardCounter.__table__
+    rows = db.execute(
+        select(table.c.name, func.sum(table.c.value)).where(or_(
+            table.c.name.in_(TOTAL_COUNTERS),
+            and_(table.c.name >= signup_counter(signups_since), table.c.name < _SIGNUP_END)
+        )).group_by(table.c.name)
+    )
+    counts = dict.fromkeys(TOTAL_COUNTERS, 0)
+    counts["signups"] = 0
+    for name, value in rows:
+        key = "signups" if name.startswith(SIGNUP_PREFIX) else name
+        counts[key] += int(value or 0)
+    return counts
+
+def _signup_day(db: Session, column):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(func.timezone("UTC", column), "YYYY-MM-DD")
+    return cast(func.date(column), String)
+
+def _actual_counts(db: Session) -> list:
+    """SELECTs producing (name, shard, value) rows from the real tables"""
+    users = models.User.__table__
+    todos = models.Todo.__table__
+    user_shard = users.c.id % COUNTER_SHARDS
+    owner_shard = func.coalesce(todos.c.owner_id, 0) % COUNTER_SHARDS
+
+    def counted(name, shard, *where):
+        return select(literal(name), shard, func.count()).where(*where).group_by(shard)
+
+    signup_day = _signup_day(db, users.c.created_at)
+    signups_since = datetime.utcnow() - timedelta(days=SIGNUP_COUNTER_DAYS)
+    return [
+        counted("users", user_shard),
+        counted("active_users", user_shard, users.c.is_active == true()),
+        counted("admin_users", user_shard, users.c.is_admin == true()),
+        counted("todos", owner_shard).select_from(todos),
+        counted("completed_todos", owner_shard, todos.c.completed == true()),
+        select(literal(SIGNUP_PREFIX, String) + signup_day, user_shard, func.count())
+        .where(users.c.created_at >= signups_since).group_by(signup_day, user_shard)
+    ]
+
+def is_empty(db: Session) -> bool:
+    """True until the first reconcile, e.g. right after the migration that adds the table"""
+    table = models.DashboardCounter.__table__
+    return db.scalar(select(table.c.name).limit(1)) is None
+
+def reconcile(db: Session, skip_if_newer_than: Optional[float] = None) -> Optional[dict[str, int]]:
+    """Rebuild every counter from the real tables; returns the drift that was corrected per total.
+
+    Runs in one transaction that keeps writers out while it counts (an
+    EXCLUSIVE table lock on PostgreSQL, the write lock taken by the first
+    DELETE on SQLite), so concurrent writes are neither lost nor counted twice.
+    On PostgreSQL it returns None without counting while another worker holds
+    the reconcile lock, and with skip_if_newer_than also when the last
+    reconcile finished fewer than that many seconds ago.
+    """
+    table = models.DashboardCounter.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        if not db.scalar(select(func.pg_try_advisory_xact_lock(RECONCILE_LOCK_KEY))):
+            db.rollback()
+            return None
+    if skip_if_newer_than is not None:
+        last = db.scalar(select(func.max(table.c.value)).where(table.c.name == RECONCILED_AT))
+        if last is not None and time.time() - last < skip_if_newer_than:
+            db.rollback()
+            return None
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE dashboard_counters IN EXCLUSIVE MODE"))
+    before = {}
+    for name, value in db.execute(delete(table).returning(table.c.name, table.c.value)):
+        before[name] = before.get(name, 0) + value
+    for query in _actual_counts(db):
+        db.execute(insert(table).from_select(["name", "shard", "value"], query))
+    db.execute(insert(table).values(name=RECONCILED_AT, shard=0, value=int(time.time())))
+    after = dict(db.execute(select(table.c.name, func.sum(table.c.value))
+                            .where(table.c.name.in_(TOTAL_COUNTERS)).group_by(table.c.name)).all())
+    db.commit()
+    drift = {}
+    for name in TOTAL_COUNTERS:
+        difference = int(after.get(name) or 0) - before.get(name, 0)
+        if difference:
+            drift[name] = difference
+    return drift
@@ -1,9 +1,15 @@
+import io
+import os
+import csv
+import json
 from sqlalchemy.orm import Session
-from . import models
-from passlib.context import CryptContext
-from typing import Optional
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from sqlalchemy import select, insert, update, delete, bindparam, literal, not_, true, func, case, text
+from . import models, search, counters, rollups
+from .passwords import hasher
+from .todo_versions import todo_versions
+from .pagination import timestamp_key, timestamp_param, timestamp_cursor_value, keyset_after, encode_cursor, decode_cursor
+from datetime import datetime
+from typing import Optional, Iterator
 
 # User helpers
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
@@ -13,47 +19,667 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
 def create_user(db: Session, username: str, email: str, password: str) -> models.User:
-    hashed = pwd_context.hash(password)
+    hashed = hasher.hash(password)
     user = models.User(username=username, email=email, hashed_password=hashed, is_active=False, is_admin=False)
     db.add(user)
+    db.flush()
+    counters.add(db, user.id, counters.user_deltas(False, False, None))
+    rollups.add(db, user.id, {"signups": 1})
     db.commit()
     db.refresh(user)
     return user
 
-def activate_user(db: Session, user: models.User):
-    user.is_active = True
+def update_user_flags(db: Session, user: models.User, *, is_active: Optional[bool] = None,
+                      is_admin: Optional[bool] = None) -> models.User:
+    """Set is_active/is_admin and adjust the dashboard counters in the same commit"""
+    deltas = {}
+    if is_active is not None and bool(user.is_active) != is_active:
+        user.is_active = is_active
+        deltas["active_users"] = 1 if is_active else -1
+    if is_admin is not None and bool(user.is_admin) != is_admin:
+        user.is_admin = is_admin
+        deltas["admin_users"] = 1 if is_admin else -1
+    counters.add(db, user.id, deltas)
     db.commit()
     db.refresh(user)
     return user
 
+def activate_user(db: Session, user: models.User):
+    return update_user_flags(db, user, is_active=True)
+
 def promote_user_to_admin(db: Session, user: models.User):
-    user.is_admin = True
+    return update_user_flags(db, user, is_admin=True)
+
+def get_user_rows(db: Session) -> list[dict]:
+    """Every user as a UserOut-shaped dict, newest first, read as plain rows"""
+    users = models.User.__table__
+    query = select(*(users.c[name] for name in USER_OUT_FIELDS)).order_by(users.c.created_at.desc())
+    return _row_dicts(db.execute(query), USER_OUT_FIELDS)
+
+# Plain-row reads: select just the response columns and build dicts from the
+# tuples, skipping ORM identity-map bookkeeping and response_model revalidation
+USER_OUT_FIELDS = tuple(models.UserOut.model_fields)
+TODO_OUT_FIELDS = tuple(models.TodoOut.model_fields)
+
+ADMIN_TODO_FIELDS = TODO_OUT_FIELDS + ("created_at", "owner_username", "owner_email")
+
+def get_admin_todo_rows(db: Session, *, user_id: Optional[int] = None, completed: Optional[bool] = None,
+                        limit: int = 100, offset: int = 0, cursor: Optional[str] = None,
+                        fields: tuple[str, ...] = ADMIN_TODO_FIELDS) -> tuple[list[dict], Optional[str]]:
+    """One page of todos across all users, newest first, with the requested ADMIN_TODO_FIELDS.
+
+    Pages are keyset on (created_at, id), served by ix_todos_created_id (or
+    ix_todos_owner_created_id with user_id), so a deep page costs the same as
+    the first; offset is still honoured for older clients. users is only
+    joined when an owner_* field is requested. Returns the rows and the next
+    page's cursor (None on the last page).
+    """
+    todos = models.Todo.__table__
+    users = models.User.__table__
+    owner_columns = {
+        "owner_username": users.c.username.label("owner_username"),
+        "owner_email": users.c.email.label("owner_email")
+    }
+    created_key = timestamp_key(db, todos.c.created_at)
+    query = select(*(owner_columns[name] if name in owner_columns else todos.c[name] for name in fields),
+                   todos.c.id.label("cursor_id"), created_key.label("sort_key"))
+    if owner_columns.keys() & set(fields):
+        query = query.select_from(todos.join(users, todos.c.owner_id == users.c.id))
+    else:
+        query = query.select_from(todos)
+    query = query.where(*_admin_todo_filters(user_id, completed))
+    if cursor:
+        created_value, todo_id = decode_cursor(cursor, str, int)
+        query = query.where(keyset_after(created_key, todos.c.id,
+                                         timestamp_param(db, created_value), todo_id, descending=True))
+    query = query.order_by(created_key.desc(), todos.c.id.desc()).offset(offset).limit(limit + 1)
+    rows = db.execute(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(timestamp_cursor_value(last.sort_key), last.cursor_id)
+    return _row_dicts(rows, fields), next_cursor
+
+def _admin_todo_filters(user_id: Optional[int], completed: Optional[bool]) -> list:
+    todos = models.Todo.__table__
+    filters = []
+    if user_id:
+        filters.append(todos.c.owner_id == user_id)
+    if completed is not None:
+        filters.append(todos.c.completed == completed)
+    return filters
+
+def count_admin_todos(db: Session, *, user_id: Optional[int] = None, completed: Optional[bool] = None,
+                      exact: bool = False) -> tuple[Optional[int], bool]:
+    """How many todos match the admin filters, as (count, estimated).
+
+    exact=True always runs the COUNT. Otherwise totals the dashboard counters
+    already hold are read from them, and per-user counts on PostgreSQL come
+    from the planner's row estimate instead of scanning the user's todos.
+    """
+    todos = models.Todo.__table__
+    if not exact and not user_id:
+        counts = counters.read(db, datetime.utcnow().date())
+        if completed is None:
+            return counts["todos"], False
+        return (counts["completed_todos"] if completed else counts["todos"] - counts["completed_todos"]), False
+    filters = _admin_todo_filters(user_id, completed)
+    if not exact and db.get_bind().dialect.name == "postgresql":
+        return _planner_row_estimate(db, select(todos.c.id).where(*filters)), True
+    return db.scalar(select(func.count()).select_from(todos).where(*filters)), False
+
+def _planner_row_estimate(db: Session, query) -> int:
+    compiled = query.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+USER_STATS_FIELDS = ("id", "username", "email", "is_active", "is_admin", "created_at",
+                     "todo_count", "completed_count", "pending_count", "completion_rate")
+USER_COUNT_FIELDS = {"todo_count", "completed_count", "pending_count", "completion_rate"}
+
+def get_user_stats_rows(db: Session, *, prefix: Optional[str] = None, cursor: Optional[str] = None,
+                        limit: Optional[int] = None,
+                        fields: tuple[str, ...] = USER_STATS_FIELDS) -> tuple[list[dict], Optional[str]]:
+    """One page of users, newest first, with their todo statistics, in a single query.
+
+    The page of users is picked first (prefix filter on username or email,
+    keyset on (created_at, id) via ix_users_created_id) and only those users
+    are LEFT JOINed to todos and grouped, so the cost follows the page size
+    rather than the number of users. todos is not touched at all when no count
+    field is requested. Returns the rows and the next page's cursor.
+    """
+    users = models.User.__table__
+    todos = models.Todo.__table__
+    created_key = timestamp_key(db, users.c.created_at)
+    user_fields = [name for name in fields if name not in USER_COUNT_FIELDS]
+    page = select(*(users.c[name] for name in user_fields), users.c.id.label("cursor_id"),
+                  created_key.label("sort_key"))
+    if prefix:
+        page = page.where(users.c.username.startswith(prefix, autoescape=True)
+                          | users.c.email.startswith(prefix, autoescape=True))
+    if cursor:
+        created_value, user_id = decode_cursor(cursor, str, int)
+        page = page.where(keyset_after(created_key, users.c.id,
+                                       timestamp_param(db, created_value), user_id, descending=True))
+    page = page.order_by(created_key.desc(), users.c.id.desc())
+    if limit is not None:
+        page = page.limit(limit + 1)
+
+    with_counts = not USER_COUNT_FIELDS.isdisjoint(fields)
+    if with_counts:
+        page = page.subquery()
+        query = (
+            select(*page.c, func.count(todos.c.id).label("todo_count"),
+                   func.coalesce(func.sum(case((todos.c.completed == true(), 1), else_=0)), 0).label("completed_count"))
+            .select_from(page.outerjoin(todos, todos.c.owner_id == page.c.cursor_id))
+            .group_by(*page.c)
+            .order_by(page.c.sort_key.desc(), page.c.cursor_id.desc())
+        )
+    else:
+        query = page
+    rows = db.execute(query).all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(timestamp_cursor_value(last.sort_key), last.cursor_id)
+
+    result = []
+    for row in rows:
+        stats = {name: getattr(row, name) for name in user_fields}
+        if with_counts:
+            todo_count, completed_count = row.todo_count, row.completed_count
+            stats.update({
+                "todo_count": todo_count,
+                "completed_count": completed_count,
+                "pending_count": todo_count - completed_count,
+                "completion_rate": round((completed_count / todo_count * 100) if todo_count > 0 else 0, 1)
+            })
+        result.append({name: stats[name] for name in fields})
+    return result, next_cursor
+
+def _row_dicts(rows, fields: tuple) -> list[dict]:
+    # zip stops at the last field, dropping trailing helper columns such as sort keys
+    return [dict(zip(fields, row)) for row in rows]
+
+def delete_user(db: Session, user_id: int) -> Optional[str]:
+    """Delete a user with their todos, sessions and login history; returns the username, None if missing.
+
+    A single DELETE on users: the database removes the rest through
+    ON DELETE CASCADE instead of the ORM loading every child row.
+    """
+    deleted, _, _ = _delete_users(db, [user_id])
+    if not deleted:
+        db.rollback()
+        return None
     db.commit()
-    db.refresh(user)
-    return user
+    return deleted[0].username
+
+def _delete_users(db: Session, user_ids: list[int]) -> tuple[list, int, int]:
+    """DELETE the users (children cascade) after settling the counters and search index.
+
+    Returns the deleted rows, how many active sessions went with them and how
+    many todos.
+    """
+    users = models.User.__table__
+    todos = models.Todo.__table__
+    sessions = models.UserSession.__table__
+    owned = (select(todos.c.owner_id, func.count(), func.coalesce(func.sum(case((todos.c.completed == true(), 1), else_=0)), 0))
+             .where(todos.c.owner_id.in_(user_ids)).group_by(todos.c.owner_id))
+    owned = db.execute(owned).all()
+    changes = [(owner_id, {"todos": -count, "completed_todos": -completed}) for owner_id, count, completed in owned]
+    revoked = db.scalar(select(func.count()).select_from(sessions)
+                        .where(sessions.c.user_id.in_(user_ids), sessions.c.is_active == true()))
+    search.unindex_owners(db, user_ids)
+    deleted = db.execute(delete(users).where(users.c.id.in_(user_ids))
+                         .returning(users.c.id, users.c.username, users.c.is_active, users.c.is_admin,
+                                    users.c.created_at)).all()
+    changes += [(row.id, counters.user_deltas(row.is_active, row.is_admin, row.created_at, sign=-1)) for row in deleted]
+    counters.add_many(db, changes)
+    return deleted, revoked, sum(count for _, count, _ in owned)
+
+# Admin bulk user operations
+BULK_USER_CHUNK_SIZE = int(os.getenv("BULK_USER_CHUNK_SIZE", "500"))
+BULK_USER_FLAGS = {
+    "promote": ("is_admin", True),
+    "demote": ("is_admin", False),
+    "activate": ("is_active", True),
+    "deactivate": ("is_active", False)
+}
+
+def bulk_user_conditions(*, is_active: Optional[bool] = None, is_admin: Optional[bool] = None,
+                         created_before: Optional[datetime] = None,
+                         created_after: Optional[datetime] = None) -> list:
+    users = models.User.__table__
+    conditions = []
+    if is_active is not None:
+        conditions.append(users.c.is_active == is_active)
+    if is_admin is not None:
+        conditions.append(users.c.is_admin == is_admin)
+    if created_before is not None:
+        conditions.append(users.c.created_at < created_before)
+    if created_after is not None:
+        conditions.append(users.c.created_at >= created_after)
+    return conditions
+
+def bulk_user_action(db: Session, action: str, *, ids: Optional[list[int]] = None, conditions: list = (),
+                     exclude_id: Optional[int] = None,
+                     chunk_size: int = BULK_USER_CHUNK_SIZE) -> tuple[dict, list[int]]:
+    """Apply a BULK_USER_FLAGS action or "delete" to the given user ids, or to every user matching conditions.
+
+    Works through the users in chunks of chunk_size ids, each its own
+    transaction with one set-based UPDATE or DELETE (children cascade) that also
+    revokes the affected sessions and adjusts the dashboard counters. Users
+    already in the requested state are left alone and not counted. Returns the
+    totals and the ids that changed, for cache invalidation.
+    """
+    totals = {"affected": 0, "sessions_revoked": 0, "todos_deleted": 0}
+    changed_ids = []
+    for chunk in _user_id_chunks(db, ids, conditions, exclude_id, chunk_size):
+        if action == "delete":
+            chunk_ids, sessions, todos = _delete_user_chunk(db, chunk)
+            totals["todos_deleted"] += todos
+        else:
+            column, value = BULK_USER_FLAGS[action]
+            chunk_ids, sessions = _flag_user_chunk(db, chunk, column, value)
+        db.commit()
+        totals["affected"] += len(chunk_ids)
+        totals["sessions_revoked"] += sessions
+        changed_ids.extend(chunk_ids)
+    return totals, changed_ids
+
+def _user_id_chunks(db: Session, ids: Optional[list[int]], conditions: list, exclude_id: Optional[int],
+                    chunk_size: int) -> Iterator[list[int]]:
+    """Explicit ids in order, or the matching users' ids read one keyset page at a time"""
+    if ids is not None:
+        ids = sorted(set(ids) - {exclude_id})
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+        return
+    users = models.User.__table__
+    query = select(users.c.id).where(*conditions).order_by(users.c.id).limit(chunk_size)
+    if exclude_id is not None:
+        query = query.where(users.c.id != exclude_id)
+    last_id = 0
+    while True:
+        chunk = list(db.scalars(query.where(users.c.id > last_id)))
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+def _flag_user_chunk(db: Session, chunk: list[int], column: str, value: bool) -> tuple[list[int], int]:
+    users = models.User.__table__
+    sessions = models.UserSession.__table__
+    changed = list(db.scalars(
+        update(users).where(users.c.id.in_(chunk), users.c[column] != value)
+        .values({column: value}).returning(users.c.id)
+    ))
+    counter = "active_users" if column == "is_active" else "admin_users"
+    counters.add_many(db, ((user_id, {counter: 1 if value else -1}) for user_id in changed))
+    revoked = 0
+    if changed and column == "is_active" and not value:
+        revoked = db.execute(update(sessions).where(sessions.c.user_id.in_(changed), sessions.c.is_active == true())
+                             .values(is_active=False)).rowcount
+    return changed, revoked
+
+def _delete_user_chunk(db: Session, chunk: list[int]) -> tuple[list[int], int, int]:
+    deleted, revoked, todos_deleted = _delete_users(db, chunk)
+    return [row.id for row in deleted], revoked, todos_deleted
 
 # Todo helpers
+def bump_todo_version(db: Session, owner_id: int) -> int:
+    """Advance the owner's todo version inside the current transaction.
+
+    Every write to a user's todos must call this before committing (and then
+    commit through commit_todo_changes) so ETags derived from it stay valid.
+    """
+    return db.execute(_todo_version_bump(owner_id)).scalar_one()
+
+def _todo_version_bump(owner_id: int):
+    users = models.User.__table__
+    return (update(users).where(users.c.id == owner_id)
+            .values(todo_version=users.c.todo_version + 1)
+            .returning(users.c.todo_version))
+
+def commit_todo_changes(db: Session, owner_id: int, version: int, todos: int = 0, completed: int = 0,
+                        created: int = 0, completions: int = 0):
+    """Update the search index, counters and rollups, commit, then publish the new version to this process's cache.
+
+    todos and completed are how much the write changed the owner's todo and
+    completed todo counts; created and completions count the todos it added
+    and the ones it marked completed, for the activity rollups.
+    """
+    db.flush()
+    search.sync_todo_version(db, owner_id, version)
+    counters.add(db, owner_id, {"todos": todos, "completed_todos": completed})
+    rollups.add(db, owner_id, {"todos_created": created, "todos_completed": completions})
+    db.commit()
+    todo_versions.record(owner_id, version)
+
 def create_todo(db: Session, owner_id: int, title: str, description: str):
-    todo = models.Todo(title=title, description=description, owner_id=owner_id)
+    version = bump_todo_version(db, owner_id)
+    todo = models.Todo(title=title, description=description, owner_id=owner_id, row_version=version)
     db.add(todo)
-    db.commit()
+    commit_todo_changes(db, owner_id, version, todos=1, created=1)
     db.refresh(todo)
     return todo
 
-def get_todos_for_user(db: Session, owner_id: int):
-    return db.query(models.Todo).filter(models.Todo.owner_id == owner_id).all()
+def insert_todo_rows(db: Session, owner_id: int, rows: list[dict]) -> int:
+    """Bulk-insert validated todo rows (title, description, completed) in one transaction.
+
+    Uses COPY on PostgreSQL and an executemany INSERT elsewhere. All rows get
+    the same new row_version. Returns that version.
+    """
+    version = bump_todo_version(db, owner_id)
+    rows = [dict(row, owner_id=owner_id, row_version=version) for row in rows]
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_todo_rows(db, rows)
+    else:
+        db.execute(insert(models.Todo.__table__), rows)
+    completed = sum(bool(row["completed"]) for row in rows)
+    commit_todo_changes(db, owner_id, version, todos=len(rows), completed=completed,
+                        created=len(rows), completions=completed)
+    return version
+
+def _copy_todo_rows(db: Session, rows: list[dict]):
+    columns = ("title", "description", "completed", "owner_id", "row_version")
+    buffer = io.StringIO()
+    # Quoted so empty descriptions stay empty strings rather than NULL
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows([row[column] for column in columns] for row in rows)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY todos ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+def get_todos_for_user(db: Session, owner_id: int, *, completed: Optional[bool] = None,
+                       created_after: Optional[datetime] = None, created_before: Optional[datetime] = None,
+                       descending: bool = True, cursor: Optional[str] = None,
+                       limit: Optional[int] = None,
+                       fields: Optional[tuple[str, ...]] = None) -> tuple[list[dict], Optional[str]]:
+    """One page of a user's todos ordered by (created_at, id), served by ix_todos_owner_created_id.
+
+    Returns dicts with the requested TodoOut fields (all by default) read as
+    plain rows (no ORM objects) and the cursor for the next page (None on the
+    last page). Without a limit every matching todo is returned.
+    """
+    todos = models.Todo.__table__
+    fields = fields or TODO_OUT_FIELDS
+    created_key = timestamp_key(db, todos.c.created_at)
+    # The cursor needs the id and sort key even when they are not returned
+    query = select(*(todos.c[name] for name in fields), todos.c.id.label("cursor_id"),
+                   created_key.label("sort_key")).where(todos.c.owner_id == owner_id)
+    if completed is not None:
+        query = query.where(todos.c.completed == completed)
+    if created_after is not None:
+        query = query.where(todos.c.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(todos.c.created_at < created_before)
+    if cursor:
+        created_value, todo_id = decode_cursor(cursor, str, int)
+        query = query.where(keyset_after(created_key, todos.c.id,
+                                         timestamp_param(db, created_value), todo_id, descending))
+
+    if descending:
+        query = query.order_by(created_key.desc(), todos.c.id.desc())
+    else:
+        query = query.order_by(created_key, todos.c.id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = db.execute(query).all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(timestamp_cursor_value(last.sort_key), last.cursor_id)
+    return _row_dicts(rows, fields), next_cursor
+
+def get_todo_changes(db: Session, owner_id: int, since_version: int) -> tuple[list[models.Todo], list[int], int]:
+    """Todos written and ids deleted after since_version, plus the version they bring the client to.
+
+    Both lookups are range scans on (owner_id, row_version), so the cost follows
+    the number of changes rather than the size of the list. The upper bound is
+    read first: versions are allocated under the users row lock, so everything
+    up to a committed version is itself committed.
+    """
+    current_version = db.scalar(select(models.User.todo_version).where(models.User.id == owner_id)) or 0
+    todos = list(db.scalars(
+        select(models.Todo).where(
+            models.Todo.owner_id == owner_id,
+            models.Todo.row_version > since_version,
+            models.Todo.row_version <= current_version
+        ).order_by(models.Todo.row_version, models.Todo.id)
+    ))
+    deleted = list(db.scalars(
+        select(models.TodoTombstone.todo_id).where(
+            models.TodoTombstone.owner_id == owner_id,
+            models.TodoTombstone.row_version > since_version,
+            models.TodoTombstone.row_version <= current_version
+        ).order_by(models.TodoTombstone.row_version)
+    ))
+    return todos, deleted, current_version
+
+def purge_todo_tombstones(db: Session, older_than: datetime) -> int:
+    """Delete tombstones nobody can still need; returns how many were removed"""
+    result = db.execute(delete(models.TodoTombstone).where(models.TodoTombstone.deleted_at < older_than))
+    db.commit()
+    return result.rowcount
 
 def get_todo_by_id(db: Session, todo_id: int):
     return db.query(models.Todo).filter(models.Todo.id == todo_id).first()
 
-def update_todo(db: Session, todo: models.Todo, **fields):
-    for k, v in fields.items():
-        setattr(todo, k, v)
-    db.commit()
-    db.refresh(todo)
-    return todo
+def update_owned_todo(db: Session, owner_id: int, todo_id: int, *, toggle: bool = False, **fields) -> Optional[dict]:
+    """Update one of the owner's todos with a single UPDATE ... WHERE id AND owner_id RETURNING.
+
+    The ownership check is part of the WHERE clause, so a missing or foreign
+    todo matches no row and None is returned. toggle=True flips completed in
+    the database instead of reading it first. On PostgreSQL the version bump
+    is a CTE of the same statement; other dialects run it first. Only an
+    explicit completed value needs the old one (locked) for the counters.
+    """
+    table = models.Todo.__table__
+    values = dict(fields)
+    if toggle:
+        values["completed"] = not_(table.c.completed)
+    postgresql = db.get_bind().dialect.name == "postgresql"
+    # SQLite ignores FOR UPDATE; bumping first takes its write lock before the read
+    version = None if postgresql else bump_todo_version(db, owner_id)
+    was_completed = None
+    if "completed" in values and not toggle:
+        was_completed = db.scalar(select(table.c.completed)
+                                  .where(table.c.id == todo_id, table.c.owner_id == owner_id).with_for_update())
+        if was_completed is None:
+            db.rollback()
+            return None
+    statement = update(table).where(table.c.id == todo_id, table.c.owner_id == owner_id)
+    if postgresql:
+        bumped = _todo_version_bump(owner_id).cte("bumped")
+        statement = statement.add_cte(bumped).values(row_version=select(bumped.c.todo_version).scalar_subquery())
+    else:
+        statement = statement.values(row_version=version)
+    row = db.execute(statement.values(**values).returning(*table.c)).mappings().first()
+    if row is None:
+        db.rollback()
+        return None
+    completed = 0
+    if toggle:
+        completed = 1 if row["completed"] else -1
+    elif was_completed is not None:
+        completed = int(bool(row["completed"])) - int(bool(was_completed))
+    commit_todo_changes(db, owner_id, row["row_version"], completed=completed, completions=max(completed, 0))
+    return dict(row)
+
+def delete_owned_todo(db: Session, owner_id: int, todo_id: int) -> bool:
+    """Delete one of the owner's todos and leave its tombstone; False if it was not theirs.
+
+    Like update_owned_todo, ownership is checked by the DELETE itself and on
+    PostgreSQL the bump, delete and tombstone insert are a single statement.
+    """
+    table = models.Todo.__table__
+    tombstones = models.TodoTombstone.__table__
+    removal = (delete(table).where(table.c.id == todo_id, table.c.owner_id == owner_id)
+               .returning(table.c.id, table.c.completed))
+    if db.get_bind().dialect.name == "postgresql":
+        bumped = _todo_version_bump(owner_id).cte("bumped")
+        removed = removal.cte("removed")
+        tombstoned = insert(tombstones).from_select(
+            ["owner_id", "todo_id", "row_version"],
+            select(literal(owner_id), removed.c.id, bumped.c.todo_version).select_from(removed.join(bumped, true()))
+        ).returning(tombstones.c.row_version).cte("tombstoned")
+        statement = (select(tombstoned.c.row_version, removed.c.completed)
+                     .select_from(tombstoned.join(removed, true())).add_cte(bumped))
+        row = db.execute(statement).first()
+    else:
+        version = bump_todo_version(db, owner_id)
+        removed = db.execute(removal).first()
+        row = None
+        if removed is not None:
+            db.execute(insert(tombstones).values(owner_id=owner_id, todo_id=todo_id, row_version=version))
+            row = (version, removed.completed)
+    if row is None:
+        db.rollback()
+        return False
+    version, was_completed = row
+    commit_todo_changes(db, owner_id, version, todos=-1, completed=-1 if was_completed else 0)
+    return True
 
 def delete_todo(db: Session, todo: models.Todo):
+    owner_id = todo.owner_id
+    version = bump_todo_version(db, owner_id)
+    db.add(models.TodoTombstone(owner_id=owner_id, todo_id=todo.id, row_version=version))
     db.delete(todo)
-    db.commit()
+    commit_todo_changes(db, owner_id, version, todos=-1, completed=-1 if todo.completed else 0)
     return True
+
+def apply_todo_batch(db: Session, owner_id: int, operations: list[models.TodoBatchOperation]) -> list[dict]:
+    """Apply a list of todo operations in one transaction using set-based statements.
+
+    Ownership of every referenced todo is checked with a single query, which
+    also locks those rows (on SQLite the version bump before it takes the
+    write lock instead) and reads their completed flag for the dashboard
+    counters. Operations on the same todo are folded in order into its final
+    change, so the database sees at most one INSERT, one DELETE, one toggle
+    UPDATE and one executemany UPDATE per distinct set of columns. Returns one
+    result dict per operation.
+    """
+    table = models.Todo.__table__
+    referenced = {op.id for op in operations if op.op != "create" and op.id is not None}
+    version = None
+    if referenced and db.get_bind().dialect.name != "postgresql":
+        # SQLite ignores FOR UPDATE; bumping first takes its write lock before the read
+        version = bump_todo_version(db, owner_id)
+    owned = {}  # todo id -> completed before the batch
+    if referenced:
+        owned = dict(db.execute(select(table.c.id, table.c.completed)
+                                .where(table.c.id.in_(referenced), table.c.owner_id == owner_id)
+                                .with_for_update()).all())
+
+    results = []
+    creates = []  # (result, row)
+    changes: dict[int, dict] = {}  # todo id -> {"fields": {...}, "flip": bool, "deleted": bool}
+    for index, op in enumerate(operations):
+        result = {"index": index, "op": op.op, "status": 200, "id": op.id}
+        results.append(result)
+        if op.op == "create":
+            if op.title is None:
+                result.update(status=422, detail="title is required")
+                continue
+            creates.append((result, {
+                "title": op.title,
+                "description": op.description or "",
+                "completed": bool(op.completed),
+                "owner_id": owner_id,
+                "row_version": None  # filled in once the version is allocated
+            }))
+            continue
+        if op.id is None:
+            result.update(status=422, detail="id is required")
+            continue
+        change = changes.setdefault(op.id, {"fields": {}, "flip": False, "deleted": False})
+        if op.id not in owned or change["deleted"]:
+            result.update(status=404, detail="Todo not found")
+            continue
+        if op.op == "delete":
+            change["deleted"] = True
+        elif op.op == "toggle":
+            if "completed" in change["fields"]:
+                change["fields"]["completed"] = not change["fields"]["completed"]
+            else:
+                change["flip"] = not change["flip"]
+        else:
+            fields = op.model_dump(include={"title", "description", "completed"}, exclude_none=True)
+            change["fields"].update(fields)
+            if "completed" in fields:
+                change["flip"] = False
+
+    deleted_ids = [todo_id for todo_id, change in changes.items() if change["deleted"]]
+    live = {todo_id: change for todo_id, change in changes.items()
+            if todo_id in owned and not change["deleted"]}
+    flip_ids = [todo_id for todo_id, change in live.items() if change["flip"]]
+    updates_by_columns: dict[tuple, list[dict]] = {}
+    for todo_id, change in live.items():
+        if change["fields"]:
+            columns = tuple(sorted(change["fields"]))
+            updates_by_columns.setdefault(columns, []).append({"todo_id": todo_id, **change["fields"]})
+
+    changed = bool(creates or live or deleted_ids)
+    if changed and version is None:
+        version = bump_todo_version(db, owner_id)
+
+    if creates:
+        for _, row in creates:
+            row["row_version"] = version
+        created_ids = db.scalars(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [row for _, row in creates]
+        ).all()
+        for (result, _), todo_id in zip(creates, created_ids):
+            result["id"] = todo_id
+    for columns, rows in updates_by_columns.items():
+        db.execute(
+            update(table).where(table.c.id == bindparam("todo_id"))
+            .values({**{column: bindparam(column) for column in columns}, "row_version": version}),
+            rows
+        )
+    if flip_ids:
+        db.execute(update(table).where(table.c.id.in_(flip_ids))
+                   .values(completed=not_(table.c.completed), row_version=version))
+    if deleted_ids:
+        db.execute(insert(models.TodoTombstone.__table__), [
+            {"owner_id": owner_id, "todo_id": todo_id, "row_version": version} for todo_id in deleted_ids
+        ])
+        db.execute(delete(table).where(table.c.id.in_(deleted_ids)))
+
+    # Read back the final state of everything that still exists
+    result_ids = {result["id"] for result in results
+                  if result["status"] == 200 and result["op"] != "delete"}
+    final = {}
+    if result_ids:
+        final = {row.id: row for row in db.execute(select(table).where(table.c.id.in_(result_ids))).mappings()}
+    if changed:
+        completions = sum(row["completed"] for _, row in creates)
+        completed = completions - sum(bool(owned[todo_id]) for todo_id in deleted_ids)
+        for todo_id, change in live.items():
+            was_completed = bool(owned[todo_id])
+            now_completed = change["fields"].get("completed", was_completed)
+            if change["flip"]:
+                now_completed = not now_completed
+            completed += int(now_completed) - int(was_completed)
+            completions += int(now_completed and not was_completed)
+        commit_todo_changes(db, owner_id, version, todos=len(creates) - len(deleted_ids), completed=completed,
+                            created=len(creates), completions=completions)
+    else:
+        db.rollback()  # nothing applied; also discards an early version bump
+
+    for result in results:
+        if result["status"] == 200 and result["id"] in final:
+            result["todo"] = dict(final[result["id"]])
+    return results
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # Get database URL from environment variable with fallback for local development
@@ -25,6 +25,15 @@ else:
         # Fallback for other database types
         engine = create_engine(DATABASE_URL)
 
+if engine.dialect.name == "sqlite":
+    # SQLite leaves foreign keys unenforced unless asked on every connection;
+    # deleting a user relies on ON DELETE CASCADE
+    @event.listens_for(engine, "connect")
+    def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
@@ -0,0 +1,236 @@
+"""
+In-process pub/sub hub for live todo change events
+"""
+import os
+import uuid
+import asyncio
+import logging
+import threading
+from typing import Optional
+from .shared_store import SHARED_STORE_ADDRESS, UnknownListener, get_store, reset_store, require_authkey
+
+logger = logging.getLogger(__name__)
+
+# Event stream configuration
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+# "local" delivers within this process only, "shared" also fans out through app.shared_store
+EVENTS_FANOUT_BACKEND = os.getenv("EVENTS_FANOUT_BACKEND", "local")
+FANOUT_MAILBOX_SIZE = 10000
+FANOUT_POLL_SECONDS = 5.0
+FANOUT_MAX_BACKOFF_SECONDS = 60.0
+
+CLOSED = object()  # queued to tell a subscriber its stream is over
+
+class Subscription:
+    """One open stream. Reads happen on the event loop that created it."""
+
+    def __init__(self, user_id: int, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.loop = asyncio.get_running_loop()
+        self.closed = False
+        self.close_reason: Optional[str] = None
+
+    async def get(self, timeout: float):
+        """Next event, None on timeout, CLOSED once the hub dropped this subscription"""
+        if self.closed and self.queue.empty():
+            return CLOSED
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _offer(self, event: dict) -> bool:
+        """Queue an event; a full queue means the consumer fell behind and is cut off"""
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self._close("slow consumer")
+            return False
+
+    def _close(self, reason: str):
+        self.closed = True
+        self.close_reason = reason
+        # Make room for the sentinel; the dropped events are lost to this consumer anyway
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(CLOSED)
+
+class LocalFanout:
+    """No cross-worker delivery (single worker deployments)"""
+
+    def start(self, hub: "TodoEventHub"):
+        pass
+
+    def stop(self):
+        pass
+
+    def publish(self, user_id: int, event: dict):
+        pass
+
+class SharedStoreFanout:
+    """Relays events between workers through a mailbox per worker in the shared store"""
+
+    def __init__(self, address: str = SHARED_STORE_ADDRESS, authkey: Optional[bytes] = None):
+        self.worker_id = uuid.uuid4().hex
+        self.address = address
+        self.authkey = require_authkey(authkey)
+        self.reconnects = 0
+        self._running = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _store(self):
+        return get_store(self.address, self.authkey)
+
+    def start(self, hub: "TodoEventHub"):
+        self._store().register_listener(self.worker_id, FANOUT_MAILBOX_SIZE)
+        self._running = True
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, args=(hub,), name="event-fanout", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._stopped.set()
+        try:
+            self._store().unregister_listener(self.worker_id)
+        except Exception as e:
+            logger.error(f"Error unregistering event listener: {str(e)}")
+
+    def publish(self, user_id: int, event: dict):
+        self._store().publish(self.worker_id, (user_id, event))
+
+    def _listen(self, hub: "TodoEventHub"):
+        """Poll the mailbox until stopped.
+
+        A missing mailbox (the store restarted) is registered again; connection
+        errors also drop the cached proxy so the next attempt reconnects.
+        Repeated failures back off up to FANOUT_MAX_BACKOFF_SECONDS.
+        """
+        register = False
+        backoff = 0.0
+        while self._running:
+            try:
+                if register:
+                    self._store().register_listener(self.worker_id, FANOUT_MAILBOX_SIZE)
+                    self.reconnects += 1
+                    register = False
+                for user_id, event in self._store().poll(self.worker_id, FANOUT_POLL_SECONDS):
+                    hub.deliver(user_id, event)
+                backoff = 0.0
+                continue
+            except UnknownListener:
+                logger.warning("Shared event mailbox is gone, registering again")
+            except Exception as e:
+                if not self._running:
+                    break
+                logger.error(f"Error polling shared event mailbox: {str(e)}")
+                if isinstance(e, (OSError, EOFError)):
+                    reset_store(self.address, self.authkey)
+            register = True
+            if self._stopped.wait(backoff):
+                break
+            backoff = min(max(backoff * 2, 0.5), FANOUT_MAX_BACKOFF_SECONDS)
+
+def create_fanout(backend: str = EVENTS_FANOUT_BACKEND):
+    backends = {"local": LocalFanout, "shared": SharedStoreFanout}
+    if backend not in backends:
+        raise ValueError(f"Unknown EVENTS_FANOUT_BACKEND: {backend}")
+    return backends[backend]()
+
+class TodoEventHub:
+    """Routes todo events to every open stream of the todo's owner.
+
+    publish() may be called from any thread (the sync routers run in the
+    threadpool); delivery is handed to each subscription's event loop. Each
+    subscription has a bounded queue and is disconnected when it fills up, so
+    a stalled client never holds memory or slows down writers.
+    """
+
+    def __init__(self, max_queue: int = EVENT_QUEUE_SIZE, fanout=None):
+        self.max_queue = max_queue
+        self.fanout = fanout or create_fanout()
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def start(self):
+        self.fanout.start(self)
+
+    def stop(self):
+        self.fanout.stop()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.max_queue)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: int, event: dict):
+        """Send an event to the user's streams in this worker and, via the fan-out, in the others"""
+        self.published += 1
+        self.deliver(user_id, event)
+        try:
+            self.fanout.publish(user_id, event)
+        except Exception as e:
+            logger.error(f"Error fanning out todo event: {str(e)}")
+
+    def deliver(self, user_id: int, event: dict):
+        """Deliver to this worker's streams only"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(self._offer, subscription, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            streams = sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+        return {
+            "streams": streams,
+            "users": len(self._subscriptions),
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers,
+            "fanout": type(self.fanout).__name__
+        }
+
+    def _offer(self, subscription: Subscription, event: dict):
+        if not subscription._offer(event):
+            self.dropped_subscribers += 1
+            self.unsubscribe(subscription)
+
+# Global hub instance
+hub = TodoEventHub()
+
+def todo_event(kind: str, todo) -> dict:
+    """Event payload for a todo row (ORM object or mapping) or, for deletes, a todo id"""
+    if kind == "deleted":
+        return {"type": "todo.deleted", "todo": {"id": todo}}
+    if not isinstance(todo, dict):
+        todo = {
+            "id": todo.id,
+            "title": todo.title,
+            "description": todo.description,
+            "completed": todo.completed,
+            "owner_id": todo.owner_id
+        }
+    else:
+        todo = {key: todo[key] for key in ("id", "title", "description", "completed", "owner_id")}
+    return {"type": f"todo.{kind}", "todo": todo}
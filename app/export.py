@@ -0,0 +1,129 @@
+"""
+Streaming NDJSON/CSV export of todos
+"""
+import io
+import os
+import csv
+import json
+import anyio
+from datetime import datetime
+from typing import Iterator, Optional
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from . import models
+from .database import SessionLocal
+
+# Rows fetched per server-side cursor round trip and encoded per response chunk
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+TODO_EXPORT_COLUMNS = ("id", "title", "description", "completed", "created_at", "updated_at")
+ADMIN_EXPORT_COLUMNS = TODO_EXPORT_COLUMNS + ("owner_id", "owner_username", "owner_email")
+# Spreadsheets run cells starting with these as formulas
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def todo_export_query(owner_id: int, completed: Optional[bool] = None):
+    """A user's todos oldest first, in ix_todos_owner_created_id order"""
+    todos = models.Todo.__table__
+    query = select(*(todos.c[name] for name in TODO_EXPORT_COLUMNS)).where(todos.c.owner_id == owner_id)
+    if completed is not None:
+        query = query.where(todos.c.completed == completed)
+    return query.order_by(todos.c.created_at, todos.c.id)
+
+def admin_export_query(user_id: Optional[int] = None, completed: Optional[bool] = None):
+    """Every todo with its owner, in primary key order"""
+    todos = models.Todo.__table__
+    users = models.User.__table__
+    query = select(
+        *(todos.c[name] for name in TODO_EXPORT_COLUMNS),
+        todos.c.owner_id,
+        users.c.username.label("owner_username"),
+        users.c.email.label("owner_email")
+    ).join_from(todos, users, todos.c.owner_id == users.c.id)
+    if user_id is not None:
+        query = query.where(todos.c.owner_id == user_id)
+    if completed is not None:
+        query = query.where(todos.c.completed == completed)
+    return query.order_by(todos.c.id)
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def encode_ndjson(columns: tuple, rows) -> str:
+    return "".join(
+        json.dumps({column: _export_value(value) for column, value in zip(columns, row)}) + "\n"
+        for row in rows
+    )
+
+def _csv_value(value):
+    """Export value, with user text that a spreadsheet would evaluate quoted by a leading '"""
+    value = _export_value(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def iter_export(query, columns: tuple, fmt: str, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[str]:
+    """Encoded chunks of at most batch_rows rows, read through a server-side cursor.
+
+    Uses its own session so the request's session is not held while streaming;
+    closing the generator closes the cursor and releases the connection.
+    """
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            yield encode_csv([columns])
+        result = db.execute(query.execution_options(yield_per=batch_rows))
+        try:
+            for rows in result.partitions():
+                yield encode_csv(rows) if fmt == "csv" else encode_ndjson(columns, rows)
+        finally:
+            result.close()
+    finally:
+        db.close()
+
+async def _stream_chunks(request: Request, chunks: Iterator[str]):
+    try:
+        while True:
+            chunk = await run_in_threadpool(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+            if await request.is_disconnected():
+                break
+    finally:
+        # Runs on disconnect too, so the query is abandoned instead of read to the end
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(chunks.close)
+
+class ExportResponse(StreamingResponse):
+    """StreamingResponse that always closes its body iterator.
+
+    When the client goes away while a chunk is being sent, the iterator is
+    left suspended at its yield (notably behind @app.middleware("http")
+    middleware) and would keep its cursor and connection until garbage
+    collected.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+def export_response(request: Request, query, columns: tuple, fmt: str, filename: str) -> StreamingResponse:
+    return ExportResponse(
+        _stream_chunks(request, iter_export(query, columns, fmt)),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
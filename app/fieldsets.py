@@ -0,0 +1,19 @@
+"""
+Sparse fieldsets: ?fields=id,title,completed on list endpoints
+"""
+from typing import Optional
+from fastapi import HTTPException
+
+def parse_fields(fields: Optional[str], allowed: tuple[str, ...]) -> tuple[str, ...]:
+    """Requested fields in the endpoint's usual order; all of them when the parameter is omitted.
+
+    Unknown names are a 400 so typos do not silently return less data.
+    """
+    if not fields or not fields.strip():
+        return allowed
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}")
+    return tuple(name for name in allowed if name in requested)
@@ -1,12 +1,32 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from .database import engine, Base, get_database_info
 from .routers import users as users_router, todos as todos_router, admin as admin_router
-from .middleware import log_requests
+from .middleware import log_requests, rate_limit_requests
+from .scheduler import start_scheduler, stop_scheduler
+from .passwords import hasher
+from .events import hub
+from .reports import report_runner
+from .responses import FastJSONResponse
 
 Base.metadata.create_all(bind=engine)  # create tables for demo; use Alembic for migrations
 
-app = FastAPI(title="TaskMaster API", description="A collaborative todo application", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    hasher.start()
+    hub.start()
+    await start_scheduler()
+    yield
+    # Shutdown
+    await stop_scheduler()
+    hub.stop()
+    report_runner.shutdown()
+    hasher.shutdown()
+
+app = FastAPI(title="TaskMaster API", description="A collaborative todo application", version="1.0.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
 
 # CORS middleware for development and production
 import os
@@ -23,12 +43,16 @@ if frontend_url:
     origins.append(frontend_url)
     origins.append(frontend_url.replace("http://", "https://"))
 
+# Registered before CORS so 429 responses still carry CORS headers
+app.middleware("http")(rate_limit_requests)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-Next-Cursor", "ETag"],
 )
 
 app.middleware("http")(log_requests)  # optional
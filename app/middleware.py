@@ -1,4 +1,12 @@
 from fastapi import Request
+from fastapi.responses import JSONResponse
+from collections import OrderedDict
+from jose import JWTError, jwt
+from typing import Optional
+from .auth import SECRET_KEY, ALGORITHM
+from .rate_limit import get_client_ip
+import math
+import os
 import time
 
 async def log_requests(request: Request, call_next):
@@ -7,3 +15,90 @@ async def log_requests(request: Request, call_next):
     process_time = (time.time() - start_time) * 1000
     print(f"{request.method} {request.url} completed_in={process_time:.2f}ms status={response.status_code}")
     return response
+
+# Request budgets: (method or "*", path prefix, bucket capacity, refill tokens per second).
+# The first matching entry wins, so keep more specific prefixes first.
+RATE_LIMIT_BUDGETS = [
+    ("POST", "/auth/token", 10, 10 / 60),
+    ("POST", "/auth/register", 5, 5 / 60),
+    ("*", "/admin", 60, 1.0),
+    ("GET", "/todos", 120, 2.0),
+    ("*", "/todos", 60, 1.0),
+]
+DEFAULT_BUDGET = ("*", "", 120, 2.0)
+RATE_LIMIT_EXEMPT_PATHS = {"/", "/health"}
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+class TokenBucketLimiter:
+    """Per-key token buckets held in memory, least recently used evicted first.
+
+    Buckets are refilled lazily when touched, so each request costs a dict
+    lookup and a little arithmetic regardless of how many clients exist.
+    """
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, list[float]]" = OrderedDict()
+
+    def take(self, key: str, capacity: int, refill_rate: float, now: Optional[float] = None) -> tuple[bool, float]:
+        """Consume one token; returns (allowed, tokens left)"""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(capacity), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            tokens, updated_at = bucket
+            bucket[0] = min(float(capacity), tokens + (now - updated_at) * refill_rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, bucket[0]
+        return False, bucket[0]
+
+request_limiter = TokenBucketLimiter()
+
+def _match_budget(method: str, path: str):
+    for budget in RATE_LIMIT_BUDGETS:
+        budget_method, prefix = budget[0], budget[1]
+        if (budget_method == "*" or budget_method == method) and path.startswith(prefix):
+            return budget
+    return DEFAULT_BUDGET
+
+def _rate_limit_identity(request: Request) -> str:
+    """Authenticated user when the bearer token checks out, client IP otherwise"""
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        try:
+            payload = jwt.decode(auth_header[7:], SECRET_KEY, algorithms=[ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    return f"ip:{get_client_ip(request)}"
+
+async def rate_limit_requests(request: Request, call_next):
+    if not RATE_LIMIT_ENABLED or request.method == "OPTIONS" or request.url.path in RATE_LIMIT_EXEMPT_PATHS:
+        return await call_next(request)
+
+    method, prefix, capacity, refill_rate = _match_budget(request.method, request.url.path)
+    key = f"{_rate_limit_identity(request)}:{method}:{prefix}"
+    allowed, tokens = request_limiter.take(key, capacity, refill_rate)
+
+    headers = {
+        "X-RateLimit-Limit": str(capacity),
+        "X-RateLimit-Remaining": str(int(tokens)),
+        "X-RateLimit-Reset": str(math.ceil((capacity - tokens) / refill_rate))
+    }
+    if not allowed:
+        headers["Retry-After"] = str(math.ceil((1 - tokens) / refill_rate))
+        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=headers)
+
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func, Text, Index, DDL, event, BigInteger
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 from .database import Base
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Optional, Literal
 from datetime import datetime
 
 # SQLAlchemy ORM models
@@ -16,10 +16,20 @@ class User(Base):
     is_active = Column(Boolean, default=False)  # email verification gate
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    todo_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every todo write
 
-    todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
-    sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")
-    login_attempts = relationship("LoginAttempt", back_populates="user", cascade="all, delete-orphan")
+    # Children go with the user through ON DELETE CASCADE; passive_deletes keeps
+    # the ORM from loading them just to delete them one by one
+    todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+    sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    login_attempts = relationship("LoginAttempt", back_populates="user", cascade="all, delete-orphan",
+                                  passive_deletes=True)
+    todo_tombstones = relationship("TodoTombstone", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Keyset pagination of the admin user list (see crud.get_user_stats_rows)
+        Index("ix_users_created_id", "created_at", "id"),
+    )
 
 class Todo(Base):
     __tablename__ = "todos"
@@ -27,15 +37,87 @@ class Todo(Base):
     title = Column(String(100), nullable=False)
     description = Column(String(250))
     completed = Column(Boolean, default=False)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    row_version = Column(Integer, nullable=False, default=0, server_default="0")  # owner's todo_version at last write
 
     owner = relationship("User", back_populates="todos")
 
+    __table_args__ = (
+        # Keyset pagination of a user's todos (see crud.get_todos_for_user)
+        Index("ix_todos_owner_created_id", "owner_id", "created_at", "id"),
+        # Delta sync (see crud.get_todo_changes)
+        Index("ix_todos_owner_row_version", "owner_id", "row_version"),
+        # Keyset pagination of every user's todos (see crud.get_admin_todo_rows)
+        Index("ix_todos_created_id", "created_at", "id"),
+    )
+
+# Full-text search index (see app/search.py). Not mapped: SQLite gets an FTS5
+# table kept up to date by crud, PostgreSQL a generated tsvector column.
+TODO_SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+        "title, description, owner, tokenize = 'unicode61', prefix = '2 3')"
+    ],
+    "postgresql": [
+        "ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_todos_search_vector ON todos USING GIN (search_vector)"
+    ]
+}
+for _dialect, _statements in TODO_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Todo.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+
+class TodoTombstone(Base):
+    """Marks a deleted todo so delta sync can tell clients to drop it"""
+    __tablename__ = "todo_tombstones"
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    todo_id = Column(Integer, nullable=False)
+    row_version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_todo_tombstones_owner_row_version", "owner_id", "row_version"),
+    )
+
+class DashboardCounter(Base):
+    """One shard of a dashboard count, kept current by the write paths (see app/counters.py)"""
+    __tablename__ = "dashboard_counters"
+    name = Column(String(32), primary_key=True)  # a total such as "todos", "signups:YYYY-MM-DD", or "reconciled_at"
+    shard = Column(Integer, primary_key=True)  # user id % COUNTER_SHARDS, spreads row lock contention
+    value = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+class ActivityRollup(Base):
+    """One shard of an hourly activity count, kept current by the write paths (see app/rollups.py)"""
+    __tablename__ = "activity_rollups"
+    metric = Column(String(32), primary_key=True)  # "todos_created", "todos_completed" or "signups"
+    hour = Column(Integer, primary_key=True)  # whole hours since the Unix epoch, UTC
+    shard = Column(Integer, primary_key=True)  # user id % ROLLUP_SHARDS, spreads row lock contention
+    value = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+class ReportJob(Base):
+    """An admin report generated in the background (see app/reports.py)"""
+    __tablename__ = "report_jobs"
+    id = Column(String(32), primary_key=True)  # random hex, also names the report file
+    kind = Column(String(32), nullable=False)
+    format = Column(String(8), nullable=False)
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, done or failed
+    requested_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)  # the file outlives its admin until purge_reports
+    rows_written = Column(Integer, nullable=False, default=0)
+    rows_total = Column(Integer)  # expected rows, for progress; may be approximate
+    error = Column(String(255))
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)  # moves with every chunk written
+    finished_at = Column(DateTime(timezone=True))
+
 class UserSession(Base):
     __tablename__ = "user_sessions"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     session_token = Column(String(255), unique=True, index=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_activity = Column(DateTime(timezone=True), server_default=func.now())
@@ -49,7 +131,7 @@ class UserSession(Base):
 class LoginAttempt(Base):
     __tablename__ = "login_attempts"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for failed attempts
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)  # Nullable for failed attempts
     username = Column(String(255), nullable=False)  # Store attempted username
     ip_address = Column(String(45), nullable=False)
     success = Column(Boolean, default=False)
@@ -86,6 +168,21 @@ class TodoCreate(BaseModel):
     title: str = Field(..., min_length=3, max_length=100)
     description: Optional[str] = Field(None, max_length=250)
 
+class TodoImportRow(TodoCreate):
+    """One imported todo: the TodoCreate fields plus its completion state"""
+    completed: bool = False
+
+class TodoImportRowError(BaseModel):
+    row: int
+    errors: list[dict]
+
+class TodoImportSummary(BaseModel):
+    rows: int
+    imported: int
+    failed: int
+    error: Optional[str] = None  # set when the upload could not be parsed to the end
+    errors: list[TodoImportRowError]
+
 class TodoUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=3, max_length=100)
     description: Optional[str] = Field(None, max_length=250)
@@ -100,3 +197,69 @@ class TodoOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+class TodoSyncOut(TodoOut):
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class TodoChangesOut(BaseModel):
+    changes: list[TodoSyncOut]
+    deleted: list[int]
+    cursor: str
+    reset: bool  # True when changes is a full snapshot and local state must be replaced
+
+class TodoBatchOperation(BaseModel):
+    op: Literal["create", "update", "toggle", "delete"]
+    id: Optional[int] = None  # required for everything except create
+    title: Optional[str] = Field(None, min_length=3, max_length=100)
+    description: Optional[str] = Field(None, max_length=250)
+    completed: Optional[bool] = None
+
+class TodoBatchRequest(BaseModel):
+    operations: list[TodoBatchOperation] = Field(..., min_length=1, max_length=500)
+
+class TodoBatchResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: Optional[int] = None
+    detail: Optional[str] = None
+    todo: Optional[TodoOut] = None
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoBatchResult]
+
+class AdminUserFilter(BaseModel):
+    """Users to act on when no explicit ids are given; every condition must match"""
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+    created_before: Optional[datetime] = None
+    created_after: Optional[datetime] = None
+
+class AdminBulkUserRequest(BaseModel):
+    action: Literal["promote", "demote", "activate", "deactivate", "delete"]
+    ids: Optional[list[int]] = Field(None, min_length=1, max_length=50000)
+    filter: Optional[AdminUserFilter] = None
+
+class AdminBulkUserResult(BaseModel):
+    action: str
+    affected: int  # users whose state changed
+    sessions_revoked: int
+    todos_deleted: int
+
+class ReportRequest(BaseModel):
+    kind: Literal["users_detailed", "todos"]
+    format: Literal["ndjson", "csv"] = "csv"
+
+class ReportJobOut(BaseModel):
+    id: str
+    kind: str
+    format: str
+    status: str
+    rows_written: int
+    rows_total: Optional[int] = None
+    progress: Optional[float] = None  # percent, when rows_total is known
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None  # set once the report is done
@@ -0,0 +1,65 @@
+"""
+Opaque keyset cursors shared by the paginated list endpoints
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import String, bindparam, type_coerce, tuple_
+from sqlalchemy.orm import Session
+
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Decode a cursor produced by encode_cursor; malformed cursors are a 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        if not all(isinstance(value, expected) for value, expected in zip(values, types)):
+            raise ValueError(cursor)
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def is_sqlite(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+def timestamp_key(db: Session, column):
+    """Sort key for a DateTime column that can round-trip through a cursor.
+
+    SQLite compares DateTime values as the stored text, and rows written by
+    server_default=func.now() use a different format from bound datetimes, so
+    there the cursor carries the raw text and comparisons are done on it.
+    """
+    if is_sqlite(db):
+        return type_coerce(column, String)
+    return column
+
+def timestamp_cursor_value(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def timestamp_param(db: Session, value: str):
+    if is_sqlite(db):
+        return bindparam(None, value, type_=String)
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_after(key, id_column, key_value, id_value, descending: bool):
+    """WHERE clause selecting rows strictly after (key_value, id_value) in sort order.
+
+    Written as a row-value comparison so SQLite and PostgreSQL both turn it
+    into a range on a (key, id) index; the equivalent OR form is filtered row
+    by row when many rows share a key (bulk imports share created_at).
+    """
+    if descending:
+        return tuple_(key, id_column) < tuple_(key_value, id_value)
+    return tuple_(key, id_column) > tuple_(key_value, id_value)
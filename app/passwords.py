@@ -0,0 +1,133 @@
+"""
+Password hashing service backed by a bounded process pool
+"""
+import os
+import math
+import time
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Hashing configuration (PASSWORD_HASH_WORKERS=0 hashes inline, e.g. for scripts)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+PASSWORD_HASH_TARGET_MS = int(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+DEFAULT_BCRYPT_ROUNDS = 12
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 15
+
+@lru_cache(maxsize=None)
+def get_context(rounds: int) -> CryptContext:
+    """Shared CryptContext for a bcrypt cost; hashes below it are flagged for rehash"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds
+    )
+
+# These run inside pool workers, so they must stay module-level and picklable
+def _hash_password(password: str, rounds: int) -> str:
+    return get_context(rounds).hash(password)
+
+def _verify_password(password: str, hashed_password: str, rounds: int) -> tuple[bool, Optional[str]]:
+    return get_context(rounds).verify_and_update(password, hashed_password)
+
+class PasswordHasher:
+    """Runs bcrypt off the request threads.
+
+    At most max_pending hash/verify calls may be queued or running at once;
+    beyond that callers get a 503 instead of tying up another worker thread.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING,
+                 target_ms: int = PASSWORD_HASH_TARGET_MS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.target_ms = target_ms
+        self.rounds = DEFAULT_BCRYPT_ROUNDS
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.rejected = 0
+        self.rehashed = 0
+
+    def start(self):
+        """Calibrate the bcrypt cost and spin up the worker pool"""
+        self.calibrate()
+        self._get_pool()
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def calibrate(self) -> int:
+        """Pick the bcrypt cost whose hash time is closest to target_ms"""
+        started = time.perf_counter()
+        _hash_password("calibration-password", MIN_BCRYPT_ROUNDS)
+        elapsed_ms = max((time.perf_counter() - started) * 1000, 0.001)
+        # Each extra round doubles the cost
+        extra_rounds = round(math.log2(self.target_ms / elapsed_ms))
+        self.rounds = max(MIN_BCRYPT_ROUNDS, min(MAX_BCRYPT_ROUNDS, MIN_BCRYPT_ROUNDS + extra_rounds))
+        logger.info(f"Calibrated bcrypt cost to {self.rounds} rounds "
+                    f"({elapsed_ms:.1f}ms at {MIN_BCRYPT_ROUNDS} rounds, target {self.target_ms}ms)")
+        return self.rounds
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash_password, password, self.rounds)
+
+    def verify(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash when the stored one is outdated"""
+        verified, new_hash = self._run(_verify_password, password, hashed_password, self.rounds)
+        if new_hash:
+            self.rehashed += 1
+        return verified, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "bcrypt_rounds": self.rounds,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed
+        }
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry shortly",
+                headers={"Retry-After": "1"}
+            )
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn avoids forking a process that already runs threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+# Global hasher instance
+hasher = PasswordHasher()
@@ -0,0 +1,172 @@
+"""
+In-process cache of authenticated principals keyed by session token
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+# Cache configuration
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalize a datetime to naive UTC so it compares with datetime.utcnow()"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Detached snapshot of a users row, safe to share across DB sessions"""
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    is_admin: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, user) -> "CachedUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=bool(user.is_active),
+            is_admin=bool(user.is_admin),
+            created_at=user.created_at
+        )
+
+@dataclass(frozen=True)
+class CachedSession:
+    """Detached snapshot of a user_sessions row"""
+    id: int
+    user_id: int
+    expires_at: datetime
+
+    @classmethod
+    def from_model(cls, session) -> "CachedSession":
+        return cls(id=session.id, user_id=session.user_id, expires_at=utc_naive(session.expires_at))
+
+class PrincipalCache:
+    """TTL + LRU cache of (user, session) pairs resolved by auth.get_current_user.
+
+    Entries are process-local, so writes made by other workers are only picked
+    up once the entry expires; callers that change a user's auth state must
+    invalidate explicitly. Readers take generation() before loading a principal
+    and pass it to put(), which then refuses the entry if the user was
+    invalidated in between.
+    """
+
+    def __init__(self, ttl_seconds: int = PRINCIPAL_CACHE_TTL_SECONDS,
+                 max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, CachedUser, CachedSession]]" = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+        # Generation of each user's last invalidate_user(), and of the last clear()
+        self._generation = 0
+        self._invalidated: dict[int, int] = {}
+        self._cleared = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, session_token: str) -> Optional[tuple[CachedUser, CachedSession]]:
+        """Return the cached principal for a session token, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(session_token)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, user, session = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(session_token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_token)
+            self.hits += 1
+            return user, session
+
+    def generation(self) -> int:
+        """Take before reading a principal from the database, for put()"""
+        with self._lock:
+            return self._generation
+
+    def put(self, session_token: str, user: CachedUser, session: CachedSession, generation: Optional[int] = None):
+        """Store a resolved principal, evicting the least recently used entry if full.
+
+        With a generation, the principal is not stored if the user was
+        invalidated (or the cache cleared) since it was taken.
+        """
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and max(self._cleared, self._invalidated.get(user.id, 0)) > generation:
+                return
+            self._remove(session_token)
+            self._entries[session_token] = (time.monotonic(), user, session)
+            self._tokens_by_user.setdefault(user.id, set()).add(session_token)
+            while len(self._entries) > self.max_entries:
+                oldest_token = next(iter(self._entries))
+                self._remove(oldest_token)
+                self.evictions += 1
+
+    def invalidate(self, session_token: str):
+        """Drop a single session from the cache"""
+        with self._lock:
+            if self._remove(session_token):
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached session belonging to a user"""
+        with self._lock:
+            self._generation += 1
+            self._invalidated[user_id] = self._generation
+            for session_token in list(self._tokens_by_user.get(user_id, ())):
+                if self._remove(session_token):
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+            self._generation += 1
+            self._cleared = self._generation
+            self._invalidated.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _remove(self, session_token: str) -> bool:
+        entry = self._entries.pop(session_token, None)
+        if entry is None:
+            return False
+        user_id = entry[1].id
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(session_token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+        return True
+
+# Global cache instance
+principal_cache = PrincipalCache()
@@ -2,72 +2,211 @@
 Rate limiting and session management utilities
 """
 from datetime import datetime, timedelta
+from collections import deque
 from typing import Optional
 from fastapi import HTTPException, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, insert, update
 from . import models, crud
+from .database import engine
+from .principal_cache import principal_cache, utc_naive
+from .session_activity import SessionActivityBuffer
+from .shared_store import get_store, require_authkey, SHARED_STORE_ADDRESS
+import os
+import math
+import time
+import queue
+import logging
+import threading
 import secrets
 import hashlib
 
+logger = logging.getLogger(__name__)
+
 # Rate limiting configuration
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION_MINUTES = 15
 SESSION_TIMEOUT_MINUTES = 15
 CLEANUP_INTERVAL_HOURS = 24
 
+# "memory" keeps failed-login windows per process, "shared" uses app.shared_store
+LOGIN_LIMITER_BACKEND = os.getenv("LOGIN_LIMITER_BACKEND", "memory")
+LOGIN_AUDIT_QUEUE_SIZE = 10000
+LOGIN_AUDIT_BATCH_SIZE = 500
+
+# Session activity is written behind, see SessionActivityBuffer
+activity_buffer = SessionActivityBuffer(SESSION_TIMEOUT_MINUTES)
+
+class InMemoryLoginLimiter:
+    """Sliding window of failed login timestamps per key, local to this process"""
+
+    def __init__(self, window_seconds: float, max_attempts: int):
+        self.window_seconds = window_seconds
+        self.max_attempts = max_attempts
+        self._windows: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record_failure(self, key: str, now: float):
+        with self._lock:
+            window = self._windows.setdefault(key, deque(maxlen=self.max_attempts))
+            self._prune(window, now)
+            window.append(now)
+
+    def recent_failures(self, key: str, now: float) -> list[float]:
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                return []
+            self._prune(window, now)
+            if not window:
+                del self._windows[key]
+            return list(window)
+
+    def sweep(self, now: float):
+        """Forget keys whose failures have all left the window"""
+        with self._lock:
+            stale = [key for key, window in self._windows.items()
+                     if not window or window[-1] <= now - self.window_seconds]
+            for key in stale:
+                del self._windows[key]
+
+    def _prune(self, window: deque, now: float):
+        cutoff = now - self.window_seconds
+        while window and window[0] <= cutoff:
+            window.popleft()
+
+class SharedStoreLoginLimiter:
+    """Same sliding window, kept in the shared store so all workers see it"""
+
+    def __init__(self, window_seconds: float, max_attempts: int,
+                 address: str = SHARED_STORE_ADDRESS, authkey: Optional[bytes] = None):
+        self.window_seconds = window_seconds
+        self.max_attempts = max_attempts
+        self.address = address
+        self.authkey = require_authkey(authkey)  # fail at startup, not on the first login
+
+    def record_failure(self, key: str, now: float):
+        self._store().window_add(key, now, self.window_seconds, self.max_attempts)
+
+    def recent_failures(self, key: str, now: float) -> list[float]:
+        return self._store().window_get(key, now, self.window_seconds)
+
+    def sweep(self, now: float):
+        self._store().window_sweep(now, self.window_seconds)
+
+    def _store(self):
+        return get_store(self.address, self.authkey)
+
+def create_login_limiter(backend: str = LOGIN_LIMITER_BACKEND):
+    """Build the failed-login limiter for the configured backend"""
+    backends = {"memory": InMemoryLoginLimiter, "shared": SharedStoreLoginLimiter}
+    if backend not in backends:
+        raise ValueError(f"Unknown LOGIN_LIMITER_BACKEND: {backend}")
+    return backends[backend](LOCKOUT_DURATION_MINUTES * 60, MAX_LOGIN_ATTEMPTS)
+
+login_limiter = create_login_limiter()
+
+class LoginAttemptWriter:
+    """Persists login attempts to login_attempts from a background thread.
+
+    The audit trail is not on the login path any more, so rows are queued and
+    inserted in batches. If the queue is full the caller writes synchronously
+    rather than dropping the row.
+    """
+
+    def __init__(self, max_queue: int = LOGIN_AUDIT_QUEUE_SIZE, batch_size: int = LOGIN_AUDIT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+
+    def enqueue(self, row: dict):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._write([row])
+
+    def flush(self):
+        """Write everything queued so far (used on shutdown)"""
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if rows:
+            self._write(rows)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "written": self.written}
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="login-audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            rows = [self._queue.get()]
+            while len(rows) < self.batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(rows)
+            except Exception as e:
+                logger.error(f"Error writing login attempts: {str(e)}")
+
+    def _write(self, rows: list[dict]):
+        with engine.begin() as conn:
+            conn.execute(insert(models.LoginAttempt.__table__), rows)
+        self.written += len(rows)
+
+login_audit = LoginAttemptWriter()
+
 class RateLimiter:
+    @staticmethod
+    def _key(username: str, ip_address: str) -> str:
+        return f"login:{username}:{ip_address}"
+    
     @staticmethod
     def check_login_attempts(db: Session, username: str, ip_address: str) -> bool:
         """Check if user/IP is rate limited"""
-        cutoff_time = datetime.utcnow() - timedelta(minutes=LOCKOUT_DURATION_MINUTES)
-        
-        # Count failed attempts in the last LOCKOUT_DURATION_MINUTES
-        failed_attempts = db.query(models.LoginAttempt).filter(
-            and_(
-                models.LoginAttempt.username == username,
-                models.LoginAttempt.ip_address == ip_address,
-                models.LoginAttempt.success == False,
-                models.LoginAttempt.attempted_at > cutoff_time
-            )
-        ).count()
-        
-        return failed_attempts < MAX_LOGIN_ATTEMPTS
+        failures = login_limiter.recent_failures(RateLimiter._key(username, ip_address), time.time())
+        return len(failures) < MAX_LOGIN_ATTEMPTS
     
     @staticmethod
     def record_login_attempt(db: Session, username: str, ip_address: str, 
                            user_agent: str, success: bool, user_id: Optional[int] = None):
-        """Record a login attempt"""
-        attempt = models.LoginAttempt(
-            user_id=user_id,
-            username=username,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            success=success
-        )
-        db.add(attempt)
-        db.commit()
+        """Record a login attempt; the audit row is written asynchronously"""
+        if not success:
+            login_limiter.record_failure(RateLimiter._key(username, ip_address), time.time())
+        login_audit.enqueue({
+            "user_id": user_id,
+            "username": username,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "success": success,
+            "attempted_at": datetime.utcnow()
+        })
     
     @staticmethod
     def get_lockout_time_remaining(db: Session, username: str, ip_address: str) -> Optional[int]:
         """Get remaining lockout time in minutes"""
-        cutoff_time = datetime.utcnow() - timedelta(minutes=LOCKOUT_DURATION_MINUTES)
-        
-        last_failed_attempt = db.query(models.LoginAttempt).filter(
-            and_(
-                models.LoginAttempt.username == username,
-                models.LoginAttempt.ip_address == ip_address,
-                models.LoginAttempt.success == False,
-                models.LoginAttempt.attempted_at > cutoff_time
-            )
-        ).order_by(models.LoginAttempt.attempted_at.desc()).first()
+        now = time.time()
+        failures = login_limiter.recent_failures(RateLimiter._key(username, ip_address), now)
+        if len(failures) < MAX_LOGIN_ATTEMPTS:
+            return None
         
-        if last_failed_attempt:
-            unlock_time = last_failed_attempt.attempted_at + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
-            remaining = (unlock_time - datetime.utcnow()).total_seconds() / 60
-            return max(0, int(remaining))
-        
-        return None
+        # Unlocked once the oldest failure that still counts leaves the window
+        unlock_at = failures[-MAX_LOGIN_ATTEMPTS] + LOCKOUT_DURATION_MINUTES * 60
+        return max(0, math.ceil((unlock_at - now) / 60))
 
 class SessionManager:
     @staticmethod
@@ -101,28 +240,93 @@ class SessionManager:
         
         db.add(session)
         db.commit()
+        principal_cache.invalidate_user(user_id)
         db.refresh(session)
         return session
     
+    @staticmethod
+    def start_login_session(db: Session, user_id: int, username: str, ip_address: str,
+                            user_agent: str, new_password_hash: Optional[str] = None) -> str:
+        """Rotate sessions, record the successful attempt and open a new session in one transaction.
+
+        On PostgreSQL everything is sent as a single statement using data-modifying
+        CTEs; other dialects run the same statements back to back before one commit.
+        Returns the new session token.
+        """
+        sessions = models.UserSession.__table__
+        attempts = models.LoginAttempt.__table__
+        users = models.User.__table__
+        now = datetime.utcnow()
+        session_token = SessionManager.generate_session_token()
+        
+        # Single login enforcement: invalidate all existing sessions for this user
+        revoke = update(sessions).where(
+            sessions.c.user_id == user_id,
+            sessions.c.is_active == True
+        ).values(is_active=False)
+        record = insert(attempts).values(
+            user_id=user_id,
+            username=username,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            success=True,
+            attempted_at=now
+        )
+        rehash = None
+        if new_password_hash:
+            rehash = update(users).where(users.c.id == user_id).values(hashed_password=new_password_hash)
+        create = insert(sessions).values(
+            user_id=user_id,
+            session_token=session_token,
+            created_at=now,
+            last_activity=now,
+            expires_at=now + timedelta(minutes=SESSION_TIMEOUT_MINUTES),
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+        
+        if db.get_bind().dialect.name == "postgresql":
+            ctes = [
+                revoke.returning(sessions.c.id).cte("revoked"),
+                record.returning(attempts.c.id).cte("recorded")
+            ]
+            if rehash is not None:
+                ctes.append(rehash.returning(users.c.id).cte("rehashed"))
+            db.execute(create.add_cte(*ctes).returning(sessions.c.id))
+        else:
+            db.execute(revoke)
+            db.execute(record)
+            if rehash is not None:
+                db.execute(rehash)
+            db.execute(create)
+        db.commit()
+        principal_cache.invalidate_user(user_id)
+        return session_token
+    
     @staticmethod
     def validate_session(db: Session, session_token: str) -> Optional[models.UserSession]:
-        """Validate and update session activity"""
+        """Validate and record session activity"""
         session = db.query(models.UserSession).filter(
             and_(
                 models.UserSession.session_token == session_token,
-                models.UserSession.is_active == True,
-                models.UserSession.expires_at > datetime.utcnow()
+                models.UserSession.is_active == True
             )
         ).first()
         
-        if session:
-            # Update last activity and extend expiration
-            session.last_activity = datetime.utcnow()
-            session.expires_at = datetime.utcnow() + timedelta(minutes=SESSION_TIMEOUT_MINUTES)
-            db.commit()
+        if session and not SessionManager.touch_session(session.id, session.expires_at):
+            return None
             
         return session
     
+    @staticmethod
+    def touch_session(session_id: int, expires_at: datetime) -> bool:
+        """Enforce expiry and extend the session; the write is buffered, not committed"""
+        now = datetime.utcnow()
+        if activity_buffer.effective_expires_at(session_id, utc_naive(expires_at)) <= now:
+            return False
+        activity_buffer.record(session_id, now)
+        return True
+    
     @staticmethod
     def invalidate_session(db: Session, session_token: str):
         """Invalidate a specific session"""
@@ -130,6 +334,7 @@ class SessionManager:
             models.UserSession.session_token == session_token
         ).update({"is_active": False})
         db.commit()
+        principal_cache.invalidate(session_token)
     
     @staticmethod
     def invalidate_user_sessions(db: Session, user_id: int):
@@ -141,10 +346,15 @@ class SessionManager:
             )
         ).update({"is_active": False})
         db.commit()
+        principal_cache.invalidate_user(user_id)
     
     @staticmethod
     def cleanup_expired_sessions(db: Session):
         """Clean up expired sessions and old login attempts"""
+        # Persist buffered activity first so live sessions are not expired
+        activity_buffer.flush()
+        login_limiter.sweep(time.time())
+        
         # Remove expired sessions
         db.query(models.UserSession).filter(
             models.UserSession.expires_at < datetime.utcnow()
@@ -0,0 +1,285 @@
+"""
+Admin reports generated by background workers and written to disk in chunks
+"""
+import os
+import uuid
+import time
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import update, delete
+from sqlalchemy.orm import Session
+from . import models, crud, counters
+from .database import SessionLocal
+from .export import admin_export_query, encode_ndjson, encode_csv, ADMIN_EXPORT_COLUMNS
+from .events import EVENTS_FANOUT_BACKEND
+from .rate_limit import LOGIN_LIMITER_BACKEND
+
+logger = logging.getLogger(__name__)
+
+def require_reports_dir(reports_dir: str) -> str:
+    """Where reports are written. Any worker may serve a download, so a deployment
+    with several workers (one using the shared store) must point this at storage
+    they all read; raises if it is unset there instead of using the local temp dir."""
+    if reports_dir:
+        return reports_dir
+    if "shared" in (EVENTS_FANOUT_BACKEND, LOGIN_LIMITER_BACKEND):
+        raise RuntimeError("REPORTS_DIR must be set to storage shared by every worker when running more than one")
+    return os.path.join(tempfile.gettempdir(), "todo_reports")
+
+# Report configuration
+REPORTS_DIR = require_reports_dir(os.getenv("REPORTS_DIR", ""))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "1"))
+# Reports queued or running in this process beyond which new ones get a 503
+REPORT_MAX_PENDING = int(os.getenv("REPORT_MAX_PENDING", "4"))
+REPORT_CHUNK_ROWS = int(os.getenv("REPORT_CHUNK_ROWS", "1000"))
+# Pause between chunks so a report never keeps the database busy for long
+REPORT_CHUNK_PAUSE_SECONDS = float(os.getenv("REPORT_CHUNK_PAUSE_SECONDS", "0.01"))
+REPORT_RETENTION_HOURS = int(os.getenv("REPORT_RETENTION_HOURS", "24"))
+# A job whose progress has not moved for this long belonged to a worker that went away
+REPORT_STALE_SECONDS = 600
+
+REPORT_COLUMNS = {
+    "users_detailed": crud.USER_STATS_FIELDS,
+    "todos": ADMIN_EXPORT_COLUMNS
+}
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands timestamps back without their zone
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def report_path(job: models.ReportJob) -> str:
+    return os.path.join(REPORTS_DIR, f"{job.id}.{job.format}")
+
+def _user_stats_pages(chunk_rows: int) -> Iterator[list]:
+    cursor = None
+    columns = REPORT_COLUMNS["users_detailed"]
+    while True:
+        db = SessionLocal()
+        try:
+            rows, cursor = crud.get_user_stats_rows(db, cursor=cursor, limit=chunk_rows)
+        finally:
+            db.close()
+        yield [tuple(row[column] for column in columns) for row in rows]
+        if cursor is None:
+            return
+
+def _todo_pages(chunk_rows: int) -> Iterator[list]:
+    last_id = 0
+    todos = models.Todo.__table__
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.execute(admin_export_query().where(todos.c.id > last_id).limit(chunk_rows)).all()
+        finally:
+            db.close()
+        yield rows
+        if len(rows) < chunk_rows:
+            return
+        last_id = rows[-1].id
+
+REPORT_PAGES = {
+    "users_detailed": _user_stats_pages,
+    "todos": _todo_pages
+}
+
+def _expected_rows(db: Session, kind: str) -> int:
+    totals = counters.read(db, _now().date())
+    return totals["users"] if kind == "users_detailed" else totals["todos"]
+
+def job_out(job: models.ReportJob) -> dict:
+    progress = None
+    if job.status == "done":
+        progress = 100.0
+    elif job.rows_total:
+        progress = round(min(job.rows_written / job.rows_total, 1) * 100, 1)
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "format": job.format,
+        "status": job.status,
+        "rows_written": job.rows_written,
+        "rows_total": job.rows_total,
+        "progress": progress,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "download_url": f"/admin/reports/{job.id}/download" if job.status == "done" else None
+    }
+
+class ReportRunner:
+    """Generates reports on a small thread pool, away from the request threads.
+
+    Each chunk is one keyset page read in its own short session, so a report
+    holds a pooled connection only briefly and never keeps a long transaction
+    open. At most max_pending reports may be queued or running in a process;
+    beyond that submit() answers 503.
+    """
+
+    def __init__(self, workers: int = REPORT_WORKERS, max_pending: int = REPORT_MAX_PENDING,
+                 chunk_rows: int = REPORT_CHUNK_ROWS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.chunk_rows = chunk_rows
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._queued: set[str] = set()
+        self._stats_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def shutdown(self):
+        """Stop taking work; running reports stop after their current chunk and are marked failed"""
+        self._stopping.set()
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def submit(self, db: Session, kind: str, fmt: str, requested_by: int) -> models.ReportJob:
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many reports in progress, please retry later",
+                headers={"Retry-After": "30"}
+            )
+        try:
+            now = _now()
+            job = models.ReportJob(id=uuid.uuid4().hex, kind=kind, format=fmt, status="queued",
+                                   requested_by=requested_by, rows_written=0,
+                                   rows_total=_expected_rows(db, kind), created_at=now, updated_at=now)
+            db.add(job)
+            db.commit()
+            with self._pool_lock:
+                self._queued.add(job.id)
+            self._get_pool().submit(self._run, job.id)
+        except BaseException:
+            self._slots.release()
+            raise
+        return job
+
+    def get(self, db: Session, job_id: str) -> Optional[models.ReportJob]:
+        """A job, failing it first if the worker that ran it is gone"""
+        job = db.get(models.ReportJob, job_id)
+        if (job is not None and job.status in ("queued", "running")
+                and _now() - _aware(job.updated_at) > timedelta(seconds=REPORT_STALE_SECONDS)):
+            job.status = "failed"
+            job.error = "Report worker stopped"
+            job.finished_at = _now()
+            db.commit()
+            # The download route reads the job after closing the session
+            db.refresh(job)
+        return job
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
+
+    def _count(self, name: str):
+        # Request threads and every report worker update these
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _run(self, job_id: str):
+        with self._pool_lock:
+            self._queued.discard(job_id)
+        try:
+            self._generate(job_id)
+            self._count("completed")
+        except Exception as e:
+            self._count("failed")
+            logger.error(f"Report {job_id} failed: {str(e)}")
+            self._update(job_id, status="failed", error=str(e)[:255], finished_at=_now())
+        finally:
+            self._slots.release()
+
+    def _generate(self, job_id: str):
+        job = self._update(job_id, status="running")
+        if job is None:
+            return  # purged before a worker got to it
+        columns = REPORT_COLUMNS[job.kind]
+        path = report_path(job)
+        partial = path + ".part"
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        rows_written = 0
+        try:
+            with open(partial, "w", encoding="utf-8", newline="") as report:
+                if job.format == "csv":
+                    report.write(encode_csv([columns]))
+                for rows in REPORT_PAGES[job.kind](self.chunk_rows):
+                    if self._stopping.is_set():
+                        raise RuntimeError("Server shut down while the report was running")
+                    report.write(encode_csv(rows) if job.format == "csv" else encode_ndjson(columns, rows))
+                    rows_written += len(rows)
+                    if self._update(job_id, rows_written=rows_written) is None:
+                        raise RuntimeError("Report job was deleted")
+                    time.sleep(REPORT_CHUNK_PAUSE_SECONDS)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        self._update(job_id, status="done", finished_at=_now())
+
+    def _update(self, job_id: str, **values) -> Optional[models.ReportJob]:
+        """Change a job and mark it and the jobs still queued here as alive"""
+        db = SessionLocal()
+        try:
+            job = db.get(models.ReportJob, job_id)
+            if job is None:
+                return None
+            now = _now()
+            for name, value in values.items():
+                setattr(job, name, value)
+            job.updated_at = now
+            with self._pool_lock:
+                queued = list(self._queued)
+            if queued:
+                db.execute(update(models.ReportJob).where(models.ReportJob.id.in_(queued)).values(updated_at=now))
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._stopping.clear()
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report")
+            return self._pool
+
+# Global runner instance
+report_runner = ReportRunner()
+
+def purge_reports(db: Session, older_than: datetime) -> int:
+    """Delete jobs that finished or stopped moving before older_than, and their files; returns how many were removed"""
+    jobs = models.ReportJob.__table__
+    removed = db.execute(
+        delete(jobs).where(jobs.c.updated_at < older_than)
+        .returning(jobs.c.id, jobs.c.format)
+    ).all()
+    db.commit()
+    for job_id, fmt in removed:
+        path = os.path.join(REPORTS_DIR, f"{job_id}.{fmt}")
+        if os.path.exists(path):
+            os.remove(path)
+    return len(removed)
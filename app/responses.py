@@ -0,0 +1,54 @@
+"""
+JSON responses: orjson encoding when it is installed, and a shortcut for
+payloads that are already in their final shape
+"""
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder below produces the same JSON
+    orjson = None
+
+def _json_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes datetimes, dates and UUIDs natively.
+
+    Used as the app's default response class. Returning it directly from a
+    route also skips FastAPI's jsonable_encoder walk over the content.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":"), default=_json_default).encode("utf-8")
+
+def rows_response(rows: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """Send plain rows/dicts as-is.
+
+    Returning a Response skips FastAPI's response_model validation and
+    jsonable_encoder pass; the route keeps its response_model for the OpenAPI
+    schema. Headers set on the injected Response (ETag, X-Next-Cursor) are
+    carried over, since FastAPI only applies them to responses it builds.
+    """
+    json_response = FastJSONResponse(rows)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                json_response.headers[name] = value
+    return json_response
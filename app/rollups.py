@@ -0,0 +1,141 @@
+"""
+Hourly activity rollups behind the admin analytics charts.
+
+Buckets are whole hours since the Unix epoch (UTC), stored as integers so
+SQLite and PostgreSQL compare them the same way, and each (metric, hour)
+count is split over ROLLUP_SHARDS rows keyed by user id like the dashboard
+counters. The write paths add to the current hour in the transaction that
+makes the change; a chart is one range scan on the primary key. backfill()
+fills in the hours before the write paths started from the real tables.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, insert, func, literal, true, cast, bindparam, BigInteger, Integer, String
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import models
+
+ROLLUP_SHARDS = int(os.getenv("ACTIVITY_ROLLUP_SHARDS", "8"))
+# Most points a single timeseries request may return
+MAX_TIMESERIES_POINTS = int(os.getenv("MAX_TIMESERIES_POINTS", "2000"))
+
+ROLLUP_METRICS = ("todos_created", "todos_completed", "signups")
+BUCKET_HOURS = {"hour": 1, "day": 24}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def as_utc(at: datetime) -> datetime:
+    """Aware UTC datetime; naive timestamps are taken to be UTC already"""
+    if at.tzinfo is None:
+        return at.replace(tzinfo=timezone.utc)
+    return at.astimezone(timezone.utc)
+
+def _epoch_seconds(at: datetime) -> float:
+    return (as_utc(at) - _EPOCH).total_seconds()
+
+def epoch_hour(at: Optional[datetime] = None) -> int:
+    """Hour bucket of a timestamp (now if None); naive timestamps are UTC"""
+    return int(_epoch_seconds(at or datetime.now(timezone.utc)) // 3600)
+
+def hour_start(hour: int) -> datetime:
+    return _EPOCH + timedelta(hours=hour)
+
+def bucket_range(start: datetime, end: datetime, bucket: str) -> tuple[int, int]:
+    """Indexes [first, last) of the buckets that overlap [start, end)"""
+    width = BUCKET_HOURS[bucket] * 3600
+    first = int(_epoch_seconds(start) // width)
+    last = int(-(-_epoch_seconds(end) // width))
+    return first, max(first, last)
+
+def add(db: Session, user_id: int, deltas: dict[str, int], at: Optional[datetime] = None):
+    """Add deltas to the metrics' current hour in the current transaction (the caller commits)"""
+    hour = epoch_hour(at)
+    shard = user_id % ROLLUP_SHARDS
+    rows = [{"metric": metric, "hour": hour, "shard": shard, "value": delta}
+            for metric, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    table = models.ActivityRollup.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.metric, table.c.hour, table.c.shard],
+        set_={"value": table.c.value + statement.excluded.value}
+    )
+    db.execute(statement, rows)
+
+def timeseries(db: Session, metric: str, start: datetime, end: datetime, bucket: str = "day") -> list[dict]:
+    """Per-bucket totals of a metric over the buckets that overlap [start, end), zero-filled.
+
+    Day buckets are UTC days.
+    """
+    width = BUCKET_HOURS[bucket]
+    first, last = bucket_range(start, end, bucket)
+    table = models.ActivityRollup.__table__
+    slot = table.c.hour // width
+    rows = db.execute(
+        select(slot, func.sum(table.c.value)).where(
+            table.c.metric == metric,
+            table.c.hour >= first * width,
+            table.c.hour < last * width
+        ).group_by(slot)
+    )
+    values = {int(index): int(value or 0) for index, value in rows}
+    return [{"start": hour_start(index * width), "value": values.get(index, 0)}
+            for index in range(first, last)]
+
+def _hour_of(db: Session, column):
+    """SQL for epoch_hour() of a DateTime column"""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.floor(func.extract("epoch", column)), BigInteger) // 3600
+    return cast(func.strftime("%s", column), Integer) // 3600
+
+def _timestamp_bound(db: Session, at: datetime):
+    """Bound for a range on a DateTime column; SQLite compares the stored CURRENT_TIMESTAMP text"""
+    if db.get_bind().dialect.name == "postgresql":
+        return at
+    return bindparam(None, at.strftime("%Y-%m-%d %H:%M:%S"), type_=String)
+
+def _actual_activity(db: Session, first: int, last: int) -> list:
+    """SELECTs producing (metric, hour, shard, value) rows for hours [first, last) from the real tables"""
+    users = models.User.__table__
+    todos = models.Todo.__table__
+    since, until = _timestamp_bound(db, hour_start(first)), _timestamp_bound(db, hour_start(last))
+
+    def bucketed(metric, column, shard, *where):
+        hour = _hour_of(db, column)
+        return (select(literal(metric), hour, shard, func.count())
+                .where(column >= since, column < until, *where)
+                .group_by(hour, shard))
+
+    owner_shard = func.coalesce(todos.c.owner_id, 0) % ROLLUP_SHARDS
+    return [
+        bucketed("todos_created", todos.c.created_at, owner_shard),
+        bucketed("todos_completed", todos.c.updated_at, owner_shard, todos.c.completed == true()),
+        bucketed("signups", users.c.created_at, users.c.id % ROLLUP_SHARDS)
+    ]
+
+def backfill(db: Session, since: datetime, until: Optional[datetime] = None) -> int:
+    """Count the hours from since to until (default: now) that have no rollups yet, and commit.
+
+    Only hours before the oldest existing rollup are written. From that hour
+    on, the write paths have been counting every change, deletes included,
+    which the real tables can no longer show. Only surviving rows can be
+    counted here: deleted todos and users are missing, and a completed todo
+    is counted in the hour it was last updated. Running it again writes
+    nothing. Returns the number of rollup rows written.
+    """
+    table = models.ActivityRollup.__table__
+    first = epoch_hour(since)
+    last = min(epoch_hour(until) if until is not None else epoch_hour(), epoch_hour())
+    oldest = db.scalar(select(func.min(table.c.hour)))
+    if oldest is not None:
+        last = min(last, oldest)
+    if last <= first:
+        return 0
+    written = 0
+    for query in _actual_activity(db, first, last):
+        written += db.execute(insert(table).from_select(["metric", "hour", "shard", "value"], query)).rowcount
+    db.commit()
+    return written
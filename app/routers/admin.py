@@ -1,25 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from ..database import get_db
-from .. import crud, models, auth
+from sqlalchemy import func, desc, select
+from ..database import get_db, SessionLocal
+from .. import crud, models, auth, counters, rollups
+from ..principal_cache import principal_cache
+from ..rate_limit import activity_buffer, login_audit
+from ..passwords import hasher
+from ..todo_versions import todo_versions
+from ..events import hub, todo_event
+from ..responses import rows_response
+from ..fieldsets import parse_fields
+from ..pagination import MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+from ..export import export_response, admin_export_query, ADMIN_EXPORT_COLUMNS, EXPORT_FORMATS
+from ..reports import report_runner, report_path, job_out
+import os
 from typing import Optional, List
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 @router.get("/dashboard/stats")
 def get_dashboard_stats(db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
-    """Get dashboard statistics for admin overview"""
-    total_users = db.query(models.User).count()
-    active_users = db.query(models.User).filter(models.User.is_active == True).count()
-    admin_users = db.query(models.User).filter(models.User.is_admin == True).count()
-    total_todos = db.query(models.Todo).count()
-    completed_todos = db.query(models.Todo).filter(models.Todo.completed == True).count()
-    
-    # Recent activity (users created in last 7 days)
+    """Get dashboard statistics for admin overview (read from the maintained counters)"""
+    # Recent activity (users created in the last 7 days, counted in whole UTC days)
     week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_users = db.query(models.User).filter(models.User.created_at >= week_ago).count()
+    counts = counters.read(db, week_ago.date())
+    total_users = counts["users"]
+    active_users = counts["active_users"]
+    admin_users = counts["admin_users"]
+    total_todos = counts["todos"]
+    completed_todos = counts["completed_todos"]
+    recent_users = counts["signups"]
     
     return {
         "total_users": total_users,
@@ -33,87 +45,174 @@ def get_dashboard_stats(db: Session = Depends(get_db), admin=Depends(auth.get_cu
         "completion_rate": round((completed_todos / total_todos * 100) if total_todos > 0 else 0, 1)
     }
 
+@router.get("/analytics/timeseries")
+def get_activity_timeseries(
+    db: Session = Depends(get_db),
+    admin=Depends(auth.get_current_active_admin),
+    metric: str = Query(..., pattern="^(todos_created|todos_completed|signups)$", description="todos_created, todos_completed or signups"),
+    start: Optional[datetime] = Query(None, alias="from", description="Start of the range (default: 30 days before to)"),
+    end: Optional[datetime] = Query(None, alias="to", description="End of the range, exclusive (default: now)"),
+    bucket: str = Query("day", pattern="^(hour|day)$", description="hour or day (UTC days)")
+):
+    """Counts of a metric per bucket, answered from the hourly activity rollups"""
+    end = rollups.as_utc(end) if end else datetime.now(timezone.utc)
+    start = rollups.as_utc(start) if start else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    first, last = rollups.bucket_range(start, end, bucket)
+    if last - first > rollups.MAX_TIMESERIES_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range covers more than {rollups.MAX_TIMESERIES_POINTS} {bucket} buckets"
+        )
+    return rows_response({
+        "metric": metric,
+        "bucket": bucket,
+        "points": rollups.timeseries(db, metric, start, end, bucket)
+    })
+
+@router.get("/system/stats")
+def get_system_stats(admin=Depends(auth.get_current_active_admin)):
+    """Get in-process cache and worker pool counters for monitoring"""
+    return {
+        "principal_cache": principal_cache.stats(),
+        "session_activity": activity_buffer.stats(),
+        "password_hasher": hasher.stats(),
+        "login_audit": login_audit.stats(),
+        "todo_versions": todo_versions.stats(),
+        "events": hub.stats(),
+        "reports": report_runner.stats()
+    }
+
 @router.get("/users", response_model=list[models.UserOut])
 def list_users(db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
     """List all users with their basic information"""
-    return db.query(models.User).order_by(desc(models.User.created_at)).all()
+    return rows_response(crud.get_user_rows(db))
 
 @router.get("/users/{user_id}/todos", response_model=list[models.TodoOut])
 def get_user_todos(user_id: int, db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
     """Get all todos for a specific user"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    if db.scalar(select(models.User.id).where(models.User.id == user_id)) is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return db.query(models.Todo).filter(models.Todo.owner_id == user_id).order_by(desc(models.Todo.created_at)).all()
+    todos, _ = crud.get_todos_for_user(db, user_id)
+    return rows_response(todos)
 
 @router.get("/todos")
 def get_all_todos(
+    response: Response,
     db: Session = Depends(get_db), 
     admin=Depends(auth.get_current_active_admin),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     completed: Optional[bool] = Query(None, description="Filter by completion status"),
-    limit: int = Query(100, description="Limit number of results"),
-    offset: int = Query(0, description="Offset for pagination")
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Limit number of results"),
+    offset: int = Query(0, ge=0, description="Offset for pagination (prefer cursor, which stays fast on deep pages)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    with_total: bool = Query(False, description="Count the matching todos exactly instead of using cached or estimated totals"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,completed")
 ):
-    """Get all todos across all users with filtering options"""
-    query = db.query(models.Todo, models.User).join(models.User, models.Todo.owner_id == models.User.id)
-    
-    if user_id:
-        query = query.filter(models.Todo.owner_id == user_id)
-    
-    if completed is not None:
-        query = query.filter(models.Todo.completed == completed)
-    
-    query = query.order_by(desc(models.Todo.created_at))
-    todos_with_users = query.offset(offset).limit(limit).all()
+    """Get all todos across all users with filtering options. The next page's cursor is sent in X-Next-Cursor."""
+    selected = parse_fields(fields, crud.ADMIN_TODO_FIELDS)
+    result, next_cursor = crud.get_admin_todo_rows(db, user_id=user_id, completed=completed, limit=limit,
+                                                   offset=offset, cursor=cursor, fields=selected)
+    total, estimated = crud.count_admin_todos(db, user_id=user_id, completed=completed, exact=with_total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    result = []
-    for todo, user in todos_with_users:
-        result.append({
-            "id": todo.id,
-            "title": todo.title,
-            "description": todo.description,
-            "completed": todo.completed,
-            "owner_id": todo.owner_id,
-            "created_at": todo.created_at,
-            "owner_username": user.username,
-            "owner_email": user.email
-        })
-    
-    return {
+    return rows_response({
         "todos": result,
-        "total": db.query(models.Todo).count(),
+        "total": total,
+        "total_estimated": estimated,
         "filtered_count": len(result)
-    }
+    }, response)
+
+@router.get("/todos/export")
+def export_all_todos(
+    request: Request,
+    admin=Depends(auth.get_streaming_admin),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    user_id: Optional[int] = Query(None, description="Filter by user ID"),
+    completed: Optional[bool] = Query(None, description="Filter by completion status")
+):
+    """Download all todos with their owners as NDJSON or CSV, streamed with flat memory use"""
+    query = admin_export_query(user_id, completed)
+    return export_response(request, query, ADMIN_EXPORT_COLUMNS, format, "all_todos")
+
+@router.post("/reports", response_model=models.ReportJobOut, status_code=202)
+def create_report(report: models.ReportRequest, db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
+    """Start generating a report in the background; poll GET /admin/reports/{id} for progress"""
+    job = report_runner.submit(db, report.kind, report.format, admin.id)
+    return job_out(job)
+
+@router.get("/reports/{report_id}", response_model=models.ReportJobOut)
+def get_report(report_id: str, db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
+    """Status and progress of a report, with a download_url once it is done"""
+    job = report_runner.get(db, report_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return job_out(job)
+
+@router.get("/reports/{report_id}/download")
+def download_report(report_id: str, admin=Depends(auth.get_streaming_admin)):
+    """Download a finished report"""
+    db = SessionLocal()
+    try:
+        job = report_runner.get(db, report_id)
+    finally:
+        db.close()
+    if not job:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Report is {job.status}")
+    path = report_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Report file is no longer available")
+    return FileResponse(path, media_type=EXPORT_FORMATS[job.format], filename=f"{job.kind}_{job.id}.{job.format}")
 
 @router.get("/users/detailed")
-def get_users_with_stats(db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
-    """Get users with their todo statistics"""
-    users = db.query(models.User).all()
-    result = []
-    
-    for user in users:
-        todo_count = db.query(models.Todo).filter(models.Todo.owner_id == user.id).count()
-        completed_count = db.query(models.Todo).filter(
-            models.Todo.owner_id == user.id, 
-            models.Todo.completed == True
-        ).count()
-        
-        result.append({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "is_active": user.is_active,
-            "is_admin": user.is_admin,
-            "created_at": user.created_at,
-            "todo_count": todo_count,
-            "completed_count": completed_count,
-            "pending_count": todo_count - completed_count,
-            "completion_rate": round((completed_count / todo_count * 100) if todo_count > 0 else 0, 1)
-        })
-    
-    return sorted(result, key=lambda x: x["created_at"], reverse=True)
+def get_users_with_stats(
+    response: Response,
+    db: Session = Depends(get_db),
+    admin=Depends(auth.get_current_active_admin),
+    q: Optional[str] = Query(None, min_length=1, max_length=255, description="Only users whose username or email starts with this"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to get every user"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,username,todo_count")
+):
+    """Get users with their todo statistics, newest first. When paginating, the next page's cursor is sent in X-Next-Cursor."""
+    selected = parse_fields(fields, crud.USER_STATS_FIELDS)
+    if cursor and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    result, next_cursor = crud.get_user_stats_rows(db, prefix=q, cursor=cursor, limit=limit, fields=selected)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows_response(result, response)
+
+@router.post("/users/bulk", response_model=models.AdminBulkUserResult)
+def bulk_user_action(
+    request: models.AdminBulkUserRequest,
+    db: Session = Depends(get_db),
+    admin=Depends(auth.get_current_active_admin)
+):
+    """Promote, demote, activate, deactivate or delete many users at once, by ids or by filter.
+
+    Runs in chunks of set-based statements. Deactivated and deleted users lose
+    their sessions in the same transaction. The calling admin is never included.
+    """
+    if (request.ids is None) == (request.filter is None):
+        raise HTTPException(status_code=400, detail="Give exactly one of ids or filter")
+    conditions = []
+    if request.filter is not None:
+        conditions = crud.bulk_user_conditions(**request.filter.model_dump())
+        if not conditions:
+            raise HTTPException(status_code=400, detail="filter needs at least one condition")
+    totals, changed_ids = crud.bulk_user_action(db, request.action, ids=request.ids,
+                                                conditions=conditions, exclude_id=admin.id)
+    for user_id in changed_ids:
+        principal_cache.invalidate_user(user_id)
+        if request.action == "delete":
+            todo_versions.forget(user_id)
+    return {"action": request.action, **totals}
 
 @router.post("/users/{user_id}/promote", response_model=models.UserOut)
 def promote_user(user_id: int, db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
@@ -121,7 +220,9 @@ def promote_user(user_id: int, db: Session = Depends(get_db), admin=Depends(auth
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return crud.promote_user_to_admin(db, user)
+    user = crud.promote_user_to_admin(db, user)
+    principal_cache.invalidate_user(user_id)
+    return user
 
 @router.post("/users/{user_id}/demote", response_model=models.UserOut)
 def demote_user(user_id: int, db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
@@ -130,9 +231,8 @@ def demote_user(user_id: int, db: Session = Depends(get_db), admin=Depends(auth.
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_admin = False
-    db.commit()
-    db.refresh(user)
+    user = crud.update_user_flags(db, user, is_admin=False)
+    principal_cache.invalidate_user(user_id)
     return user
 
 @router.post("/users/{user_id}/activate", response_model=models.UserOut)
@@ -142,9 +242,8 @@ def activate_user(user_id: int, db: Session = Depends(get_db), admin=Depends(aut
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_active = True
-    db.commit()
-    db.refresh(user)
+    user = crud.update_user_flags(db, user, is_active=True)
+    principal_cache.invalidate_user(user_id)
     return user
 
 @router.post("/users/{user_id}/deactivate", response_model=models.UserOut)
@@ -154,22 +253,20 @@ def deactivate_user(user_id: int, db: Session = Depends(get_db), admin=Depends(a
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_active = False
-    db.commit()
-    db.refresh(user)
+    user = crud.update_user_flags(db, user, is_active=False)
+    principal_cache.invalidate_user(user_id)
     return user
 
 @router.delete("/users/{user_id}")
 def delete_user(user_id: int, db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
     """Delete a user and all their todos"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    # One DELETE; todos, sessions and login history go with it via ON DELETE CASCADE
+    username = crud.delete_user(db, user_id)
+    if username is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    # Delete user (todos will be deleted automatically due to cascade)
-    db.delete(user)
-    db.commit()
-    return {"message": f"User {user.username} and all their todos have been deleted"}
+    principal_cache.invalidate_user(user_id)
+    todo_versions.forget(user_id)
+    return {"message": f"User {username} and all their todos have been deleted"}
 
 @router.delete("/todos/{todo_id}")
 def delete_todo(todo_id: int, db: Session = Depends(get_db), admin=Depends(auth.get_current_active_admin)):
@@ -178,6 +275,7 @@ def delete_todo(todo_id: int, db: Session = Depends(get_db), admin=Depends(auth.
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     
-    db.delete(todo)
-    db.commit()
+    owner_id = todo.owner_id
+    crud.delete_todo(db, todo)
+    hub.publish(owner_id, todo_event("deleted", todo_id))
     return {"message": "Todo deleted successfully"}
@@ -1,20 +1,261 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import time
+import anyio
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from .. import crud, models, auth
+from ..events import hub, todo_event, CLOSED, EVENT_HEARTBEAT_SECONDS
+from ..export import export_response, todo_export_query, TODO_EXPORT_COLUMNS
+from ..responses import rows_response
+from ..fieldsets import parse_fields
+from ..search import search_todos
+from ..todo_import import iter_import, iter_text_lines, summarize_import
+from ..pagination import MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+from ..todo_versions import todo_versions, todo_etag, etag_matches, encode_sync_cursor, decode_sync_cursor
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/todos", tags=["todos"])
 
+def _not_modified(request: Request, response: Response, db: Session, user_id: int, *parts) -> Optional[Response]:
+    """Set the ETag for a todo read; returns a 304 response when the client already has it"""
+    etag = todo_etag(user_id, todo_versions.get(db, user_id), request, *parts)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
 @router.post("/", response_model=models.TodoOut)
 def create_todo(todo_in: models.TodoCreate, db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
-    return crud.create_todo(db, current_user.id, todo_in.title, todo_in.description or "")
+    todo = crud.create_todo(db, current_user.id, todo_in.title, todo_in.description or "")
+    hub.publish(current_user.id, todo_event("created", todo))
+    return todo
 
 @router.get("/", response_model=list[models.TodoOut])
-def list_todos(db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
-    return crud.get_todos_for_user(db, current_user.id)
+def list_todos(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.get_current_user),
+    completed: Optional[bool] = Query(None, description="Filter by completion status"),
+    created_after: Optional[datetime] = Query(None, description="Only todos created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Only todos created before this time"),
+    sort: str = Query("-created_at", pattern="^-?created_at$", description="created_at (oldest first) or -created_at"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,completed")
+):
+    """List the user's todos. When paginating, the next page's cursor is sent in X-Next-Cursor."""
+    selected = parse_fields(fields, crud.TODO_OUT_FIELDS)
+    not_modified = _not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    todos, next_cursor = crud.get_todos_for_user(
+        db, current_user.id,
+        completed=completed,
+        created_after=created_after,
+        created_before=created_before,
+        descending=sort.startswith("-"),
+        cursor=cursor,
+        limit=limit,
+        fields=selected
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows_response(todos, response)
+
+@router.get("/search", response_model=list[models.TodoOut])
+def search_user_todos(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for; each matches as a prefix"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of results"),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.get_current_user)
+):
+    """Full-text search over the user's todo titles and descriptions, best matches first"""
+    not_modified = _not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
+    return rows_response(search_todos(db, current_user.id, q, limit), response)
+
+@router.get("/changes", response_model=models.TodoChangesOut)
+def get_todo_changes(
+    since: Optional[str] = Query(None, description="cursor returned by the previous sync; omit for a full snapshot"),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.get_current_user)
+):
+    """Todos created, updated or deleted since the cursor.
+
+    Without a cursor, or with one older than the tombstone retention, the whole
+    list is returned with reset=true and clients should replace their copy.
+    """
+    since_version = decode_sync_cursor(since) if since else None
+    reset = since_version is None
+    todos, deleted, version = crud.get_todo_changes(db, current_user.id, -1 if reset else since_version)
+    return {
+        "changes": todos,
+        "deleted": [] if reset else deleted,
+        "cursor": encode_sync_cursor(version),
+        "reset": reset
+    }
+
+@router.post("/batch", response_model=models.TodoBatchResponse)
+def batch_todos(batch: models.TodoBatchRequest, db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
+    """Create, update, toggle or delete many todos in one transaction.
+
+    Each operation gets its own result; failures (unknown or foreign ids, missing
+    fields) are reported per item and do not abort the others.
+    """
+    results = crud.apply_todo_batch(db, current_user.id, batch.operations)
+    for result in results:
+        if result["status"] != 200:
+            continue
+        if result["op"] == "delete":
+            hub.publish(current_user.id, todo_event("deleted", result["id"]))
+        elif result.get("todo"):
+            kind = "created" if result["op"] == "create" else "updated"
+            hub.publish(current_user.id, todo_event(kind, result["todo"]))
+    return {"results": results}
+
+@router.get("/export")
+def export_todos(
+    request: Request,
+    current_user=Depends(auth.get_streaming_user),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    completed: Optional[bool] = Query(None, description="Filter by completion status")
+):
+    """Download every todo as NDJSON or CSV, streamed with flat memory use"""
+    query = todo_export_query(current_user.id, completed)
+    return export_response(request, query, TODO_EXPORT_COLUMNS, format, "todos")
+
+@router.post("/import", response_model=models.TodoImportSummary)
+async def import_todos(
+    request: Request,
+    current_user=Depends(auth.get_streaming_user),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Format of the request body")
+):
+    """Bulk-import todos from an NDJSON or CSV request body (not a multipart upload).
+
+    The body is parsed as it arrives and inserted in chunks of IMPORT_CHUNK_ROWS,
+    each in its own transaction. Rejected rows are reported individually, up to
+    IMPORT_MAX_REPORTED_ERRORS of them.
+    """
+    body = request.stream().__aiter__()
+
+    def body_chunks():
+        # Runs in the threadpool; pulls the next piece of the upload from the event loop
+        while True:
+            try:
+                yield anyio.from_thread.run(body.__anext__)
+            except StopAsyncIteration:
+                return
+
+    def on_progress(record):
+        hub.publish(current_user.id, {"type": "todo.imported", "count": record["chunk"]})
+
+    records = iter_import(SessionLocal, current_user.id, iter_text_lines(body_chunks()), format)
+    return await run_in_threadpool(summarize_import, records, on_progress)
+
+async def _revoked(token: str) -> Optional[str]:
+    """Why a stream's token no longer authenticates (logout, deactivation, expiry), or None"""
+    try:
+        await run_in_threadpool(auth.authenticate_token, token)
+    except HTTPException as e:
+        return e.detail
+    return None
+
+@router.get("/stream")
+async def stream_todo_events(request: Request, token: str = Depends(auth.oauth2_scheme),
+                             current_user=Depends(auth.get_streaming_user)):
+    """Server-sent events for changes to the user's todos (todo.created/updated/deleted).
+
+    A comment line is sent every EVENT_HEARTBEAT_SECONDS to keep proxies from
+    closing the connection, and the token is checked again as often; the stream
+    ends with a close event once it no longer authenticates. Clients that fall
+    behind are disconnected and should resync with GET /todos/changes.
+    """
+    subscription = hub.subscribe(current_user.id)
+
+    async def event_stream():
+        checked_at = time.monotonic()
+        try:
+            while True:
+                event = await subscription.get(EVENT_HEARTBEAT_SECONDS)
+                if event is CLOSED:
+                    yield f"event: close\ndata: {json.dumps({'reason': subscription.close_reason})}\n\n"
+                    break
+                if time.monotonic() - checked_at >= EVENT_HEARTBEAT_SECONDS:
+                    reason = await _revoked(token)
+                    if reason:
+                        yield f"event: close\ndata: {json.dumps({'reason': reason})}\n\n"
+                        break
+                    checked_at = time.monotonic()
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/ws")
+async def todo_events_websocket(websocket: WebSocket, token: str = Query(...)):
+    """WebSocket variant of /todos/stream; browsers pass the access token as ?token=.
+
+    Closes with 1008 once the token no longer authenticates.
+    """
+    try:
+        current_user = await run_in_threadpool(auth.authenticate_token, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    subscription = hub.subscribe(current_user.id)
+
+    async def drain_incoming():
+        # Nothing is expected from the client; reading is how a disconnect is noticed
+        while True:
+            await websocket.receive_text()
+
+    receiver = asyncio.create_task(drain_incoming())
+    checked_at = time.monotonic()
+    try:
+        while not receiver.done():
+            event = await subscription.get(EVENT_HEARTBEAT_SECONDS)
+            if event is CLOSED:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=subscription.close_reason)
+                break
+            if time.monotonic() - checked_at >= EVENT_HEARTBEAT_SECONDS:
+                reason = await _revoked(token)
+                if reason:
+                    await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=reason)
+                    break
+                checked_at = time.monotonic()
+            if event is None:
+                await websocket.send_json({"type": "heartbeat"})
+                continue
+            await websocket.send_json(event)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        hub.unsubscribe(subscription)
 
 @router.get("/{todo_id}", response_model=models.TodoOut)
-def get_todo(todo_id: int, db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
+def get_todo(todo_id: int, request: Request, response: Response, db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
+    not_modified = _not_modified(request, response, db, current_user.id)
+    if not_modified:
+        return not_modified
     todo = crud.get_todo_by_id(db, todo_id)
     if not todo or todo.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Todo not found")
@@ -22,34 +263,26 @@ def get_todo(todo_id: int, db: Session = Depends(get_db), current_user=Depends(a
 
 @router.put("/{todo_id}", response_model=models.TodoOut)
 def update_todo(todo_id: int, todo_in: models.TodoUpdate, db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
-    todo = crud.get_todo_by_id(db, todo_id)
-    if not todo or todo.owner_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    
     # Only update fields that are provided
-    update_data = {}
-    if todo_in.title is not None:
-        update_data["title"] = todo_in.title
-    if todo_in.description is not None:
-        update_data["description"] = todo_in.description
-    if todo_in.completed is not None:
-        update_data["completed"] = todo_in.completed
-    
-    return crud.update_todo(db, todo, **update_data)
+    update_data = todo_in.model_dump(exclude_none=True)
+    todo = crud.update_owned_todo(db, current_user.id, todo_id, **update_data)
+    if todo is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    hub.publish(current_user.id, todo_event("updated", todo))
+    return todo
 
 @router.patch("/{todo_id}/toggle", response_model=models.TodoOut)
 def toggle_todo_completion(todo_id: int, db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
     """Toggle the completion status of a todo"""
-    todo = crud.get_todo_by_id(db, todo_id)
-    if not todo or todo.owner_id != current_user.id:
+    todo = crud.update_owned_todo(db, current_user.id, todo_id, toggle=True)
+    if todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
-    
-    return crud.update_todo(db, todo, completed=not todo.completed)
+    hub.publish(current_user.id, todo_event("updated", todo))
+    return todo
 
 @router.delete("/{todo_id}")
 def delete_todo(todo_id: int, db: Session = Depends(get_db), current_user=Depends(auth.get_current_user)):
-    todo = crud.get_todo_by_id(db, todo_id)
-    if not todo or todo.owner_id != current_user.id:
+    if not crud.delete_owned_todo(db, current_user.id, todo_id):
         raise HTTPException(status_code=404, detail="Todo not found")
-    crud.delete_todo(db, todo)
+    hub.publish(current_user.id, todo_event("deleted", todo_id))
     return {"message": "Deleted"}
@@ -54,8 +54,8 @@ def login_for_token(request: Request, form_data: auth.OAuth2PasswordRequestForm
             detail=f"Too many failed login attempts. Try again in {remaining_time} minutes."
         )
     
-    # Authenticate user
-    user = auth.authenticate_user(db, username, form_data.password)
+    # Authenticate user (read only, the rehash is written with the session)
+    user, new_password_hash = auth.verify_credentials(db, username, form_data.password)
     
     # Record login attempt
     if not user:
@@ -66,16 +66,17 @@ def login_for_token(request: Request, form_data: auth.OAuth2PasswordRequestForm
         RateLimiter.record_login_attempt(db, username, ip_address, user_agent, False, user.id)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Email not verified")
     
-    # Record successful login attempt
-    RateLimiter.record_login_attempt(db, username, ip_address, user_agent, True, user.id)
-    
-    # Create session (this will invalidate any existing sessions)
-    session = SessionManager.create_session(db, user.id, ip_address, user_agent)
+    # Record the successful attempt and create the session (this invalidates any
+    # existing sessions) in a single transaction
+    session_token = SessionManager.start_login_session(
+        db, user.id, username, ip_address, user_agent, new_password_hash
+    )
     
-    # Create access token with session reference
+    # Create access token with session reference (username matched user.username
+    # exactly, and reading the expired instance would cost another SELECT)
     access_token = auth.create_access_token(
-        data={"sub": user.username}, 
-        session_token=session.session_token
+        data={"sub": username}, 
+        session_token=session_token
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
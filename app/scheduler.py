@@ -5,7 +5,11 @@ import asyncio
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from .database import SessionLocal
-from .rate_limit import SessionManager
+from . import crud, counters
+from .reports import purge_reports, REPORT_RETENTION_HOURS
+from .todo_versions import TOMBSTONE_RETENTION_DAYS
+from .rate_limit import SessionManager, activity_buffer, login_audit
+from .session_activity import SESSION_ACTIVITY_FLUSH_SECONDS
 import logging
 
 # Configure logging
@@ -16,6 +20,8 @@ class BackgroundScheduler:
     def __init__(self):
         self.running = False
         self.cleanup_task = None
+        self.activity_task = None
+        self.counters_task = None
     
     async def start(self):
         """Start the background scheduler"""
@@ -24,17 +30,23 @@ class BackgroundScheduler:
         
         self.running = True
         self.cleanup_task = asyncio.create_task(self._cleanup_loop())
+        self.activity_task = asyncio.create_task(self._activity_flush_loop())
+        self.counters_task = asyncio.create_task(self._counter_reconcile_loop())
         logger.info("Background scheduler started")
     
     async def stop(self):
         """Stop the background scheduler"""
         self.running = False
-        if self.cleanup_task:
-            self.cleanup_task.cancel()
-            try:
-                await self.cleanup_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self.cleanup_task, self.activity_task, self.counters_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        # Don't lose the last few seconds of session activity or audit rows
+        await asyncio.to_thread(activity_buffer.flush)
+        await asyncio.to_thread(login_audit.flush)
         logger.info("Background scheduler stopped")
     
     async def _cleanup_loop(self):
@@ -51,13 +63,59 @@ class BackgroundScheduler:
                 # Wait 1 minute before retrying on error
                 await asyncio.sleep(60)
     
+    async def _activity_flush_loop(self):
+        """Flush buffered session activity every few seconds"""
+        while self.running:
+            try:
+                await asyncio.sleep(SESSION_ACTIVITY_FLUSH_SECONDS)
+                await asyncio.to_thread(activity_buffer.flush)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error flushing session activity: {str(e)}")
+    
+    async def _counter_reconcile_loop(self):
+        """Fill the dashboard counters on startup if they are empty, then periodically correct drift"""
+        startup = True
+        while self.running:
+            try:
+                await asyncio.to_thread(self._reconcile_counters, startup)
+                startup = False
+                await asyncio.sleep(counters.COUNTER_RECONCILE_SECONDS)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error reconciling dashboard counters: {str(e)}")
+                await asyncio.sleep(60)
+    
+    def _reconcile_counters(self, startup: bool = False):
+        db = SessionLocal()
+        try:
+            if startup:
+                if not counters.is_empty(db):
+                    return
+                drift = counters.reconcile(db)
+            else:
+                # Another worker may have reconciled since this one last woke up
+                drift = counters.reconcile(db, skip_if_newer_than=counters.COUNTER_RECONCILE_SECONDS / 2)
+            if drift:
+                logger.warning(f"Corrected dashboard counter drift: {drift}")
+        finally:
+            db.close()
+    
     async def _perform_cleanup(self):
-        """Perform session and login attempt cleanup"""
+        """Perform session, login attempt, tombstone and report cleanup"""
         db = SessionLocal()
         try:
             logger.info("Starting session cleanup...")
             SessionManager.cleanup_expired_sessions(db)
             logger.info("Session cleanup completed")
+            purged = crud.purge_todo_tombstones(db, datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+            if purged:
+                logger.info(f"Purged {purged} todo tombstones")
+            reports = purge_reports(db, datetime.utcnow() - timedelta(hours=REPORT_RETENTION_HOURS))
+            if reports:
+                logger.info(f"Purged {reports} old reports")
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
         finally:
@@ -0,0 +1,97 @@
+"""
+Full-text search over todo titles and descriptions.
+
+SQLite uses an FTS5 table (todos_fts, rowid = todos.id) that crud keeps in
+step with every committed todo write via sync_todo_version. PostgreSQL uses a
+generated tsvector column with a GIN index, which the database maintains on
+its own. The DDL for both is attached to the todos table in app/models.py.
+"""
+import re
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from . import models
+
+SEARCH_MAX_TERMS = 8
+SEARCH_RESULT_FIELDS = tuple(models.TodoOut.model_fields)
+
+def search_terms(q: str) -> list[str]:
+    """Words of a query; each one is matched as a prefix"""
+    return re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+
+def _owner_token(owner_id: int) -> str:
+    # Indexing the owner as a token lets FTS5 intersect it with the search
+    # terms inside the index instead of filtering every user's matches
+    return f"u{owner_id}"
+
+def _is_postgresql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def sync_todo_version(db: Session, owner_id: int, version: int):
+    """Re-index the todos written and drop the ones deleted at this todo version.
+
+    Every todo write stamps row_version (and tombstones) with the owner's new
+    version, so this covers single writes, batches and imports alike. Must run
+    inside the writing transaction; crud.commit_todo_changes calls it.
+    """
+    if _is_postgresql(db):
+        return
+    params = {"owner_id": owner_id, "version": version}
+    db.execute(text(
+        "DELETE FROM todos_fts WHERE rowid IN ("
+        "SELECT todo_id FROM todo_tombstones WHERE owner_id = :owner_id AND row_version = :version "
+        "UNION ALL SELECT id FROM todos WHERE owner_id = :owner_id AND row_version = :version)"
+    ), params)
+    db.execute(text(
+        "INSERT INTO todos_fts (rowid, title, description, owner) "
+        "SELECT id, title, coalesce(description, ''), :owner FROM todos "
+        "WHERE owner_id = :owner_id AND row_version = :version"
+    ), {**params, "owner": _owner_token(owner_id)})
+
+def unindex_owners(db: Session, owner_ids: list[int]):
+    """Drop these users' todos from the index (before deleting the users)"""
+    if _is_postgresql(db) or not owner_ids:
+        return
+    owners = " OR ".join(f'"{_owner_token(owner_id)}"' for owner_id in owner_ids)
+    db.execute(text(
+        "DELETE FROM todos_fts WHERE rowid IN (SELECT rowid FROM todos_fts WHERE todos_fts MATCH :match)"
+    ), {"match": f"owner : ({owners})"})
+
+def rebuild_index(db: Session):
+    """Index every todo from scratch (after a migration or a bulk load outside crud)"""
+    if _is_postgresql(db):
+        return
+    db.execute(text("DELETE FROM todos_fts"))
+    db.execute(text(
+        "INSERT INTO todos_fts (rowid, title, description, owner) "
+        "SELECT id, title, coalesce(description, ''), 'u' || owner_id FROM todos"
+    ))
+
+def search_todos(db: Session, owner_id: int, q: str, limit: int) -> list[dict]:
+    """The owner's best matching todos, best first; every query word matches as a prefix.
+
+    Title matches rank above description matches (bm25 / ts_rank_cd weights).
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    columns = ", ".join(f"todos.{name}" for name in SEARCH_RESULT_FIELDS)
+    if _is_postgresql(db):
+        statement = text(
+            f"SELECT {columns} FROM todos, to_tsquery('simple', :query) AS query "
+            "WHERE todos.owner_id = :owner_id AND todos.search_vector @@ query "
+            "ORDER BY ts_rank_cd(todos.search_vector, query) DESC, todos.id DESC LIMIT :limit"
+        )
+        query = " & ".join(f"{term}:*" for term in terms)
+    else:
+        statement = text(
+            f"SELECT {columns} FROM todos_fts JOIN todos ON todos.id = todos_fts.rowid "
+            "WHERE todos_fts MATCH :query AND todos.owner_id = :owner_id "
+            "ORDER BY bm25(todos_fts, 10.0, 1.0, 0.0), todos.id DESC LIMIT :limit"
+        )
+        words = " AND ".join(f'"{term}"*' for term in terms)
+        query = f'owner : "{_owner_token(owner_id)}" AND {{title description}} : ({words})'
+    # Typed result columns, so SQLite's 0/1 come back as booleans like every other list
+    todos = models.Todo.__table__
+    statement = statement.columns(*(todos.c[name] for name in SEARCH_RESULT_FIELDS))
+    rows = db.execute(statement, {"query": query, "owner_id": owner_id, "limit": limit})
+    return [dict(zip(SEARCH_RESULT_FIELDS, row)) for row in rows]
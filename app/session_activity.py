@@ -0,0 +1,113 @@
+"""
+Write-behind buffer for session activity timestamps
+"""
+import os
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import update, bindparam
+from . import models
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# Buffer configuration
+SESSION_ACTIVITY_FLUSH_SECONDS = float(os.getenv("SESSION_ACTIVITY_FLUSH_SECONDS", "5"))
+SESSION_ACTIVITY_MAX_PENDING = int(os.getenv("SESSION_ACTIVITY_MAX_PENDING", "1000"))
+
+class SessionActivityBuffer:
+    """Coalesces per-request session activity into periodic batched UPDATEs.
+
+    Only the latest activity per session is kept, so N requests on one session
+    between flushes cost a single row update. Expiry checks must go through
+    effective_expires_at() because the database lags behind by up to one
+    flush interval.
+    """
+
+    def __init__(self, timeout_minutes: int, max_pending: int = SESSION_ACTIVITY_MAX_PENDING):
+        self.timeout = timedelta(minutes=timeout_minutes)
+        self.max_pending = max_pending
+        self._pending: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushes = 0
+        self.forced_flushes = 0
+        self.rows_flushed = 0
+
+    def record(self, session_id: int, at: Optional[datetime] = None):
+        """Record activity on a session; flushes early once the buffer is full"""
+        at = at or datetime.utcnow()
+        with self._lock:
+            previous = self._pending.get(session_id)
+            if previous is None or at > previous:
+                self._pending[session_id] = at
+            overflow = len(self._pending) >= self.max_pending
+        if overflow and self._flush_lock.acquire(blocking=False):
+            # Whoever trips the limit pays for the flush; concurrent callers carry on
+            try:
+                self.forced_flushes += 1
+                self._flush()
+            finally:
+                self._flush_lock.release()
+
+    def effective_expires_at(self, session_id: int, stored_expires_at: datetime) -> datetime:
+        """Expiry taking buffered (not yet flushed) activity into account"""
+        with self._lock:
+            last_activity = self._pending.get(session_id)
+        if last_activity is None:
+            return stored_expires_at
+        return max(stored_expires_at, last_activity + self.timeout)
+
+    def flush(self):
+        """Write the latest activity of every pending session in one batched UPDATE"""
+        with self._flush_lock:
+            self._flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "flushes": self.flushes,
+            "forced_flushes": self.forced_flushes,
+            "rows_flushed": self.rows_flushed
+        }
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        table = models.UserSession.__table__
+        stmt = update(table).where(
+            table.c.id == bindparam("session_id"),
+            table.c.is_active == True,
+            table.c.expires_at < bindparam("new_expires_at")
+        ).values(
+            last_activity=bindparam("new_last_activity"),
+            expires_at=bindparam("new_expires_at")
+        )
+        rows = [{
+            "session_id": session_id,
+            "new_last_activity": last_activity,
+            "new_expires_at": last_activity + self.timeout
+        } for session_id, last_activity in pending.items()]
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(stmt, rows)
+        except Exception:
+            # Put the activity back so the next flush retries it
+            with self._lock:
+                for session_id, last_activity in pending.items():
+                    current = self._pending.get(session_id)
+                    if current is None or last_activity > current:
+                        self._pending[session_id] = last_activity
+            raise
+
+        self.flushes += 1
+        self.rows_flushed += len(rows)
+        logger.debug(f"Flushed activity for {len(rows)} sessions")
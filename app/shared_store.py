@@ -0,0 +1,169 @@
+"""
+Shared in-memory store for state that must be visible to every worker process.
+
+Run one store per deployment next to the API workers:
+
+    SHARED_STORE_AUTHKEY=... python -m app.shared_store 127.0.0.1:50000
+
+and point the workers at it with SHARED_STORE_ADDRESS=127.0.0.1:50000 and
+the same SHARED_STORE_AUTHKEY. The store exchanges pickles, so anyone who
+holds the key can run code in it and in the workers; there is no default.
+Tests can spin up a throwaway store process with start_local_store().
+"""
+import os
+import sys
+import secrets
+import threading
+from collections import deque
+from multiprocessing.managers import BaseManager
+from typing import Optional
+
+SHARED_STORE_ADDRESS = os.getenv("SHARED_STORE_ADDRESS", "127.0.0.1:50000")
+SHARED_STORE_AUTHKEY = os.getenv("SHARED_STORE_AUTHKEY", "")
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def require_authkey(authkey: Optional[bytes] = None) -> bytes:
+    """The store's authkey; raises if none is configured instead of running unauthenticated"""
+    if authkey is None:
+        authkey = SHARED_STORE_AUTHKEY.encode()
+    if not authkey:
+        raise RuntimeError("SHARED_STORE_AUTHKEY must be set to use the shared store")
+    return authkey
+
+class UnknownListener(LookupError):
+    """poll() for a mailbox the store does not have, e.g. because the store restarted"""
+
+class SharedStore:
+    """The state held by the store process. All methods are thread-safe."""
+
+    def __init__(self):
+        self._windows: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._mailboxes: dict[str, deque] = {}
+        self._mail = threading.Condition()
+
+    def window_add(self, key: str, timestamp: float, window_seconds: float, max_items: int):
+        """Append a timestamp to a sliding window, dropping ones that fell out of it"""
+        with self._lock:
+            window = self._windows.setdefault(key, deque(maxlen=max_items))
+            self._prune(window, timestamp - window_seconds)
+            window.append(timestamp)
+
+    def window_get(self, key: str, now: float, window_seconds: float) -> list[float]:
+        """Timestamps still inside the window, oldest first"""
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                return []
+            self._prune(window, now - window_seconds)
+            if not window:
+                del self._windows[key]
+                return []
+            return list(window)
+
+    def window_sweep(self, now: float, window_seconds: float) -> int:
+        """Drop windows with no timestamps left; returns how many were removed"""
+        with self._lock:
+            stale = [key for key, window in self._windows.items()
+                     if not window or window[-1] <= now - window_seconds]
+            for key in stale:
+                del self._windows[key]
+            return len(stale)
+
+    def register_listener(self, listener_id: str, max_items: int):
+        """Create a mailbox that receives everything other listeners publish"""
+        with self._mail:
+            self._mailboxes.setdefault(listener_id, deque(maxlen=max_items))
+
+    def unregister_listener(self, listener_id: str):
+        with self._mail:
+            self._mailboxes.pop(listener_id, None)
+
+    def publish(self, origin_id: str, message) -> int:
+        """Deliver a message to every mailbox except the sender's; returns the fan-out"""
+        with self._mail:
+            delivered = 0
+            for listener_id, mailbox in self._mailboxes.items():
+                if listener_id != origin_id:
+                    mailbox.append(message)
+                    delivered += 1
+            self._mail.notify_all()
+            return delivered
+
+    def poll(self, listener_id: str, timeout: float) -> list:
+        """Wait up to timeout seconds for messages and drain the mailbox.
+
+        Raises UnknownListener if the mailbox does not exist, so the listener
+        can register again instead of polling an empty result forever.
+        """
+        with self._mail:
+            mailbox = self._mailboxes.get(listener_id)
+            if mailbox is None:
+                raise UnknownListener(listener_id)
+            if not mailbox:
+                self._mail.wait(timeout)
+            messages = list(mailbox)
+            mailbox.clear()
+            return messages
+
+    @staticmethod
+    def _prune(window: deque, cutoff: float):
+        while window and window[0] <= cutoff:
+            window.popleft()
+
+_store = SharedStore()
+
+def _get_store() -> SharedStore:
+    return _store
+
+class SharedStoreManager(BaseManager):
+    pass
+
+SharedStoreManager.register("get_store", callable=_get_store)
+
+_proxies_lock = threading.Lock()
+_proxies: dict[tuple[str, bytes], object] = {}
+
+def get_store(address: str = SHARED_STORE_ADDRESS, authkey: Optional[bytes] = None):
+    """Proxy to the shared store, created once per process and address.
+
+    The proxy opens one connection per calling thread on first use.
+    """
+    key = (address, require_authkey(authkey))
+    with _proxies_lock:
+        proxy = _proxies.get(key)
+        if proxy is None:
+            manager = SharedStoreManager(address=parse_address(address), authkey=key[1])
+            manager.connect()
+            proxy = _proxies[key] = manager.get_store()
+        return proxy
+
+def reset_store(address: str = SHARED_STORE_ADDRESS, authkey: Optional[bytes] = None):
+    """Forget the cached proxy, e.g. after the store restarted; the next get_store() reconnects"""
+    with _proxies_lock:
+        _proxies.pop((address, require_authkey(authkey)), None)
+
+def start_local_store(authkey: Optional[bytes] = None) -> tuple[SharedStoreManager, str, bytes]:
+    """Start a store in a child process on a free local port (for tests).
+
+    Returns the manager (shut it down when done), its address and the authkey,
+    a random one unless given.
+    """
+    authkey = authkey or secrets.token_bytes(32)
+    manager = SharedStoreManager(address=("127.0.0.1", 0), authkey=authkey)
+    manager.start()
+    host, port = manager.address
+    return manager, f"{host}:{port}", authkey
+
+def serve(address: str = SHARED_STORE_ADDRESS, authkey: Optional[bytes] = None):
+    """Serve the store in the foreground"""
+    manager = SharedStoreManager(address=parse_address(address), authkey=require_authkey(authkey))
+    server = manager.get_server()
+    print(f"🗃️  Shared store listening on {address}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else SHARED_STORE_ADDRESS)
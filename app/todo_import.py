@@ -0,0 +1,145 @@
+"""
+Streaming bulk import of todos from NDJSON or CSV
+"""
+import os
+import csv
+import json
+import codecs
+from typing import Callable, Iterable, Iterator, Optional
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from . import crud, models
+
+# Rows validated and inserted per transaction
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+IMPORT_FORMATS = ("ndjson", "csv")
+# Longest accepted line; a todo row is far shorter, so anything longer is a bad upload
+IMPORT_MAX_LINE_CHARS = 65536
+# Rejected rows listed in an import summary; the rest are only counted
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+class ImportFormatError(ValueError):
+    """The upload cannot be parsed any further"""
+
+_INVALID_JSON = object()
+
+def iter_text_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode UTF-8 byte chunks into lines (line endings kept) without buffering the whole upload"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line + "\n"
+            if len(pending) > IMPORT_MAX_LINE_CHARS:
+                raise ImportFormatError(f"Line longer than {IMPORT_MAX_LINE_CHARS} characters")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportFormatError("Upload is not valid UTF-8")
+    if pending:
+        yield pending
+
+def _ndjson_records(lines: Iterable[str]) -> Iterator[tuple[int, object]]:
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, _INVALID_JSON
+
+def _csv_records(lines: Iterable[str]) -> Iterator[tuple[int, object]]:
+    reader = csv.DictReader(lines)
+    try:
+        if not reader.fieldnames or "title" not in reader.fieldnames:
+            raise ImportFormatError("CSV header must include a title column")
+        for number, record in enumerate(reader, start=1):
+            # Empty cells mean "not given" so the TodoImportRow defaults apply
+            yield number, {key: value for key, value in record.items() if key is not None and value != ""}
+    except csv.Error as e:
+        raise ImportFormatError(f"Malformed CSV: {str(e)}")
+
+def _validate(number: int, record) -> tuple[dict, dict]:
+    """(row, None) for a valid record or (None, error report)"""
+    if record is _INVALID_JSON:
+        return None, {"type": "error", "row": number, "errors": [{"field": None, "message": "Invalid JSON"}]}
+    if not isinstance(record, dict):
+        return None, {"type": "error", "row": number, "errors": [{"field": None, "message": "Expected a JSON object"}]}
+    try:
+        todo = models.TodoImportRow.model_validate(record)
+    except ValidationError as e:
+        errors = [{"field": ".".join(str(part) for part in error["loc"]) or None, "message": error["msg"]}
+                  for error in e.errors()]
+        return None, {"type": "error", "row": number, "errors": errors}
+    return {"title": todo.title, "description": todo.description or "", "completed": todo.completed}, None
+
+def iter_import(db_factory: Callable[[], Session], owner_id: int, lines: Iterable[str], fmt: str,
+                chunk_rows: int = IMPORT_CHUNK_ROWS) -> Iterator[dict]:
+    """Validate and insert todos chunk by chunk, yielding report records as it goes.
+
+    Yields {"type": "error", "row", "errors"} for each rejected row, a
+    {"type": "progress", ...} after each committed chunk and finally a
+    {"type": "summary", ...}. Chunks are separate transactions, so rows
+    imported before a fatal format error stay imported.
+    """
+    records = _csv_records(lines) if fmt == "csv" else _ndjson_records(lines)
+    totals = {"rows": 0, "imported": 0, "failed": 0}
+    db = db_factory()
+    try:
+        def flush(chunk):
+            crud.insert_todo_rows(db, owner_id, chunk)
+            totals["imported"] += len(chunk)
+            return {"type": "progress", "chunk": len(chunk), **totals}
+
+        chunk = []
+        try:
+            for number, record in records:
+                totals["rows"] += 1
+                row, error = _validate(number, record)
+                if error:
+                    totals["failed"] += 1
+                    yield error
+                    continue
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    yield flush(chunk)
+                    chunk = []
+        except ImportFormatError as e:
+            if chunk:
+                yield flush(chunk)
+            yield {"type": "summary", "error": str(e), **totals}
+            return
+        if chunk:
+            yield flush(chunk)
+        yield {"type": "summary", "error": None, **totals}
+    finally:
+        db.close()
+
+def summarize_import(records: Iterator[dict], on_progress: Optional[Callable[[dict], None]] = None,
+                     max_errors: int = IMPORT_MAX_REPORTED_ERRORS) -> dict:
+    """Run an import to completion and fold its records into one summary"""
+    errors = []
+    summary = {}
+    try:
+        for record in records:
+            if record["type"] == "error":
+                if len(errors) < max_errors:
+                    errors.append({"row": record["row"], "errors": record["errors"]})
+            elif record["type"] == "progress":
+                if on_progress:
+                    on_progress(record)
+            else:
+                summary = record
+    finally:
+        records.close()
+    return {
+        "rows": summary.get("rows", 0),
+        "imported": summary.get("imported", 0),
+        "failed": summary.get("failed", 0),
+        "error": summary.get("error"),
+        "errors": errors
+    }
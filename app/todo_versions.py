@@ -0,0 +1,98 @@
+"""
+Per-user todo versions and the ETags derived from them
+"""
+import os
+import time
+import hashlib
+import threading
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+from .pagination import encode_cursor, decode_cursor
+
+# Versions bumped by other workers become visible after at most this long
+TODO_VERSION_CACHE_TTL_SECONDS = float(os.getenv("TODO_VERSION_CACHE_TTL_SECONDS", "2"))
+TODO_VERSION_CACHE_MAX_ENTRIES = int(os.getenv("TODO_VERSION_CACHE_MAX_ENTRIES", "100000"))
+# Tombstones are kept this long; older sync cursors get a full snapshot instead
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+class TodoVersionCache:
+    """In-memory copy of users.todo_version.
+
+    Writes in this process update the entry right after they commit, so a
+    conditional GET can be answered without touching the database.
+    """
+
+    def __init__(self, ttl_seconds: float = TODO_VERSION_CACHE_TTL_SECONDS,
+                 max_entries: int = TODO_VERSION_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._versions: dict[int, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, user_id: int) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        version = db.scalar(select(models.User.todo_version).where(models.User.id == user_id)) or 0
+        self.record(user_id, version)
+        return version
+
+    def record(self, user_id: int, version: int):
+        """Remember a committed version; never moves an entry backwards"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is not None and entry[0] > version:
+                self._versions[user_id] = (entry[0], now)
+                return
+            if entry is None and len(self._versions) >= self.max_entries:
+                self._versions.pop(next(iter(self._versions)))
+            self._versions[user_id] = (version, now)
+
+    def forget(self, user_id: int):
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._versions),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# Global cache instance
+todo_versions = TodoVersionCache()
+
+def todo_etag(user_id: int, version: int, request: Request, *parts) -> str:
+    """Strong ETag for a todo read: owner, version and everything that shapes the response"""
+    raw = f"{user_id}:{version}:{request.url.path}:{sorted(request.query_params.multi_items())}:{parts}"
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for this header)"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def encode_sync_cursor(version: int) -> str:
+    return encode_cursor(version, int(time.time()))
+
+def decode_sync_cursor(cursor: str) -> Optional[int]:
+    """Version a delta-sync cursor points at, or None if its tombstones may be purged"""
+    version, issued_at = decode_cursor(cursor, int, int)
+    if time.time() - issued_at >= TOMBSTONE_RETENTION_DAYS * 86400:
+        return None
+    return version
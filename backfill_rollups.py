@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Fill in the hourly activity rollups behind /admin/analytics/timeseries for
+the time before the write paths started keeping them, from the users and
+todos tables.
+
+Usage: python backfill_rollups.py [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+
+Run it after the activity_rollups migration. Hours that already have rollups
+are never touched, because the counts written live are exact and a backfill
+would replace them with undercounts. Rerunning it is harmless, and it is
+safe to run while the API is serving traffic. --since defaults to the first
+signup.
+"""
+import argparse
+from datetime import datetime
+from sqlalchemy import select, func
+from app.database import SessionLocal, engine, Base
+from app import models, rollups
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the activity rollups")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="first day to fill in (UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat,
+                        help="fill in up to this day (UTC, default: now or the first live rollup)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        since = args.since or db.scalar(select(func.min(models.User.created_at)))
+        if since is None:
+            print("✅ No users yet, nothing to backfill")
+            return
+        if isinstance(since, str):
+            since = datetime.fromisoformat(since)
+        print(f"📊 Filling in activity rollups from {since:%Y-%m-%d %H:00} UTC")
+        written = rollups.backfill(db, since, args.until)
+        print(f"✅ Wrote {written} rollup rows")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark JSON response encoding for the list payloads: GET /todos/
+(a list of TodoOut rows) and GET /admin/todos (todos with owners and
+datetimes, wrapped in an object).
+
+Usage: python bench_json.py [repeats]
+
+"before" is the stdlib encoder those routes used: JSONResponse on the
+plain rows for /todos/, jsonable_encoder plus JSONResponse for
+/admin/todos. "after" is FastJSONResponse on the same content (orjson
+when installed, otherwise the stdlib fallback).
+"""
+import sys
+import time
+import statistics
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.responses import FastJSONResponse, orjson
+
+SIZES = (1000, 10000, 100000)
+
+def todo_rows(count):
+    return [
+        {"id": i, "title": f"Todo {i}", "description": "Benchmark todo " * 4, "completed": i % 3 == 0, "owner_id": i % 50}
+        for i in range(count)
+    ]
+
+def admin_payload(count):
+    started = datetime(2024, 1, 1)
+    todos = [
+        dict(row, created_at=started + timedelta(seconds=row["id"]),
+             owner_username=f"user{row['owner_id']}", owner_email=f"user{row['owner_id']}@example.com")
+        for row in todo_rows(count)
+    ]
+    return {"todos": todos, "total": count, "filtered_count": count}
+
+def todos_before(rows):
+    return JSONResponse(rows).body
+
+def todos_after(rows):
+    return FastJSONResponse(rows).body
+
+def admin_before(payload):
+    return JSONResponse(jsonable_encoder(payload)).body
+
+def admin_after(payload):
+    return FastJSONResponse(payload).body
+
+def timed(encode, content, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = encode(content)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(body)
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}, "
+          f"median of {repeats}")
+    for label, build, before, after in (("/todos/", todo_rows, todos_before, todos_after),
+                                        ("/admin/todos", admin_payload, admin_before, admin_after)):
+        for size in SIZES:
+            content = build(size)
+            before_ms, before_bytes = timed(before, content, repeats)
+            after_ms, after_bytes = timed(after, content, repeats)
+            print(f"{label:<13} {size:>7} items  before={before_ms:9.1f}ms  after={after_ms:8.1f}ms  "
+                  f"x{before_ms / after_ms:5.1f}  body={after_bytes / 1e6:.1f}MB")
+
+if __name__ == "__main__":
+    main()
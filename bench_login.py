@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark the database work of a successful login: the old multi-commit flow
+versus SessionManager.start_login_session.
+
+Usage: python bench_login.py [iterations]
+
+Runs against a throwaway SQLite file unless DATABASE_URL is set. Password
+verification is identical in both flows, so it is left out and the numbers
+only cover database round trips.
+"""
+import os
+import sys
+import tempfile
+import time
+import statistics
+from datetime import datetime, timedelta
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+
+from sqlalchemy import event, and_
+from app.database import engine, SessionLocal, Base
+from app import models, crud
+from app.passwords import get_context
+from app.rate_limit import RateLimiter, SessionManager, LOCKOUT_DURATION_MINUTES
+
+USERNAME = "bench_user"
+IP_ADDRESS = "127.0.0.1"
+USER_AGENT = "bench_login"
+
+round_trips = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global round_trips
+    round_trips += 1
+
+@event.listens_for(engine, "commit")
+def count_commit(conn):
+    global round_trips
+    round_trips += 1
+
+def legacy_login(db):
+    """The login path as it was before the consolidated transaction"""
+    cutoff_time = datetime.utcnow() - timedelta(minutes=LOCKOUT_DURATION_MINUTES)
+    db.query(models.LoginAttempt).filter(
+        and_(
+            models.LoginAttempt.username == USERNAME,
+            models.LoginAttempt.ip_address == IP_ADDRESS,
+            models.LoginAttempt.success == False,
+            models.LoginAttempt.attempted_at > cutoff_time
+        )
+    ).count()
+    user = crud.get_user_by_username(db, USERNAME)
+    db.add(models.LoginAttempt(user_id=user.id, username=USERNAME, ip_address=IP_ADDRESS,
+                               user_agent=USER_AGENT, success=True))
+    db.commit()
+    session = SessionManager.create_session(db, user.id, IP_ADDRESS, USER_AGENT)
+    return session.session_token
+
+def consolidated_login(db):
+    RateLimiter.check_login_attempts(db, USERNAME, IP_ADDRESS)
+    user = crud.get_user_by_username(db, USERNAME)
+    return SessionManager.start_login_session(db, user.id, USERNAME, IP_ADDRESS, USER_AGENT)
+
+def run(label, login, iterations):
+    global round_trips
+    latencies = []
+    trips = []
+    for _ in range(iterations):
+        db = SessionLocal()
+        try:
+            round_trips = 0
+            started = time.perf_counter()
+            login(db)
+            latencies.append((time.perf_counter() - started) * 1000)
+            trips.append(round_trips)
+        finally:
+            db.close()
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<14} round_trips={statistics.mean(trips):.1f} "
+          f"p50={statistics.median(latencies):.2f}ms p99={p99:.2f}ms")
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if not crud.get_user_by_username(db, USERNAME):
+        db.add(models.User(username=USERNAME, email="bench@example.com", is_active=True,
+                           hashed_password=get_context(4).hash("bench-password")))
+        db.commit()
+    db.close()
+
+    print(f"Database: {engine.url}, {iterations} logins per flow")
+    run("before", legacy_login, iterations)
+    run("after", consolidated_login, iterations)
+
+if __name__ == "__main__":
+    main()
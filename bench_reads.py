@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the list endpoints' read path: ORM objects validated through the
+response_model versus the plain-row path in crud (get_todos_for_user,
+get_user_rows).
+
+Usage: python bench_reads.py [rows] [repeats]
+
+Runs against a throwaway SQLite file unless DATABASE_URL is set. Each run
+covers the query, serialization to a response body and nothing else; CPU
+time (median) and tracemalloc peak are reported per 10k rows.
+"""
+import os
+import sys
+import json
+import tempfile
+import time
+import statistics
+import tracemalloc
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_reads.db")
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, desc, func, select
+from app.database import engine, SessionLocal, Base
+from app import models, crud
+
+OWNER = "bench_reads"
+
+todo_adapter = TypeAdapter(list[models.TodoOut])
+user_adapter = TypeAdapter(list[models.UserOut])
+
+def respond(adapter, objects) -> bytes:
+    """What FastAPI does with a response_model: validate, dump to JSON types, encode"""
+    validated = adapter.validate_python(objects, from_attributes=True)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+def orm_todos(db, owner_id):
+    todos = db.query(models.Todo).filter(models.Todo.owner_id == owner_id).order_by(desc(models.Todo.created_at)).all()
+    return respond(todo_adapter, todos)
+
+def row_todos(db, owner_id):
+    todos, _ = crud.get_todos_for_user(db, owner_id)
+    return json.dumps(todos).encode()
+
+def orm_users(db, owner_id):
+    return respond(user_adapter, db.query(models.User).order_by(desc(models.User.created_at)).all())
+
+def row_users(db, owner_id):
+    return json.dumps(crud.get_user_rows(db)).encode()
+
+def seed(rows: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        owner = crud.get_user_by_username(db, OWNER)
+        if not owner:
+            owner = models.User(username=OWNER, email="bench@example.com", hashed_password="x", is_active=True)
+            db.add(owner)
+            db.commit()
+        existing = db.scalar(select(func.count()).select_from(models.Todo).where(models.Todo.owner_id == owner.id))
+        if existing < rows:
+            db.execute(insert(models.Todo), [
+                {"title": f"Todo {i}", "description": "Benchmark todo " * 4, "completed": i % 3 == 0, "owner_id": owner.id}
+                for i in range(existing, rows)
+            ])
+        users = db.scalar(select(func.count()).select_from(models.User))
+        if users < rows:
+            db.execute(insert(models.User), [
+                {"username": f"bench_{i}", "email": f"bench_{i}@example.com", "hashed_password": "x", "is_active": True}
+                for i in range(users, rows)
+            ])
+        db.commit()
+        return owner.id
+    finally:
+        db.close()
+
+def measure(label, read, owner_id, rows, repeats):
+    cpu = []
+    for _ in range(repeats):
+        db = SessionLocal()
+        try:
+            started = time.process_time()
+            body = read(db, owner_id)
+            cpu.append(time.process_time() - started)
+        finally:
+            db.close()
+    # Separate run for memory, tracemalloc slows everything down
+    db = SessionLocal()
+    try:
+        tracemalloc.start()
+        read(db, owner_id)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        db.close()
+    scale = 10000 / rows
+    print(f"{label:<12} cpu={statistics.median(cpu) * scale * 1000:8.1f}ms/10k "
+          f"peak={peak * scale / 1e6:6.1f}MB/10k body={len(body) / 1e6:.1f}MB")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    owner_id = seed(rows)
+    print(f"Database: {engine.url}, {rows} rows, median of {repeats}")
+    measure("todos orm", orm_todos, owner_id, rows, repeats)
+    measure("todos rows", row_todos, owner_id, rows, repeats)
+    measure("users orm", orm_users, owner_id, rows, repeats)
+    measure("users rows", row_users, owner_id, rows, repeats)
+
+if __name__ == "__main__":
+    main()
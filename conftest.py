@@ -0,0 +1,89 @@
+"""
+Shared pytest fixtures: a throwaway SQLite database, emptied before every
+test, and an in-process client for app.main
+"""
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="taskmaster_tests_")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(_workdir, "test.db"))
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("REPORTS_DIR", os.path.join(_workdir, "reports"))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app import crud, rate_limit
+from app.database import engine, Base, SessionLocal
+from app.main import app
+from app.passwords import hasher
+from app.principal_cache import principal_cache
+from app.todo_versions import todo_versions
+
+# Manual script that talks to a running server
+collect_ignore = ["test_admin_endpoints.py"]
+
+PASSWORD = "secret123"
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_hashing():
+    """bcrypt's minimum cost; the suite creates a lot of users"""
+    hasher.rounds = 4
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Empty every table and the in-process caches that remember rows"""
+    rate_limit.activity_buffer.flush()
+    rate_limit.login_audit.flush()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("DELETE FROM todos_fts"))
+    principal_cache.clear()
+    todo_versions._versions.clear()
+    rate_limit.login_limiter = rate_limit.create_login_limiter("memory")
+    yield
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def make_user():
+    """Create an active user and return its id"""
+    def make(username: str, admin: bool = False, active: bool = True) -> int:
+        session = SessionLocal()
+        try:
+            user = crud.create_user(session, username, f"{username}@example.com", PASSWORD)
+            crud.update_user_flags(session, user, is_active=active, is_admin=admin)
+            return user.id
+        finally:
+            session.close()
+    return make
+
+@pytest.fixture
+def login(client):
+    """Log a user in and return the Authorization header"""
+    def log_in(username: str, password: str = PASSWORD) -> dict:
+        response = client.post("/auth/token", data={"username": username, "password": password})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return log_in
+
+@pytest.fixture
+def user_headers(make_user, login):
+    make_user("alice")
+    return login("alice")
+
+@pytest.fixture
+def admin_headers(make_user, login):
+    make_user("root", admin=True)
+    return login("root")
@@ -65,8 +65,15 @@ const Dashboard = () => {
 
   const loadTodos = async () => {
     try {
-      const data = await todosAPI.getTodos();
-      setTodos(data);
+      // Show the first page straight away and append the rest as it arrives
+      let page = await todosAPI.getTodosPage();
+      setTodos(page.todos);
+      setLoading(false);
+      while (page.nextCursor) {
+        page = await todosAPI.getTodosPage({ cursor: page.nextCursor });
+        const more = page.todos;
+        setTodos((loaded) => [...loaded, ...more]);
+      }
     } catch (error) {
       console.error('Failed to load todos:', error);
     } finally {
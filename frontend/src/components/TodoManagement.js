@@ -9,9 +9,10 @@ const TodoManagement = () => {
     user_id: '',
     completed: '',
     limit: 50,
-    offset: 0
+    cursor: ''
   });
   const [totalTodos, setTotalTodos] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [users, setUsers] = useState([]);
   const [actionLoading, setActionLoading] = useState({});
 
@@ -42,8 +43,10 @@ const TodoManagement = () => {
         Object.entries(filters).filter(([_, value]) => value !== '' && value !== null)
       );
       const data = await adminAPI.getAllTodos(cleanFilters);
-      setTodos(data.todos || []);
+      // A cursor means "load more": append the next page
+      setTodos(prev => (filters.cursor ? [...prev, ...(data.todos || [])] : (data.todos || [])));
       setTotalTodos(data.total || 0);
+      setNextCursor(data.nextCursor);
     } catch (err) {
       setError('Failed to load todos');
       console.error('Error fetching todos:', err);
@@ -74,14 +77,14 @@ const TodoManagement = () => {
     setFilters(prev => ({
       ...prev,
       [key]: value,
-      offset: 0 // Reset offset when changing filters
+      cursor: '' // Start from the first page when changing filters
     }));
   };
 
   const handleLoadMore = () => {
     setFilters(prev => ({
       ...prev,
-      offset: prev.offset + prev.limit
+      cursor: nextCursor
     }));
   };
 
@@ -191,7 +194,7 @@ const TodoManagement = () => {
           </div>
           <div className="flex items-end">
             <button
-              onClick={() => setFilters({ user_id: '', completed: '', limit: 50, offset: 0 })}
+              onClick={() => setFilters({ user_id: '', completed: '', limit: 50, cursor: '' })}
               className="w-full bg-gray-100 hover:bg-gray-200 text-gray-700 px-4 py-2 rounded-md text-sm font-medium"
             >
               Clear Filters
@@ -285,7 +288,7 @@ const TodoManagement = () => {
       </div>
 
       {/* Load More Button */}
-      {todos.length > 0 && todos.length < totalTodos && (
+      {todos.length > 0 && nextCursor && (
         <div className="text-center">
           <button
             onClick={handleLoadMore}
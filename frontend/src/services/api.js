@@ -65,9 +65,26 @@ export const authAPI = {
 
 // Todos API
 export const todosAPI = {
+  // One page of todos; pass nextCursor back as cursor to get the following page
+  getTodosPage: async ({ cursor, limit } = {}) => {
+    const params = new URLSearchParams();
+    if (limit) params.append('limit', limit);
+    if (cursor) params.append('cursor', cursor);
+
+    const response = await api.get(`/todos/?${params.toString()}`);
+    return { todos: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  },
+
+  // Every todo, following X-Next-Cursor until the last page
   getTodos: async () => {
-    const response = await api.get('/todos/');
-    return response.data;
+    const todos = [];
+    let cursor = null;
+    do {
+      const page = await todosAPI.getTodosPage({ cursor });
+      todos.push(...page.todos);
+      cursor = page.nextCursor;
+    } while (cursor);
+    return todos;
   },
 
   createTodo: async (todoData) => {
@@ -146,10 +163,10 @@ export const adminAPI = {
     if (filters.user_id) params.append('user_id', filters.user_id);
     if (filters.completed !== undefined) params.append('completed', filters.completed);
     if (filters.limit) params.append('limit', filters.limit);
-    if (filters.offset) params.append('offset', filters.offset);
+    if (filters.cursor) params.append('cursor', filters.cursor);
     
     const response = await api.get(`/admin/todos?${params.toString()}`);
-    return response.data;
+    return { ...response.data, nextCursor: response.headers['x-next-cursor'] || null };
   },
 
   deleteTodo: async (todoId) => {
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Bulk-import todos for a user from an NDJSON or CSV file.
+
+Usage: python import_todos.py <username> <file> [--format ndjson|csv]
+
+The file is read line by line and inserted in chunks (IMPORT_CHUNK_ROWS),
+so very large files do not need to fit in memory. Rejected rows are printed
+and skipped.
+"""
+import sys
+import argparse
+from app.database import SessionLocal, engine, Base
+from app import crud
+from app.todo_import import iter_import, iter_text_lines, IMPORT_FORMATS
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import todos from NDJSON or CSV")
+    parser.add_argument("username")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS,
+                        help="defaults to csv for .csv files, ndjson otherwise")
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "ndjson")
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = crud.get_user_by_username(db, args.username)
+    db.close()
+    if not user:
+        print(f"❌ User '{args.username}' not found")
+        sys.exit(1)
+
+    with open(args.file, "rb") as upload:
+        chunks = iter(lambda: upload.read(64 * 1024), b"")
+        for record in iter_import(SessionLocal, user.id, iter_text_lines(chunks), fmt):
+            if record["type"] == "error":
+                messages = "; ".join(f"{error['field'] or 'row'}: {error['message']}" for error in record["errors"])
+                print(f"⚠️  Row {record['row']}: {messages}")
+            elif record["type"] == "progress":
+                print(f"📥 {record['imported']} imported, {record['failed']} rejected, {record['rows']} rows read")
+            else:
+                summary = record
+
+    if summary["error"]:
+        print(f"❌ Stopped early: {summary['error']}")
+    print(f"✅ Imported {summary['imported']} of {summary['rows']} rows for {args.username} "
+          f"({summary['failed']} rejected)")
+    sys.exit(1 if summary["error"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from datetime import date
+from sqlalchemy import select
+from app import counters, crud, models
+
+def _bulk(client, headers, **body):
+    return client.post("/admin/users/bulk", json=body, headers=headers)
+
+def _flags(db) -> dict[str, tuple[bool, bool]]:
+    db.expire_all()
+    return {user.username: (user.is_active, user.is_admin) for user in db.scalars(select(models.User))}
+
+def test_promote_by_ids_skips_unchanged_users_and_the_caller(client, db, make_user, admin_headers):
+    alice, bob = make_user("alice"), make_user("bob", admin=True)
+    root = db.scalar(select(models.User.id).where(models.User.username == "root"))
+    response = _bulk(client, admin_headers, action="promote", ids=[alice, bob, root, 999999])
+    assert response.json() == {"action": "promote", "affected": 1, "sessions_revoked": 0, "todos_deleted": 0}
+    assert _flags(db)["alice"] == (True, True)
+    assert counters.read(db, date.today())["admin_users"] == 3
+
+def test_deactivate_by_filter_revokes_sessions(client, db, make_user, login, admin_headers):
+    make_user("alice")
+    make_user("bob")
+    bob = login("bob")
+    make_user("carol", admin=True)
+    response = _bulk(client, admin_headers, action="deactivate", filter={"is_admin": False})
+    assert response.json()["affected"] == 2
+    assert response.json()["sessions_revoked"] == 1
+    assert client.get("/auth/me", headers=bob).status_code == 401
+    assert _flags(db)["carol"] == (True, True)
+    assert counters.reconcile(db) == {}
+
+def test_delete_removes_todos_and_counts(client, db, make_user, login, admin_headers):
+    make_user("alice")
+    alice = login("alice")
+    for i in range(3):
+        client.post("/todos/", json={"title": f"todo {i}"}, headers=alice)
+    make_user("bob")
+    response = _bulk(client, admin_headers, action="delete", filter={"is_admin": False})
+    assert response.json() == {"action": "delete", "affected": 2, "sessions_revoked": 1, "todos_deleted": 3}
+    assert set(_flags(db)) == {"root"}
+    assert db.scalar(select(models.Todo.id)) is None
+    assert counters.reconcile(db) == {}
+
+def test_chunks_cover_every_matching_user(db, make_user):
+    ids = [make_user(f"user{i}") for i in range(7)]
+    totals, changed = crud.bulk_user_action(db, "deactivate", conditions=crud.bulk_user_conditions(is_admin=False),
+                                            chunk_size=3)
+    assert totals["affected"] == 7
+    assert sorted(changed) == ids
+
+def test_request_must_name_its_users(client, admin_headers, user_headers):
+    assert _bulk(client, admin_headers, action="promote").status_code == 400
+    assert _bulk(client, admin_headers, action="promote", ids=[1], filter={"is_admin": False}).status_code == 400
+    assert _bulk(client, admin_headers, action="delete", filter={}).status_code == 400
+    assert _bulk(client, user_headers, action="promote", ids=[1]).status_code == 403
@@ -0,0 +1,51 @@
+def _create(client, headers, count: int) -> list[int]:
+    return [client.post("/todos/", json={"title": f"todo {i}"}, headers=headers).json()["id"] for i in range(count)]
+
+def _pages(client, headers, **params) -> list[dict]:
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/admin/todos", params=query, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_cursor_pages_cover_every_todo_once(client, make_user, login, admin_headers, user_headers):
+    make_user("bob")
+    ids = _create(client, user_headers, 3) + _create(client, login("bob"), 2)
+    pages = _pages(client, admin_headers, limit=2)
+    assert [page["filtered_count"] for page in pages] == [2, 2, 1]
+    assert [todo["id"] for page in pages for todo in page["todos"]] == sorted(ids, reverse=True)
+    assert {page["total"] for page in pages} == {5}
+
+def test_filters_apply_to_pages_and_totals(client, make_user, login, admin_headers, user_headers):
+    make_user("bob")
+    mine = _create(client, user_headers, 3)
+    _create(client, login("bob"), 2)
+    client.put(f"/todos/{mine[0]}", json={"completed": True}, headers=user_headers)
+    alice = client.get("/auth/me", headers=user_headers).json()["id"]
+
+    by_owner = _pages(client, admin_headers, user_id=alice, limit=2)
+    assert sorted(todo["id"] for page in by_owner for todo in page["todos"]) == sorted(mine)
+    assert (by_owner[0]["total"], by_owner[0]["total_estimated"]) == (3, False)
+
+    done = _pages(client, admin_headers, completed=True)[0]
+    assert [todo["id"] for todo in done["todos"]] == [mine[0]]
+    assert done["total"] == 1
+    assert _pages(client, admin_headers, completed=False)[0]["total"] == 4
+
+def test_exact_totals_match_the_counters(client, admin_headers, user_headers):
+    _create(client, user_headers, 3)
+    cached = client.get("/admin/todos", headers=admin_headers).json()
+    exact = client.get("/admin/todos", params={"with_total": True}, headers=admin_headers).json()
+    assert cached["total"] == exact["total"] == 3
+
+def test_offset_is_still_honoured(client, admin_headers, user_headers):
+    ids = _create(client, user_headers, 3)
+    page = client.get("/admin/todos", params={"offset": 1, "limit": 1}, headers=admin_headers).json()
+    assert [todo["id"] for todo in page["todos"]] == [sorted(ids)[1]]
+
+def test_malformed_cursor_is_a_400(client, admin_headers):
+    assert client.get("/admin/todos", params={"cursor": "nope"}, headers=admin_headers).status_code == 400
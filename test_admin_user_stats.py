@@ -0,0 +1,59 @@
+from sqlalchemy import event
+from app.database import engine
+
+def _pages(client, headers, **params) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/admin/users/detailed", params=query, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_counts_per_user(client, make_user, login, admin_headers):
+    make_user("alice")
+    alice = login("alice")
+    ids = [client.post("/todos/", json={"title": f"todo {i}"}, headers=alice).json()["id"] for i in range(4)]
+    client.put(f"/todos/{ids[0]}", json={"completed": True}, headers=alice)
+    users = {user["username"]: user for user in _pages(client, admin_headers)[0]}
+    assert {name: (user["todo_count"], user["completed_count"], user["pending_count"], user["completion_rate"])
+            for name, user in users.items()} == {"alice": (4, 1, 3, 25.0), "root": (0, 0, 0, 0)}
+
+def test_pages_are_newest_first_and_complete(client, make_user, admin_headers):
+    ids = [make_user(f"user{i}") for i in range(5)]
+    pages = _pages(client, admin_headers, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2]
+    listed = [user["id"] for user in sum(pages, [])]
+    assert len(set(listed)) == 6
+    assert [user_id for user_id in listed if user_id in ids] == sorted(ids, reverse=True)
+
+def test_prefix_filter_matches_username_or_email(client, make_user, admin_headers):
+    make_user("carol")
+    make_user("caroline")
+    make_user("dave")
+    users = _pages(client, admin_headers, q="carol")[0]
+    assert sorted(user["username"] for user in users) == ["carol", "caroline"]
+    # Wildcards are matched literally
+    assert _pages(client, admin_headers, q="%")[0] == []
+
+def test_one_query_per_page(client, make_user, admin_headers):
+    for i in range(3):
+        make_user(f"user{i}")
+    client.get("/admin/users/detailed", headers=admin_headers)
+    selects = []
+
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    try:
+        client.get("/admin/users/detailed", params={"limit": 2}, headers=admin_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_statement)
+    assert len(selects) == 1
+
+def test_requires_an_admin(client, user_headers):
+    assert client.get("/admin/users/detailed", headers=user_headers).status_code == 403
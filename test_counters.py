@@ -0,0 +1,105 @@
+import threading
+from datetime import date
+from sqlalchemy import delete, select, func
+from app import counters, crud, models
+from app.scheduler import BackgroundScheduler
+from app.database import SessionLocal
+
+def _counts(db) -> dict[str, int]:
+    db.expire_all()
+    return counters.read(db, date.today())
+
+def _actual(db) -> tuple[int, int]:
+    todos = db.scalar(select(func.count()).select_from(models.Todo))
+    completed = db.scalar(select(func.count()).select_from(models.Todo).where(models.Todo.completed == True))
+    return todos, completed
+
+def _todo_counts(db) -> tuple[int, int]:
+    counts = _counts(db)
+    return counts["todos"], counts["completed_todos"]
+
+def test_user_counters(client, db, make_user, admin_headers):
+    make_user("alice")
+    make_user("bob", active=False)
+    counts = _counts(db)
+    assert (counts["users"], counts["active_users"], counts["admin_users"], counts["signups"]) == (3, 2, 1, 3)
+    assert counters.reconcile(db) == {}
+
+def test_todo_writes_keep_the_counts_exact(client, db, user_headers):
+    ids = [client.post("/todos/", json={"title": f"todo {i}"}, headers=user_headers).json()["id"] for i in range(4)]
+    client.put(f"/todos/{ids[0]}", json={"completed": True}, headers=user_headers)
+    client.put(f"/todos/{ids[0]}", json={"completed": True}, headers=user_headers)
+    client.patch(f"/todos/{ids[1]}/toggle", headers=user_headers)
+    client.delete(f"/todos/{ids[1]}", headers=user_headers)
+    client.post("/todos/batch", json={"operations": [
+        {"op": "create", "title": "batched", "completed": True},
+        {"op": "toggle", "id": ids[2]},
+        {"op": "delete", "id": ids[0]}
+    ]}, headers=user_headers)
+    client.post("/todos/import", content=b'{"title": "imported", "completed": true}\n', headers=user_headers)
+    assert _todo_counts(db) == _actual(db) == (4, 3)
+    assert counters.reconcile(db) == {}
+
+def test_deleting_a_user_removes_their_counts(client, db, make_user, login, admin_headers):
+    user_id = make_user("alice")
+    alice = login("alice")
+    for i in range(3):
+        todo_id = client.post("/todos/", json={"title": f"todo {i}"}, headers=alice).json()["id"]
+    client.patch(f"/todos/{todo_id}/toggle", headers=alice)
+    assert client.delete(f"/admin/users/{user_id}", headers=admin_headers).status_code == 200
+    counts = _counts(db)
+    assert (counts["users"], counts["todos"], counts["completed_todos"]) == (1, 0, 0)
+    assert counters.reconcile(db) == {}
+
+def test_reconcile_corrects_drift(db, make_user):
+    user_id = make_user("alice")
+    counters.add(db, user_id, {"todos": 5, "users": -1})
+    db.commit()
+    assert counters.reconcile(db) == {"todos": -5, "users": 1}
+    assert counters.reconcile(db) == {}
+
+def test_recent_reconcile_is_not_repeated(db, make_user):
+    user_id = make_user("alice")
+    counters.reconcile(db)
+    counters.add(db, user_id, {"todos": 5})
+    db.commit()
+    # Another worker reconciled a moment ago
+    assert counters.reconcile(db, skip_if_newer_than=60) is None
+    assert _counts(db)["todos"] == 5
+    assert counters.reconcile(db, skip_if_newer_than=0) == {"todos": -5}
+
+def test_startup_only_fills_empty_counters(db, make_user):
+    user_id = make_user("alice")
+    counters.add(db, user_id, {"todos": 5})
+    db.commit()
+    BackgroundScheduler()._reconcile_counters(startup=True)
+    assert _counts(db)["todos"] == 5
+    db.execute(delete(models.DashboardCounter))
+    db.commit()
+    assert counters.is_empty(db)
+    BackgroundScheduler()._reconcile_counters(startup=True)
+    assert _counts(db)["users"] == 1
+
+def test_concurrent_completion_updates_stay_consistent(db, make_user):
+    """Writers racing on one todo must each see the value they overwrite"""
+    user_id = make_user("alice")
+    todo_id = crud.create_todo(db, user_id, "contended", "").id
+    errors = []
+
+    def writer(completed: bool):
+        session = SessionLocal()
+        try:
+            for _ in range(15):
+                crud.update_owned_todo(session, user_id, todo_id, completed=completed)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=writer, args=(index % 2 == 0,)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert _todo_counts(db) == _actual(db)
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app import events
+from app.events import TodoEventHub, LocalFanout, SharedStoreFanout, CLOSED, todo_event
+from app.shared_store import start_local_store, get_store, UnknownListener
+
+@pytest.fixture(scope="module")
+def local_store():
+    manager, address, authkey = start_local_store()
+    yield address, authkey
+    manager.shutdown()
+
+@pytest.fixture
+def workers(local_store, monkeypatch):
+    """Two hubs that fan out through the same store, like two API workers"""
+    monkeypatch.setattr(events, "FANOUT_POLL_SECONDS", 0.1)
+    address, authkey = local_store
+    hubs = [TodoEventHub(fanout=SharedStoreFanout(address, authkey)) for _ in range(2)]
+    for hub in hubs:
+        hub.start()
+    yield hubs
+    for hub in hubs:
+        hub.stop()
+
+async def _receive(hub: TodoEventHub, user_id: int, publish, timeout: float = 5.0):
+    subscription = hub.subscribe(user_id)
+    try:
+        publish()
+        return await subscription.get(timeout)
+    finally:
+        hub.unsubscribe(subscription)
+
+def test_events_reach_only_the_owner():
+    hub = TodoEventHub(fanout=LocalFanout())
+
+    async def scenario():
+        mine, theirs = hub.subscribe(1), hub.subscribe(2)
+        hub.publish(1, todo_event("deleted", 7))
+        assert await mine.get(1) == {"type": "todo.deleted", "todo": {"id": 7}}
+        assert await theirs.get(0.05) is None
+
+    asyncio.run(scenario())
+    assert hub.stats()["published"] == 1
+
+def test_slow_consumer_is_disconnected():
+    hub = TodoEventHub(max_queue=2, fanout=LocalFanout())
+
+    async def scenario():
+        subscription = hub.subscribe(1)
+        for todo_id in range(3):
+            hub.publish(1, todo_event("deleted", todo_id))
+        await asyncio.sleep(0)
+        assert await subscription.get(1) is CLOSED
+        assert subscription.close_reason == "slow consumer"
+
+    asyncio.run(scenario())
+    assert hub.stats()["dropped_subscribers"] == 1
+    assert hub.stats()["streams"] == 0
+
+def test_events_cross_workers(workers):
+    first, second = workers
+    event = todo_event("deleted", 42)
+    assert asyncio.run(_receive(second, 1, lambda: first.publish(1, event))) == event
+    assert asyncio.run(_receive(first, 1, lambda: second.publish(1, event))) == event
+
+def test_listener_recovers_a_lost_mailbox(workers, local_store):
+    first, second = workers
+    # What a worker sees after the store restarted: its mailbox no longer exists
+    get_store(*local_store).unregister_listener(second.fanout.worker_id)
+    with pytest.raises(UnknownListener):
+        get_store(*local_store).poll(second.fanout.worker_id, 0)
+
+    async def scenario():
+        subscription = second.subscribe(1)
+        for _ in range(50):
+            if second.fanout.reconnects:
+                break
+            await asyncio.sleep(0.1)
+        first.publish(1, todo_event("deleted", 1))
+        return await subscription.get(5)
+
+    assert asyncio.run(scenario()) == todo_event("deleted", 1)
+    assert second.fanout.reconnects == 1
+
+def test_shared_fanout_requires_an_authkey(monkeypatch):
+    monkeypatch.setattr("app.shared_store.SHARED_STORE_AUTHKEY", "")
+    with pytest.raises(RuntimeError, match="SHARED_STORE_AUTHKEY"):
+        events.create_fanout("shared")
+
+@pytest.fixture
+def quick_heartbeat(monkeypatch):
+    monkeypatch.setattr("app.routers.todos.EVENT_HEARTBEAT_SECONDS", 0.1)
+
+def test_websocket_closes_after_logout(client, user_headers, quick_heartbeat):
+    token = user_headers["Authorization"].split()[1]
+    with client.websocket_connect(f"/todos/ws?token={token}") as websocket:
+        assert websocket.receive_json() == {"type": "heartbeat"}
+        assert client.post("/auth/logout", headers=user_headers).status_code == 200
+        with pytest.raises(WebSocketDisconnect) as closed:
+            for _ in range(50):
+                assert websocket.receive_json() == {"type": "heartbeat"}
+    assert closed.value.code == 1008
+
+def test_event_stream_closes_after_logout(client, user_headers, quick_heartbeat):
+    logout = threading.Timer(0.3, client.post, args=("/auth/logout",), kwargs={"headers": user_headers})
+    logout.start()
+    try:
+        body = client.get("/todos/stream", headers=user_headers).text
+    finally:
+        logout.join()
+    assert body.endswith('event: close\ndata: {"reason": "Session expired or invalid"}\n\n')
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+from app.fieldsets import parse_fields
+
+def test_fields_keep_the_endpoint_order():
+    allowed = ("id", "title", "completed")
+    assert parse_fields(None, allowed) == allowed
+    assert parse_fields(" ", allowed) == allowed
+    assert parse_fields("completed, id,,id", allowed) == ("id", "completed")
+    with pytest.raises(HTTPException) as raised:
+        parse_fields("id,titel", allowed)
+    assert raised.value.status_code == 400
+    assert "titel" in raised.value.detail
+
+def test_todo_list_returns_only_the_requested_fields(client, user_headers):
+    client.post("/todos/", json={"title": "sparse", "description": "dropped"}, headers=user_headers)
+    rows = client.get("/todos/", params={"fields": "title,id"}, headers=user_headers).json()
+    assert [list(row) for row in rows] == [["id", "title"]]
+    assert rows[0]["title"] == "sparse"
+
+def test_fields_change_the_etag(client, user_headers):
+    client.post("/todos/", json={"title": "sparse"}, headers=user_headers)
+    full = client.get("/todos/", headers=user_headers).headers["ETag"]
+    sparse = client.get("/todos/", params={"fields": "id"}, headers={**user_headers, "If-None-Match": full})
+    assert sparse.status_code == 200
+
+def test_unknown_fields_are_a_400(client, user_headers, admin_headers):
+    assert client.get("/todos/", params={"fields": "id,password"}, headers=user_headers).status_code == 400
+    assert client.get("/admin/todos", params={"fields": "secret"}, headers=admin_headers).status_code == 400
+    assert client.get("/admin/users/detailed", params={"fields": "hashed_password"},
+                      headers=admin_headers).status_code == 400
+
+def test_admin_lists_accept_fields(client, user_headers, admin_headers):
+    client.post("/todos/", json={"title": "sparse"}, headers=user_headers)
+    todos = client.get("/admin/todos", params={"fields": "id,owner_username"}, headers=admin_headers).json()["todos"]
+    assert todos == [{"id": todos[0]["id"], "owner_username": "alice"}]
+    users = client.get("/admin/users/detailed", params={"fields": "username,todo_count"}, headers=admin_headers).json()
+    assert {user["username"]: user["todo_count"] for user in users} == {"alice": 1, "root": 0}
@@ -0,0 +1,55 @@
+import json
+import uuid
+import pytest
+from datetime import datetime, date
+from decimal import Decimal
+from fastapi import Response
+from app import responses
+from app.responses import FastJSONResponse, rows_response
+
+CONTENT = {
+    "when": datetime(2026, 1, 2, 3, 4, 5, 678000),
+    "day": date(2026, 1, 2),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "text": "naïve ✓",
+    "rows": [{"completed": True, "count": 3, "missing": None}]
+}
+EXPECTED = {
+    "when": "2026-01-02T03:04:05.678000",
+    "day": "2026-01-02",
+    "id": "12345678-1234-5678-1234-567812345678",
+    "text": "naïve ✓",
+    "rows": [{"completed": True, "count": 3, "missing": None}]
+}
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        if responses.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(responses, "orjson", None)
+    return request.param
+
+def test_both_encoders_produce_the_same_json(encoder):
+    body = FastJSONResponse(CONTENT).body
+    assert json.loads(body) == EXPECTED
+    assert b'": ' not in body
+
+def test_huge_integers_fall_back_to_the_stdlib(encoder):
+    assert json.loads(FastJSONResponse({"big": 2 ** 70}).body) == {"big": 2 ** 70}
+
+def test_decimals_are_strings_on_the_fallback(monkeypatch):
+    monkeypatch.setattr(responses, "orjson", None)
+    assert json.loads(FastJSONResponse({"amount": Decimal("1.50")}).body) == {"amount": "1.50"}
+
+def test_rows_response_keeps_injected_headers():
+    injected = Response()
+    injected.headers["ETag"] = '"abc"'
+    response = rows_response([{"id": 1}], injected)
+    assert response.headers["ETag"] == '"abc"'
+    assert int(response.headers["content-length"]) == len(response.body)
+
+def test_app_uses_the_fast_encoder():
+    from app.main import app
+    assert app.router.default_response_class is FastJSONResponse
@@ -0,0 +1,34 @@
+from app import models
+
+def _matches_model(rows: list[dict], model) -> bool:
+    """Rows sent without response_model validation look exactly like validated ones"""
+    return all(model.model_validate(row).model_dump(mode="json") == row for row in rows)
+
+def test_todo_list_rows_match_the_schema(client, user_headers):
+    todo_id = client.post("/todos/", json={"title": "typed", "description": "row"}, headers=user_headers).json()["id"]
+    client.put(f"/todos/{todo_id}", json={"completed": True}, headers=user_headers)
+    rows = client.get("/todos/", headers=user_headers).json()
+    assert rows[0]["completed"] is True
+    assert isinstance(rows[0]["id"], int)
+    assert _matches_model(rows, models.TodoOut)
+
+def test_admin_lists_match_the_schema(client, admin_headers, user_headers):
+    client.post("/todos/", json={"title": "typed"}, headers=user_headers)
+    users = client.get("/admin/users", headers=admin_headers).json()
+    assert {user["username"] for user in users} == {"root", "alice"}
+    assert all(isinstance(user["is_admin"], bool) for user in users)
+    assert _matches_model(users, models.UserOut)
+
+    alice = next(user["id"] for user in users if user["username"] == "alice")
+    todos = client.get(f"/admin/users/{alice}/todos", headers=admin_headers).json()
+    assert [todo["title"] for todo in todos] == ["typed"]
+    assert _matches_model(todos, models.TodoOut)
+    assert client.get("/admin/users/999999/todos", headers=admin_headers).status_code == 404
+
+def test_list_headers_survive_the_raw_response(client, user_headers):
+    for title in ("one", "two"):
+        client.post("/todos/", json={"title": title}, headers=user_headers)
+    response = client.get("/todos/", params={"limit": 1}, headers=user_headers)
+    assert response.headers["X-Next-Cursor"]
+    assert response.headers["ETag"]
+    assert int(response.headers["content-length"]) == len(response.content)
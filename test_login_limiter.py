@@ -0,0 +1,79 @@
+import pytest
+from multiprocessing import AuthenticationError
+from sqlalchemy import select, func
+from app import models, rate_limit
+from app.rate_limit import InMemoryLoginLimiter, SharedStoreLoginLimiter, MAX_LOGIN_ATTEMPTS
+from app.shared_store import start_local_store, get_store, require_authkey
+
+@pytest.fixture(scope="module")
+def local_store():
+    manager, address, authkey = start_local_store()
+    yield address, authkey
+    manager.shutdown()
+
+def _fail_logins(client, username: str, times: int):
+    for _ in range(times):
+        response = client.post("/auth/token", data={"username": username, "password": "wrong"})
+        assert response.status_code == 401
+
+def test_window_keeps_only_recent_failures():
+    limiter = InMemoryLoginLimiter(window_seconds=60, max_attempts=3)
+    for now in (0, 10, 20, 30):
+        limiter.record_failure("key", now)
+    assert limiter.recent_failures("key", 30) == [10, 20, 30]
+    assert limiter.recent_failures("key", 75) == [20, 30]
+    limiter.sweep(1000)
+    assert limiter.recent_failures("key", 1000) == []
+
+def test_lockout_after_too_many_failures(client, make_user):
+    make_user("alice")
+    _fail_logins(client, "alice", MAX_LOGIN_ATTEMPTS)
+    response = client.post("/auth/token", data={"username": "alice", "password": "secret123"})
+    assert response.status_code == 429
+    assert "15 minutes" in response.json()["detail"]
+
+def test_failures_are_audited_without_counting_queries(client, db, make_user):
+    make_user("alice")
+    _fail_logins(client, "alice", 2)
+    rate_limit.login_audit.flush()
+    assert db.scalar(select(func.count()).select_from(models.LoginAttempt)
+                     .where(models.LoginAttempt.success == False)) == 2
+
+def test_shared_limiter_is_seen_by_every_worker(local_store):
+    address, authkey = local_store
+    first = SharedStoreLoginLimiter(60, 3, address=address, authkey=authkey)
+    second = SharedStoreLoginLimiter(60, 3, address=address, authkey=authkey)
+    first.record_failure("login:alice:1.2.3.4", 100)
+    second.record_failure("login:alice:1.2.3.4", 110)
+    assert first.recent_failures("login:alice:1.2.3.4", 120) == [100, 110]
+    assert second.recent_failures("login:alice:1.2.3.4", 165) == [110]
+    second.sweep(1000)
+    assert first.recent_failures("login:alice:1.2.3.4", 1000) == []
+
+def test_lockout_through_the_shared_store(client, make_user, local_store, monkeypatch):
+    address, authkey = local_store
+    make_user("bob")
+    monkeypatch.setattr(rate_limit, "login_limiter",
+                        SharedStoreLoginLimiter(60, MAX_LOGIN_ATTEMPTS, address=address, authkey=authkey))
+    _fail_logins(client, "bob", MAX_LOGIN_ATTEMPTS)
+    # A limiter in another worker reads the same windows
+    other_worker = SharedStoreLoginLimiter(60, MAX_LOGIN_ATTEMPTS, address=address, authkey=authkey)
+    monkeypatch.setattr(rate_limit, "login_limiter", other_worker)
+    response = client.post("/auth/token", data={"username": "bob", "password": "secret123"})
+    assert response.status_code == 429
+
+def test_store_proxy_is_cached_per_process(local_store):
+    address, authkey = local_store
+    assert get_store(address, authkey) is get_store(address, authkey)
+
+def test_shared_backend_requires_an_authkey(monkeypatch):
+    monkeypatch.setattr("app.shared_store.SHARED_STORE_AUTHKEY", "")
+    with pytest.raises(RuntimeError, match="SHARED_STORE_AUTHKEY"):
+        require_authkey()
+    with pytest.raises(RuntimeError):
+        rate_limit.create_login_limiter("shared")
+
+def test_wrong_authkey_is_rejected(local_store):
+    address, _ = local_store
+    with pytest.raises(AuthenticationError):
+        get_store(address, b"not-the-key")
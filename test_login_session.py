@@ -0,0 +1,57 @@
+from sqlalchemy import event, select
+from app import models
+from app.database import engine
+from app.passwords import get_context
+from app.rate_limit import SessionManager
+
+def _sessions(db, user_id: int):
+    db.expire_all()
+    return db.scalars(select(models.UserSession).where(models.UserSession.user_id == user_id)).all()
+
+def test_login_rotates_sessions_and_records_the_attempt(db, make_user):
+    user_id = make_user("alice")
+    first = SessionManager.start_login_session(db, user_id, "alice", "1.2.3.4", "pytest")
+    second = SessionManager.start_login_session(db, user_id, "alice", "1.2.3.4", "pytest")
+    active = {session.session_token: session.is_active for session in _sessions(db, user_id)}
+    assert active == {first: False, second: True}
+    attempts = db.scalars(select(models.LoginAttempt).where(models.LoginAttempt.user_id == user_id)).all()
+    assert [attempt.success for attempt in attempts] == [True, True]
+
+def test_login_is_one_transaction(db, make_user):
+    user_id = make_user("alice")
+    statements = []
+    commits = []
+
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    event.listen(engine, "commit", on_commit)
+    try:
+        SessionManager.start_login_session(db, user_id, "alice", "1.2.3.4", "pytest")
+    finally:
+        event.remove(engine, "before_cursor_execute", on_statement)
+        event.remove(engine, "commit", on_commit)
+    # revoke, record, create (a single statement on PostgreSQL), one commit
+    assert len(statements) == 3
+    assert len(commits) == 1
+
+def test_outdated_hash_is_upgraded_with_the_session(client, db, make_user):
+    user_id = make_user("alice")
+    user = db.get(models.User, user_id)
+    user.hashed_password = get_context(4).hash("secret123")
+    db.commit()
+    from app.passwords import hasher
+    previous_rounds = hasher.rounds
+    hasher.rounds = 5
+    try:
+        response = client.post("/auth/token", data={"username": "alice", "password": "secret123"})
+    finally:
+        hasher.rounds = previous_rounds
+    assert response.status_code == 200
+    db.expire_all()
+    assert "$05$" in db.get(models.User, user_id).hashed_password
+    assert len([session for session in _sessions(db, user_id) if session.is_active]) == 1
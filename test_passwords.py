@@ -0,0 +1,60 @@
+import threading
+import pytest
+from fastapi import HTTPException
+from app.passwords import PasswordHasher, get_context, MIN_BCRYPT_ROUNDS, MAX_BCRYPT_ROUNDS
+
+def test_hash_and_verify_inline():
+    hasher = PasswordHasher(workers=0, max_pending=2)
+    hasher.rounds = 4
+    hashed = hasher.hash("correct horse")
+    assert hasher.verify("correct horse", hashed) == (True, None)
+    assert hasher.verify("wrong", hashed)[0] is False
+
+def test_outdated_cost_is_rehashed_on_verify():
+    hasher = PasswordHasher(workers=0, max_pending=2)
+    hasher.rounds = 5
+    old_hash = get_context(4).hash("correct horse")
+    verified, new_hash = hasher.verify("correct horse", old_hash)
+    assert verified and new_hash
+    assert "$05$" in new_hash
+    assert hasher.stats()["rehashed"] == 1
+
+def test_busy_hasher_answers_503_instead_of_queueing(monkeypatch):
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash(password, rounds):
+        started.set()
+        release.wait(5)
+        return "hashed"
+
+    monkeypatch.setattr("app.passwords._hash_password", slow_hash)
+    worker = threading.Thread(target=hasher.hash, args=("first",))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(HTTPException) as raised:
+            hasher.hash("second")
+        assert raised.value.status_code == 503
+        assert raised.value.headers["Retry-After"] == "1"
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        release.set()
+        worker.join()
+    assert hasher.hash("third") == "hashed"
+
+def test_calibration_stays_within_bounds():
+    hasher = PasswordHasher(workers=0, target_ms=1)
+    assert hasher.calibrate() == MIN_BCRYPT_ROUNDS
+    hasher = PasswordHasher(workers=0, target_ms=10 ** 9)
+    assert hasher.calibrate() == MAX_BCRYPT_ROUNDS
+
+def test_process_pool_round_trip():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    hasher.rounds = 4
+    try:
+        hashed = hasher.hash("pooled")
+        assert hasher.verify("pooled", hashed) == (True, None)
+    finally:
+        hasher.shutdown()
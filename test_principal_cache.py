@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app import crud, models
+from app.database import SessionLocal
+from app.principal_cache import PrincipalCache, CachedUser, CachedSession, principal_cache
+
+def _principal(user_id: int = 1, session_id: int = 1):
+    user = CachedUser(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                      is_active=True, is_admin=False, created_at=None)
+    session = CachedSession(id=session_id, user_id=user_id, expires_at=datetime.utcnow() + timedelta(minutes=15))
+    return user, session
+
+def test_cache_hit_and_miss():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    assert cache.get("token") is None
+    cache.put("token", *_principal())
+    user, session = cache.get("token")
+    assert user.id == 1 and session.id == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    now = [1000.0]
+    monkeypatch.setattr("app.principal_cache.time.monotonic", lambda: now[0])
+    cache.put("token", *_principal())
+    now[0] += 31
+    assert cache.get("token") is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=2)
+    cache.put("a", *_principal(1, 1))
+    cache.put("b", *_principal(2, 2))
+    cache.get("a")
+    cache.put("c", *_principal(3, 3))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate_user_drops_all_their_sessions():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    cache.put("a", *_principal(1, 1))
+    cache.put("b", *_principal(1, 2))
+    cache.put("c", *_principal(2, 3))
+    cache.invalidate_user(1)
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c") is not None
+
+def test_repeat_requests_are_served_from_the_cache(client, user_headers):
+    assert client.get("/auth/me", headers=user_headers).status_code == 200
+    hits = principal_cache.stats()["hits"]
+    response = client.get("/auth/me", headers=user_headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == "alice"
+    assert principal_cache.stats()["hits"] == hits + 1
+
+def test_logout_takes_effect_immediately(client, user_headers):
+    assert client.get("/auth/me", headers=user_headers).status_code == 200
+    assert client.post("/auth/logout", headers=user_headers).status_code == 200
+    assert client.get("/auth/me", headers=user_headers).status_code == 401
+
+def test_deactivated_user_is_locked_out_immediately(client, make_user, login, admin_headers):
+    user_id = make_user("bob")
+    headers = login("bob")
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert client.post(f"/admin/users/{user_id}/deactivate", headers=admin_headers).status_code == 200
+    assert client.get("/auth/me", headers=headers).status_code in (401, 403)
+
+def test_principal_read_before_an_invalidation_is_not_cached():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    generation = cache.generation()
+    # The user is deactivated while their principal is being read
+    cache.invalidate_user(1)
+    cache.put("a", *_principal(1, 1), generation)
+    cache.put("b", *_principal(2, 2), generation)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    cache.put("a", *_principal(1, 1), cache.generation())
+    assert cache.get("a") is not None
+
+def test_deactivation_during_a_cache_miss_is_not_cached_over(client, make_user, login, monkeypatch):
+    user_id = make_user("bob")
+    headers = login("bob")
+    principal_cache.clear()
+    read_user = crud.get_user_by_username
+
+    def deactivated_right_after_the_read(session, username):
+        user = read_user(session, username)
+        # Another request deactivates bob after this one loaded him
+        other = SessionLocal()
+        try:
+            other.execute(update(models.User).where(models.User.id == user_id).values(is_active=False))
+            other.commit()
+        finally:
+            other.close()
+        principal_cache.invalidate_user(user_id)
+        return user
+
+    monkeypatch.setattr(crud, "get_user_by_username", deactivated_right_after_the_read)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    monkeypatch.setattr(crud, "get_user_by_username", read_user)
+    assert client.get("/auth/me", headers=headers).status_code == 403
@@ -0,0 +1,52 @@
+import pytest
+from app import middleware
+from app.middleware import TokenBucketLimiter
+
+@pytest.fixture
+def strict_limits(monkeypatch):
+    """Turn the middleware on with a two-request budget for /auth/me"""
+    monkeypatch.setattr(middleware, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(middleware, "request_limiter", TokenBucketLimiter())
+    monkeypatch.setattr(middleware, "RATE_LIMIT_BUDGETS", [("GET", "/auth/me", 2, 0.5)])
+
+def test_bucket_refills_over_time():
+    limiter = TokenBucketLimiter()
+    assert limiter.take("key", 2, 1.0, now=0) == (True, 1.0)
+    assert limiter.take("key", 2, 1.0, now=0) == (True, 0.0)
+    assert limiter.take("key", 2, 1.0, now=0.5) == (False, 0.5)
+    assert limiter.take("key", 2, 1.0, now=1.0)[0] is True
+    # Never refills beyond capacity
+    assert limiter.take("key", 2, 1.0, now=100) == (True, 1.0)
+
+def test_least_recently_used_bucket_is_evicted():
+    limiter = TokenBucketLimiter(max_buckets=2)
+    for key in ("a", "b", "c"):
+        limiter.take(key, 1, 0.0, now=0)
+    # "a" was evicted, so it starts again with a full bucket
+    assert limiter.take("a", 1, 0.0, now=0)[0] is True
+    assert limiter.take("c", 1, 0.0, now=0)[0] is False
+
+def test_requests_beyond_the_budget_get_429(client, user_headers, strict_limits):
+    first = client.get("/auth/me", headers=user_headers)
+    assert first.status_code == 200
+    assert first.headers["X-RateLimit-Limit"] == "2"
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    assert client.get("/auth/me", headers=user_headers).status_code == 200
+    limited = client.get("/auth/me", headers=user_headers)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+def test_budgets_are_per_user(client, make_user, login, strict_limits):
+    make_user("alice")
+    make_user("bob")
+    alice, bob = login("alice"), login("bob")
+    for _ in range(2):
+        client.get("/auth/me", headers=alice)
+    assert client.get("/auth/me", headers=alice).status_code == 429
+    assert client.get("/auth/me", headers=bob).status_code == 200
+
+def test_health_is_exempt(client, strict_limits, monkeypatch):
+    monkeypatch.setattr(middleware, "RATE_LIMIT_BUDGETS", [])
+    monkeypatch.setattr(middleware, "DEFAULT_BUDGET", ("*", "", 1, 0.0))
+    for _ in range(3):
+        assert client.get("/health").status_code == 200
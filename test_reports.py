@@ -0,0 +1,138 @@
+import csv
+import io
+import os
+import json
+import time
+import threading
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app import models, reports
+from app.reports import ReportRunner, purge_reports, report_path, require_reports_dir
+from app.routers import admin as admin_router
+
+@pytest.fixture
+def runner(monkeypatch):
+    """A small runner behind the admin routes, writing two rows per chunk"""
+    monkeypatch.setattr(reports, "REPORT_CHUNK_PAUSE_SECONDS", 0)
+    runner = ReportRunner(workers=1, max_pending=1, chunk_rows=2)
+    monkeypatch.setattr(admin_router, "report_runner", runner)
+    yield runner
+    runner.shutdown()
+
+def _wait(client, headers, job_id: str, until=("done", "failed")) -> dict:
+    for _ in range(200):
+        job = client.get(f"/admin/reports/{job_id}", headers=headers).json()
+        if job["status"] in until:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"report {job_id} is still {job['status']}")
+
+def test_report_lifecycle(client, admin_headers, user_headers, runner):
+    ids = [client.post("/todos/", json={"title": f"todo {i}"}, headers=user_headers).json()["id"] for i in range(5)]
+    created = client.post("/admin/reports", json={"kind": "todos", "format": "csv"}, headers=admin_headers)
+    assert created.status_code == 202
+    assert created.json()["rows_total"] == 5
+    assert created.json()["download_url"] is None
+
+    job = _wait(client, admin_headers, created.json()["id"])
+    assert (job["status"], job["rows_written"], job["progress"]) == ("done", 5, 100.0)
+    download = client.get(job["download_url"], headers=admin_headers)
+    rows = list(csv.DictReader(io.StringIO(download.text)))
+    assert [int(row["id"]) for row in rows] == ids
+    assert rows[0]["owner_username"] == "alice"
+    assert runner.stats()["completed"] == 1
+
+def test_user_report_in_ndjson(client, admin_headers, user_headers, runner):
+    created = client.post("/admin/reports", json={"kind": "users_detailed", "format": "ndjson"}, headers=admin_headers)
+    job = _wait(client, admin_headers, created.json()["id"])
+    lines = [json.loads(line) for line in client.get(job["download_url"], headers=admin_headers).text.splitlines()]
+    assert sorted(line["username"] for line in lines) == ["alice", "root"]
+
+def test_full_runner_answers_503(client, admin_headers, runner, monkeypatch):
+    release = threading.Event()
+
+    def blocked_pages(chunk_rows):
+        release.wait(5)
+        yield []
+
+    monkeypatch.setitem(reports.REPORT_PAGES, "todos", blocked_pages)
+    first = client.post("/admin/reports", json={"kind": "todos", "format": "csv"}, headers=admin_headers)
+    try:
+        second = client.post("/admin/reports", json={"kind": "todos", "format": "csv"}, headers=admin_headers)
+        assert second.status_code == 503
+        assert second.headers["Retry-After"] == "30"
+        assert runner.stats()["rejected"] == 1
+        assert client.get(f"/admin/reports/{first.json()['id']}/download", headers=admin_headers).status_code == 409
+    finally:
+        release.set()
+    _wait(client, admin_headers, first.json()["id"])
+
+def test_failed_report_leaves_no_file(client, db, admin_headers, runner, monkeypatch):
+    def broken_pages(chunk_rows):
+        yield []
+        raise ValueError("database went away")
+
+    monkeypatch.setitem(reports.REPORT_PAGES, "todos", broken_pages)
+    created = client.post("/admin/reports", json={"kind": "todos", "format": "csv"}, headers=admin_headers)
+    job = _wait(client, admin_headers, created.json()["id"])
+    assert (job["status"], job["error"]) == ("failed", "database went away")
+    assert runner.stats()["failed"] == 1
+    stored = db.get(models.ReportJob, job["id"])
+    assert not os.path.exists(report_path(stored) + ".part")
+    assert not os.path.exists(report_path(stored))
+
+def test_report_outlives_its_admin_until_purged(client, db, make_user, login, admin_headers, runner):
+    make_user("other", admin=True)
+    created = client.post("/admin/reports", json={"kind": "todos", "format": "ndjson"}, headers=login("other"))
+    job_id = _wait(client, admin_headers, created.json()["id"])["id"]
+    other = db.scalar(select(models.User.id).where(models.User.username == "other"))
+    assert client.delete(f"/admin/users/{other}", headers=admin_headers).status_code == 200
+
+    db.expire_all()
+    job = db.get(models.ReportJob, job_id)
+    path = report_path(job)
+    assert job.requested_by is None
+    assert os.path.exists(path)
+    assert purge_reports(db, datetime.utcnow() + timedelta(minutes=1)) == 1
+    assert not os.path.exists(path)
+    assert client.get(f"/admin/reports/{job_id}", headers=admin_headers).status_code == 404
+
+def test_stale_jobs_are_failed(client, db, admin_headers, runner):
+    job = models.ReportJob(id="stale", kind="todos", format="csv", status="running", rows_written=0,
+                           created_at=datetime.utcnow(), updated_at=datetime.utcnow() - timedelta(hours=1))
+    db.add(job)
+    db.commit()
+    reported = client.get("/admin/reports/stale", headers=admin_headers).json()
+    assert (reported["status"], reported["error"]) == ("failed", "Report worker stopped")
+
+def test_downloading_a_stale_job_is_a_409(client, db, admin_headers, runner):
+    job = models.ReportJob(id="stale", kind="todos", format="csv", status="running", rows_written=0,
+                           created_at=datetime.utcnow(), updated_at=datetime.utcnow() - timedelta(hours=1))
+    db.add(job)
+    db.commit()
+    response = client.get("/admin/reports/stale/download", headers=admin_headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Report is failed"
+
+def test_counters_are_not_lost_between_threads():
+    runner = ReportRunner(workers=1)
+
+    def count():
+        for _ in range(1000):
+            runner._count("completed")
+
+    threads = [threading.Thread(target=count) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert runner.stats()["completed"] == 8000
+
+def test_reports_dir_is_required_with_several_workers(monkeypatch):
+    assert require_reports_dir("/srv/reports") == "/srv/reports"
+    assert require_reports_dir("")
+    monkeypatch.setattr(reports, "EVENTS_FANOUT_BACKEND", "shared")
+    assert require_reports_dir("/srv/reports") == "/srv/reports"
+    with pytest.raises(RuntimeError, match="REPORTS_DIR"):
+        require_reports_dir("")
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, select
+from app import models, rollups
+
+def _today(client, headers, metric: str) -> int:
+    response = client.get("/admin/analytics/timeseries", params={"metric": metric, "bucket": "hour"}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["points"][-1]["value"]
+
+def _total(db) -> int:
+    db.expire_all()
+    return db.scalar(select(func.sum(models.ActivityRollup.value))) or 0
+
+def test_buckets_cover_partial_ranges():
+    start = datetime(2026, 1, 1, 10, 30, tzinfo=timezone.utc)
+    assert rollups.bucket_range(start, start + timedelta(hours=1), "hour") == (rollups.epoch_hour(start),
+                                                                              rollups.epoch_hour(start) + 2)
+    first, last = rollups.bucket_range(start, start + timedelta(hours=1), "day")
+    assert last - first == 1
+    assert rollups.hour_start(rollups.epoch_hour(start)) == start.replace(minute=0)
+
+def test_writes_count_in_the_current_hour(client, make_user, login, admin_headers):
+    make_user("alice")
+    alice = login("alice")
+    ids = [client.post("/todos/", json={"title": f"todo {i}"}, headers=alice).json()["id"] for i in range(3)]
+    client.put(f"/todos/{ids[0]}", json={"completed": True}, headers=alice)
+    client.patch(f"/todos/{ids[1]}/toggle", headers=alice)
+    client.patch(f"/todos/{ids[1]}/toggle", headers=alice)  # un-completing is not a completion
+    client.post("/todos/batch", json={"operations": [{"op": "create", "title": "batched", "completed": True}]},
+                headers=alice)
+    assert _today(client, admin_headers, "todos_created") == 4
+    assert _today(client, admin_headers, "todos_completed") == 3
+    assert _today(client, admin_headers, "signups") == 2
+
+def test_history_survives_deleting_the_user(client, make_user, login, admin_headers):
+    user_id = make_user("alice")
+    client.post("/todos/", json={"title": "short lived"}, headers=login("alice"))
+    client.delete(f"/admin/users/{user_id}", headers=admin_headers)
+    assert _today(client, admin_headers, "todos_created") == 1
+    assert _today(client, admin_headers, "signups") == 2
+
+def test_backfill_never_replaces_live_counts(client, db, make_user, login, admin_headers):
+    alice = make_user("alice")
+    client.post("/todos/", json={"title": "deleted later"}, headers=login("alice"))
+    client.delete(f"/admin/users/{alice}", headers=admin_headers)
+    live = _total(db)
+    # The live hour knows about the deleted user and todo; the tables no longer do
+    assert rollups.backfill(db, datetime.utcnow() - timedelta(days=2), datetime.utcnow() + timedelta(hours=2)) == 0
+    assert _total(db) == live
+
+def test_backfill_fills_the_hours_before_the_first_rollup(db, make_user):
+    make_user("alice")
+    make_user("bob")
+    # As if both signed up yesterday, before there were rollups
+    yesterday = (datetime.utcnow() - timedelta(days=1)).replace(microsecond=0)
+    db.execute(models.User.__table__.update().values(created_at=yesterday))
+    db.execute(delete(models.ActivityRollup))
+    db.commit()
+    # The hour in progress is left to the write paths
+    assert rollups.backfill(db, datetime.utcnow()) == 0
+    assert rollups.backfill(db, yesterday - timedelta(hours=1)) == 2  # one row per user shard
+    assert _total(db) == 2
+    assert rollups.backfill(db, yesterday - timedelta(hours=1)) == 0
+    assert _total(db) == 2
+
+def test_range_limits(client, admin_headers):
+    params = {"metric": "signups", "bucket": "hour", "from": "2020-01-01T00:00:00", "to": "2026-01-01T00:00:00"}
+    assert client.get("/admin/analytics/timeseries", params=params, headers=admin_headers).status_code == 400
+    params.update({"from": "2026-01-02T00:00:00"})
+    assert client.get("/admin/analytics/timeseries", params=params, headers=admin_headers).status_code == 400
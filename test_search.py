@@ -0,0 +1,49 @@
+from app.search import search_terms, SEARCH_MAX_TERMS
+
+def _create(client, headers, title, description=""):
+    return client.post("/todos/", json={"title": title, "description": description}, headers=headers).json()["id"]
+
+def _search(client, headers, q, **params):
+    response = client.get("/todos/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+def test_words_match_as_prefixes_and_titles_rank_first(client, user_headers):
+    in_description = _create(client, user_headers, "weekly chores", "buy groceries")
+    in_title = _create(client, user_headers, "groceries run")
+    _create(client, user_headers, "unrelated")
+    assert [todo["id"] for todo in _search(client, user_headers, "grocer")] == [in_title, in_description]
+    assert [todo["id"] for todo in _search(client, user_headers, "groc RUN")] == [in_title]
+
+def test_results_are_typed_like_the_todo_list(client, user_headers):
+    todo_id = _create(client, user_headers, "typed result")
+    client.put(f"/todos/{todo_id}", json={"completed": True}, headers=user_headers)
+    [todo] = _search(client, user_headers, "typed")
+    assert todo["completed"] is True
+    assert todo == client.get(f"/todos/{todo_id}", headers=user_headers).json()
+
+def test_only_the_owners_todos_are_found(client, make_user, login, user_headers):
+    make_user("bob")
+    _create(client, login("bob"), "secret plans")
+    assert _search(client, user_headers, "secret") == []
+
+def test_index_follows_updates_and_deletes(client, user_headers):
+    todo_id = _create(client, user_headers, "old wording")
+    client.put(f"/todos/{todo_id}", json={"title": "new wording"}, headers=user_headers)
+    assert _search(client, user_headers, "old") == []
+    assert len(_search(client, user_headers, "new")) == 1
+    client.post("/todos/batch", json={"operations": [{"op": "delete", "id": todo_id}]}, headers=user_headers)
+    assert _search(client, user_headers, "wording") == []
+
+def test_query_syntax_is_not_interpreted(client, user_headers):
+    _create(client, user_headers, "quoted words")
+    assert len(_search(client, user_headers, '"quoted* words:')) == 1
+    # OR and the column filter are plain words here, which no todo contains
+    assert _search(client, user_headers, '"quoted" OR owner:*') == []
+    assert _search(client, user_headers, "!!!") == []
+    assert len(search_terms(" ".join(f"w{i}" for i in range(20)))) == SEARCH_MAX_TERMS
+
+def test_limit_applies(client, user_headers):
+    for i in range(3):
+        _create(client, user_headers, f"repeated {i}")
+    assert len(_search(client, user_headers, "repeated", limit=2)) == 2
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app import models
+from app.rate_limit import activity_buffer
+from app.session_activity import SessionActivityBuffer
+
+def _active_session(db, user_id: int) -> models.UserSession:
+    return db.scalars(select(models.UserSession).where(models.UserSession.user_id == user_id,
+                                                        models.UserSession.is_active == True)).one()
+
+def test_requests_are_buffered_until_flush(client, db, make_user, login):
+    user_id = make_user("alice")
+    headers = login("alice")
+    stored = _active_session(db, user_id).expires_at
+    for _ in range(5):
+        assert client.get("/auth/me", headers=headers).status_code == 200
+    assert activity_buffer.stats()["pending"] == 1
+    db.expire_all()
+    assert _active_session(db, user_id).expires_at == stored
+
+    activity_buffer.flush()
+    db.expire_all()
+    session = _active_session(db, user_id)
+    assert session.expires_at > stored
+    assert activity_buffer.stats()["pending"] == 0
+
+def test_latest_activity_per_session_wins():
+    buffer = SessionActivityBuffer(timeout_minutes=15)
+    later = datetime(2026, 1, 1, 12, 0)
+    buffer.record(7, later)
+    buffer.record(7, later - timedelta(minutes=5))
+    stored = datetime(2026, 1, 1, 11, 0)
+    assert buffer.effective_expires_at(7, stored) == later + timedelta(minutes=15)
+    assert buffer.effective_expires_at(8, stored) == stored
+
+def test_full_buffer_flushes_early(monkeypatch):
+    buffer = SessionActivityBuffer(timeout_minutes=15, max_pending=3)
+    flushed = []
+    monkeypatch.setattr(buffer, "_flush", lambda: flushed.append(buffer.stats()["pending"]))
+    for session_id in range(3):
+        buffer.record(session_id)
+    assert flushed == [3]
+    assert buffer.forced_flushes == 1
+
+def test_flush_never_shortens_a_session(db, make_user, login):
+    user_id = make_user("alice")
+    login("alice")
+    session = _active_session(db, user_id)
+    stored = session.expires_at
+    activity_buffer.record(session.id, datetime.utcnow() - timedelta(hours=1))
+    activity_buffer.flush()
+    db.expire_all()
+    assert _active_session(db, user_id).expires_at == stored
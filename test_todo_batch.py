@@ -0,0 +1,70 @@
+from sqlalchemy import event
+from app.database import engine
+
+def _batch(client, headers, *operations):
+    response = client.post("/todos/batch", json={"operations": list(operations)}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["results"]
+
+def _todos(client, headers) -> dict[int, dict]:
+    return {todo["id"]: todo for todo in client.get("/todos/", headers=headers).json()}
+
+def test_batch_creates_updates_toggles_and_deletes(client, user_headers):
+    created = _batch(client, user_headers,
+                     {"op": "create", "title": "first"},
+                     {"op": "create", "title": "second", "completed": True},
+                     {"op": "create", "title": "third"})
+    assert [result["status"] for result in created] == [200, 200, 200]
+    first, second, third = (result["id"] for result in created)
+
+    results = _batch(client, user_headers,
+                     {"op": "update", "id": first, "title": "renamed", "description": "new"},
+                     {"op": "toggle", "id": second},
+                     {"op": "delete", "id": third})
+    assert [result["status"] for result in results] == [200, 200, 200]
+    todos = _todos(client, user_headers)
+    assert set(todos) == {first, second}
+    assert (todos[first]["title"], todos[first]["description"]) == ("renamed", "new")
+    assert todos[second]["completed"] is False
+
+def test_operations_on_one_todo_fold_in_order(client, user_headers):
+    todo_id = _batch(client, user_headers, {"op": "create", "title": "folded"})[0]["id"]
+    _batch(client, user_headers,
+           {"op": "toggle", "id": todo_id},
+           {"op": "update", "id": todo_id, "completed": False, "title": "changed"},
+           {"op": "toggle", "id": todo_id})
+    todo = _todos(client, user_headers)[todo_id]
+    assert (todo["title"], todo["completed"]) == ("changed", True)
+
+def test_failures_are_reported_per_item(client, make_user, login, user_headers):
+    make_user("bob")
+    foreign = client.post("/todos/", json={"title": "bob's"}, headers=login("bob")).json()["id"]
+    mine = _batch(client, user_headers, {"op": "create", "title": "mine"})[0]["id"]
+    results = _batch(client, user_headers,
+                     {"op": "create"},
+                     {"op": "toggle"},
+                     {"op": "delete", "id": foreign},
+                     {"op": "delete", "id": mine},
+                     {"op": "toggle", "id": mine},
+                     {"op": "update", "id": 999999, "title": "missing"})
+    assert [result["status"] for result in results] == [422, 422, 404, 200, 404, 404]
+    assert _todos(client, user_headers) == {}
+    assert foreign in _todos(client, login("bob"))
+
+def test_updates_sharing_columns_are_one_statement(client, user_headers):
+    ids = [result["id"] for result in _batch(client, user_headers,
+                                              *({"op": "create", "title": f"todo {i}"} for i in range(5)))]
+    statements = []
+
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE todos"):
+            statements.append(executemany)
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    try:
+        _batch(client, user_headers, *({"op": "update", "id": todo_id, "title": f"renamed {todo_id}"} for todo_id in ids))
+    finally:
+        event.remove(engine, "before_cursor_execute", on_statement)
+    assert statements == [True]
+    todos = _todos(client, user_headers)
+    assert all(todos[todo_id]["title"] == f"renamed {todo_id}" for todo_id in ids)
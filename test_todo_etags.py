@@ -0,0 +1,56 @@
+from app.todo_versions import TodoVersionCache, todo_versions
+
+def _get(client, headers, url, etag=None):
+    if etag:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get(url, headers=headers)
+
+def test_unchanged_list_is_a_304(client, user_headers):
+    client.post("/todos/", json={"title": "cached"}, headers=user_headers)
+    first = _get(client, user_headers, "/todos/")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    second = _get(client, user_headers, "/todos/", etag)
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert second.content == b""
+    # Weak validators and lists of candidates match too
+    assert _get(client, user_headers, "/todos/", f'"other", W/{etag}').status_code == 304
+
+def test_every_write_changes_the_etag(client, user_headers):
+    todo_id = client.post("/todos/", json={"title": "versioned"}, headers=user_headers).json()["id"]
+    etags = [_get(client, user_headers, "/todos/").headers["ETag"]]
+    for write in (lambda: client.put(f"/todos/{todo_id}", json={"completed": True}, headers=user_headers),
+                  lambda: client.post("/todos/batch", json={"operations": [{"op": "toggle", "id": todo_id}]},
+                                      headers=user_headers),
+                  lambda: client.delete(f"/todos/{todo_id}", headers=user_headers)):
+        assert write().status_code == 200
+        response = _get(client, user_headers, "/todos/", etags[-1])
+        assert response.status_code == 200
+        etags.append(response.headers["ETag"])
+    assert len(set(etags)) == len(etags)
+
+def test_etag_depends_on_the_query_and_the_user(client, make_user, login, user_headers):
+    make_user("bob")
+    everything = _get(client, user_headers, "/todos/").headers["ETag"]
+    assert _get(client, user_headers, "/todos/?completed=true", everything).status_code == 200
+    assert _get(client, login("bob"), "/todos/", everything).status_code == 200
+
+def test_single_todo_reads_are_conditional(client, user_headers):
+    todo_id = client.post("/todos/", json={"title": "single"}, headers=user_headers).json()["id"]
+    etag = _get(client, user_headers, f"/todos/{todo_id}").headers["ETag"]
+    assert _get(client, user_headers, f"/todos/{todo_id}", etag).status_code == 304
+
+def test_cache_never_moves_backwards(db, make_user):
+    user_id = make_user("alice")
+    cache = TodoVersionCache(ttl_seconds=60)
+    cache.record(user_id, 5)
+    cache.record(user_id, 3)
+    assert cache.get(db, user_id) == 5
+    assert cache.stats()["hits"] == 1
+
+def test_versions_are_cached_after_a_write(client, user_headers):
+    client.post("/todos/", json={"title": "hit"}, headers=user_headers)
+    hits = todo_versions.stats()["hits"]
+    _get(client, user_headers, "/todos/")
+    assert todo_versions.stats()["hits"] == hits + 1
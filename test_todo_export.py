@@ -0,0 +1,42 @@
+import csv
+import io
+import json
+from app.export import encode_csv, iter_export, todo_export_query, TODO_EXPORT_COLUMNS
+
+def _create(client, headers, *titles) -> list[int]:
+    return [client.post("/todos/", json={"title": title}, headers=headers).json()["id"] for title in titles]
+
+def test_ndjson_export_streams_every_todo_in_order(client, user_headers):
+    ids = _create(client, user_headers, "one", "two", "three")
+    response = client.get("/todos/export", headers=user_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="todos.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert set(rows[0]) == set(TODO_EXPORT_COLUMNS)
+
+def test_csv_export_has_a_header_and_filters(client, user_headers):
+    done, _ = _create(client, user_headers, "done", "open")
+    client.put(f"/todos/{done}", json={"completed": True}, headers=user_headers)
+    response = client.get("/todos/export", params={"format": "csv", "completed": "true"}, headers=user_headers)
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["id"], row["title"]) for row in rows] == [(str(done), "done")]
+
+def test_csv_cells_are_never_formulas():
+    encoded = encode_csv([(1, "=HYPERLINK(\"http://evil\")", "+1", "-2", "@SUM(A1)", "\tpadded", "plain", 3)])
+    row = next(csv.reader(io.StringIO(encoded)))
+    assert row == ["1", "'=HYPERLINK(\"http://evil\")", "'+1", "'-2", "'@SUM(A1)", "'\tpadded", "plain", "3"]
+
+def test_export_reads_in_batches(client, user_headers):
+    _create(client, user_headers, "aaa", "bbb", "ccc")
+    user_id = client.get("/auth/me", headers=user_headers).json()["id"]
+    chunks = list(iter_export(todo_export_query(user_id), TODO_EXPORT_COLUMNS, "ndjson", batch_rows=2))
+    assert [chunk.count("\n") for chunk in chunks] == [2, 1]
+
+def test_admin_export_includes_owners(client, admin_headers, user_headers):
+    _create(client, user_headers, "owned")
+    response = client.get("/admin/todos/export", headers=admin_headers)
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["title"], row["owner_username"]) for row in rows] == [("owned", "alice")]
+    assert client.get("/admin/todos/export", headers=user_headers).status_code == 403
@@ -0,0 +1,57 @@
+import json
+from app.database import SessionLocal
+from app.todo_import import iter_import, iter_text_lines
+
+def _import(client, headers, body: str, fmt: str = "ndjson"):
+    response = client.post("/todos/import", params={"format": fmt}, content=body.encode(), headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+def _titles(client, headers) -> list[str]:
+    return sorted(todo["title"] for todo in client.get("/todos/", headers=headers).json())
+
+def test_ndjson_import_reports_rejected_rows(client, user_headers):
+    body = "\n".join([
+        json.dumps({"title": "first", "completed": True}),
+        "{not json",
+        json.dumps({"title": "no"}),
+        "",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"title": "second", "description": "kept"})
+    ])
+    summary = _import(client, user_headers, body)
+    assert (summary["rows"], summary["imported"], summary["failed"], summary["error"]) == (5, 2, 3, None)
+    assert [error["row"] for error in summary["errors"]] == [2, 3, 4]
+    assert summary["errors"][1]["errors"][0]["field"] == "title"
+    assert _titles(client, user_headers) == ["first", "second"]
+
+def test_csv_import(client, user_headers):
+    summary = _import(client, user_headers, "﻿title,description,completed\r\nfrom csv,,true\r\nother,text,\r\n", "csv")
+    assert (summary["imported"], summary["failed"]) == (2, 0)
+    todos = {todo["title"]: todo for todo in client.get("/todos/", headers=user_headers).json()}
+    assert todos["from csv"]["completed"] is True
+    assert (todos["other"]["description"], todos["other"]["completed"]) == ("text", False)
+
+def test_csv_without_a_title_column_is_rejected(client, user_headers):
+    summary = _import(client, user_headers, "name\nsomething\n", "csv")
+    assert summary["imported"] == 0
+    assert "title column" in summary["error"]
+
+def test_rows_before_a_fatal_error_stay_imported(client, user_headers):
+    user_id = client.get("/auth/me", headers=user_headers).json()["id"]
+    # The upload arrives in pieces; the second one is not UTF-8
+    lines = iter_text_lines([json.dumps({"title": "valid row"}).encode() + b"\n", b"\xff\xfe\n"])
+    summary = list(iter_import(SessionLocal, user_id, lines, "ndjson"))[-1]
+    assert summary["imported"] == 1
+    assert "UTF-8" in summary["error"]
+    assert _titles(client, user_headers) == ["valid row"]
+
+def test_import_commits_in_chunks(client, user_headers):
+    user_id = client.get("/auth/me", headers=user_headers).json()["id"]
+    lines = iter_text_lines([json.dumps({"title": f"todo {i}"}).encode() + b"\n" for i in range(5)])
+    records = list(iter_import(SessionLocal, user_id, lines, "ndjson", chunk_rows=2))
+    assert [record["chunk"] for record in records if record["type"] == "progress"] == [2, 2, 1]
+    assert records[-1] == {"type": "summary", "error": None, "rows": 5, "imported": 5, "failed": 0}
+
+def test_lines_split_across_chunks_are_joined():
+    assert list(iter_text_lines([b"ab", b"c\nd", "é\n".encode()[:1], "é\n".encode()[1:]])) == ["abc\n", "dé\n"]
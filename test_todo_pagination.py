@@ -0,0 +1,47 @@
+import pytest
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+def _create(client, headers, count: int) -> list[int]:
+    return [client.post("/todos/", json={"title": f"todo {i}"}, headers=headers).json()["id"] for i in range(count)]
+
+def _pages(client, headers, **params) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/todos/", params=query, headers=headers)
+        assert response.status_code == 200
+        pages.append([todo["id"] for todo in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_pages_cover_every_todo_once(client, user_headers):
+    ids = _create(client, user_headers, 7)
+    pages = _pages(client, user_headers, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    # Todos created in the same second are ordered by id
+    assert sum(pages, []) == sorted(ids, reverse=True)
+    assert sum(_pages(client, user_headers, limit=3, sort="created_at"), []) == sorted(ids)
+
+def test_filters_apply_across_pages(client, user_headers):
+    ids = _create(client, user_headers, 6)
+    for todo_id in ids[::2]:
+        client.put(f"/todos/{todo_id}", json={"completed": True}, headers=user_headers)
+    pages = _pages(client, user_headers, limit=2, completed=True)
+    assert sorted(sum(pages, [])) == sorted(ids[::2])
+
+def test_list_without_a_limit_gets_the_default_page(client, user_headers):
+    ids = _create(client, user_headers, DEFAULT_PAGE_SIZE + 1)
+    response = client.get("/todos/", headers=user_headers)
+    assert len(response.json()) == DEFAULT_PAGE_SIZE
+    rest = client.get("/todos/", params={"cursor": response.headers["X-Next-Cursor"]}, headers=user_headers)
+    assert [todo["id"] for todo in rest.json()] == [min(ids)]
+    assert "X-Next-Cursor" not in rest.headers
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd"])
+def test_malformed_cursor_is_a_400(client, user_headers, cursor):
+    assert client.get("/todos/", params={"cursor": cursor}, headers=user_headers).status_code == 400
+
+def test_limit_is_bounded(client, user_headers):
+    assert client.get("/todos/", params={"limit": 0}, headers=user_headers).status_code == 422
+    assert client.get("/todos/", params={"limit": MAX_PAGE_SIZE + 1}, headers=user_headers).status_code == 422
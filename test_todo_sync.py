@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from unittest import mock
+from app import crud
+from app.todo_versions import encode_sync_cursor, TOMBSTONE_RETENTION_DAYS
+
+def _sync(client, headers, since=None):
+    response = client.get("/todos/changes", params={"since": since} if since else {}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+def test_first_sync_is_a_full_snapshot(client, user_headers):
+    for title in ("one", "two"):
+        client.post("/todos/", json={"title": title}, headers=user_headers)
+    snapshot = _sync(client, user_headers)
+    assert snapshot["reset"] is True
+    assert sorted(todo["title"] for todo in snapshot["changes"]) == ["one", "two"]
+    assert snapshot["deleted"] == []
+
+def test_delta_has_changes_and_tombstones(client, user_headers):
+    kept, dropped, untouched = (client.post("/todos/", json={"title": title}, headers=user_headers).json()["id"]
+                                for title in ("kept", "dropped", "untouched"))
+    cursor = _sync(client, user_headers)["cursor"]
+
+    client.put(f"/todos/{kept}", json={"completed": True}, headers=user_headers)
+    client.delete(f"/todos/{dropped}", headers=user_headers)
+    delta = _sync(client, user_headers, cursor)
+    assert delta["reset"] is False
+    assert [(todo["id"], todo["completed"]) for todo in delta["changes"]] == [(kept, True)]
+    assert delta["deleted"] == [dropped]
+    assert untouched not in [todo["id"] for todo in delta["changes"]]
+
+    # Nothing new since the last cursor
+    empty = _sync(client, user_headers, delta["cursor"])
+    assert (empty["changes"], empty["deleted"]) == ([], [])
+
+def test_batch_field_updates_reach_the_delta(client, user_headers):
+    todo_id = client.post("/todos/", json={"title": "before"}, headers=user_headers).json()["id"]
+    other = client.post("/todos/", json={"title": "other"}, headers=user_headers).json()["id"]
+    cursor = _sync(client, user_headers)["cursor"]
+    client.post("/todos/batch", json={"operations": [
+        {"op": "update", "id": todo_id, "title": "after", "description": "batched"},
+        {"op": "delete", "id": other},
+        {"op": "create", "title": "created"}
+    ]}, headers=user_headers)
+    delta = _sync(client, user_headers, cursor)
+    changed = {todo["title"]: todo for todo in delta["changes"]}
+    assert set(changed) == {"after", "created"}
+    assert changed["after"]["description"] == "batched"
+    assert delta["deleted"] == [other]
+
+def test_cursor_past_tombstone_retention_resets(client, user_headers):
+    client.post("/todos/", json={"title": "old"}, headers=user_headers)
+    with mock.patch("app.todo_versions.time.time", return_value=0):
+        stale = encode_sync_cursor(1)
+    assert _sync(client, user_headers, stale)["reset"] is True
+
+def test_old_tombstones_are_purged(client, db, user_headers):
+    todo_id = client.post("/todos/", json={"title": "gone"}, headers=user_headers).json()["id"]
+    client.delete(f"/todos/{todo_id}", headers=user_headers)
+    assert crud.purge_todo_tombstones(db, datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)) == 0
+    assert crud.purge_todo_tombstones(db, datetime.utcnow() + timedelta(minutes=1)) == 1
+
+def test_malformed_sync_cursor_is_a_400(client, user_headers):
+    assert client.get("/todos/changes", params={"since": "garbage"}, headers=user_headers).status_code == 400
@@ -0,0 +1,52 @@
+from sqlalchemy import event
+from app.database import engine
+
+class _Statements:
+    """Statements sent to the database while the block runs"""
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+        return self.statements
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement.split()[0])
+
+def _create(client, headers, title="write me") -> int:
+    return client.post("/todos/", json={"title": title}, headers=headers).json()["id"]
+
+def test_update_toggle_and_delete(client, user_headers):
+    todo_id = _create(client, user_headers)
+    updated = client.put(f"/todos/{todo_id}", json={"title": "rewritten", "completed": True}, headers=user_headers)
+    assert updated.status_code == 200
+    assert (updated.json()["title"], updated.json()["completed"]) == ("rewritten", True)
+    toggled = client.patch(f"/todos/{todo_id}/toggle", headers=user_headers)
+    assert toggled.json()["completed"] is False
+    assert client.delete(f"/todos/{todo_id}", headers=user_headers).json() == {"message": "Deleted"}
+    assert client.get(f"/todos/{todo_id}", headers=user_headers).status_code == 404
+
+def test_foreign_and_missing_todos_are_404(client, make_user, login, user_headers):
+    make_user("bob")
+    bob = login("bob")
+    foreign = _create(client, bob, "bob's")
+    for todo_id in (foreign, 999999):
+        assert client.put(f"/todos/{todo_id}", json={"title": "stolen"}, headers=user_headers).status_code == 404
+        assert client.put(f"/todos/{todo_id}", json={"completed": True}, headers=user_headers).status_code == 404
+        assert client.patch(f"/todos/{todo_id}/toggle", headers=user_headers).status_code == 404
+        assert client.delete(f"/todos/{todo_id}", headers=user_headers).status_code == 404
+    todo = client.get(f"/todos/{foreign}", headers=bob).json()
+    assert (todo["title"], todo["completed"]) == ("bob's", False)
+
+def test_toggle_and_delete_never_read_the_todo_first(client, user_headers):
+    todo_id = _create(client, user_headers)
+    with _Statements() as toggle:
+        client.patch(f"/todos/{todo_id}/toggle", headers=user_headers)
+    with _Statements() as removal:
+        client.delete(f"/todos/{todo_id}", headers=user_headers)
+    # Anything before the version bump is authentication; the write itself reads nothing
+    for statements in (toggle, removal):
+        writes = statements[statements.index("UPDATE"):]
+        assert "SELECT" not in writes
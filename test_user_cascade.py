@@ -0,0 +1,41 @@
+from sqlalchemy import event, func, select, text
+from app import models
+from app.database import engine
+
+CHILD_TABLES = (models.Todo, models.UserSession, models.LoginAttempt, models.TodoTombstone)
+
+def _children(db, user_id: int) -> dict[str, int]:
+    db.expire_all()
+    return {model.__tablename__: db.scalar(select(func.count()).select_from(model).where(
+        (model.owner_id if hasattr(model, "owner_id") else model.user_id) == user_id)) for model in CHILD_TABLES}
+
+def test_sqlite_enforces_foreign_keys(db):
+    assert db.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+def test_deleting_a_user_cascades_in_one_statement(client, db, make_user, login, admin_headers):
+    user_id = make_user("alice")
+    alice = login("alice")
+    for i in range(3):
+        todo_id = client.post("/todos/", json={"title": f"todo {i}"}, headers=alice).json()["id"]
+    client.delete(f"/todos/{todo_id}", headers=alice)
+    assert all(_children(db, user_id).values())
+
+    deletes = []
+
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE"):
+            deletes.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    try:
+        response = client.delete(f"/admin/users/{user_id}", headers=admin_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_statement)
+    assert response.status_code == 200
+    # The search index entries, then the user; the database removes the children
+    assert [statement.split()[2] for statement in deletes] == ["todos_fts", "users"]
+    assert set(_children(db, user_id).values()) == {0}
+    assert client.get("/auth/me", headers=alice).status_code == 401
+
+def test_missing_user_is_a_404(client, admin_headers):
+    assert client.delete("/admin/users/999999", headers=admin_headers).status_code == 404